@@ -0,0 +1,254 @@
+"""
+Benchmark suite for the command engine: every case is a command line timed through
+execute_morel_command, with its output fully consumed, as the shell would print it.
+
+Usage (from the Morel-OS directory):
+    python benchmarks/bench_commands.py [--size quick|full] [--only SUBSTRING] [--fixtures DIR]
+                                        [--baseline FILE] [--save-baseline] [--tolerance 0.25]
+
+Fixtures are generated on first use:
+  quick: directories of 10 and 10,000 entries, a 64 MiB file, a tree of 1,000 small files
+  full:  directories of 10, 10,000 and 500,000 entries, a 2 GiB file, a tree of 10,000 files
+plus a trivial and a CPU-heavy script. With --fixtures DIR they are kept in DIR and reused
+by later runs (the 500k directory takes a while to create); otherwise a temporary
+directory is used and removed afterwards.
+
+Each case runs once untimed, then REPEATS times (fewer for the slow ones), and reports
+min / p50 / p90 / p99 / max in milliseconds. --save-baseline writes the results to the
+baseline file (default: benchmarks/baseline-<size>.json, which is machine-specific and
+should not be shared). When the baseline file exists, every run is compared with it: a
+case whose p50 is more than TOLERANCE slower (and at least MIN_REGRESSION_MS slower)
+is a regression, and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+MOREL_OS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MOREL_OS_DIR)
+
+from morel_engine import execute_morel_command, output_to_string
+from morel_commands.dircache import DIRECTORY_CACHE
+
+REPEATS = 20
+SLOW_REPEATS = 5 # For cases that take seconds (big copies, the 500k directory)
+MIN_REGRESSION_MS = 1.0 # Differences below this are noise, whatever the percentage
+
+SIZES = {
+    "quick": {"dirs": (10, 10_000), "big_file_mb": 64, "tree_files": 1_000},
+    "full": {"dirs": (10, 10_000, 500_000), "big_file_mb": 2048, "tree_files": 10_000},
+}
+
+TRIVIAL_SCRIPT = "print('hello from the benchmark')\n"
+HEAVY_SCRIPT = (
+    "import hashlib\n"
+    "data = b'morel' * 200_000\n"
+    "for _ in range(40):\n"
+    "    data = hashlib.sha256(data).digest() * 200_000\n"
+    "print(len(data))\n"
+)
+
+
+class Case:
+    """One benchmarked command line, with an optional setup run before each timed iteration."""
+
+    def __init__(self, name: str, command: str, repeats: int = REPEATS, setup=None):
+        self.name = name
+        self.command = command
+        self.repeats = repeats
+        self.setup = setup
+
+
+def _touch_entries(directory: str, count: int):
+    os.makedirs(directory, exist_ok=True)
+    existing = len(os.listdir(directory))
+    for index in range(existing, count):
+        open(os.path.join(directory, f"entry{index:07d}.txt"), "wb").close()
+
+
+def build_fixtures(root: str, size: dict) -> dict:
+    """Creates (or completes) the fixtures under root; returns their paths."""
+    paths = {"root": root, "dirs": {}}
+    for count in size["dirs"]:
+        directory = os.path.join(root, f"dir_{count}")
+        _touch_entries(directory, count)
+        paths["dirs"][count] = directory
+
+    big_file = os.path.join(root, f"big_{size['big_file_mb']}mb.bin")
+    if not os.path.exists(big_file) or os.path.getsize(big_file) != size["big_file_mb"] * 1024 * 1024:
+        chunk = os.urandom(1024 * 1024)
+        with open(big_file, "wb") as f:
+            for _ in range(size["big_file_mb"]):
+                f.write(chunk)
+    paths["big_file"] = big_file
+
+    tree = os.path.join(root, f"tree_{size['tree_files']}")
+    if not os.path.isdir(tree):
+        per_directory = 100
+        payload = b"morel benchmark line\n" * 200 # About 4 KiB
+        for index in range(size["tree_files"]):
+            directory = os.path.join(tree, f"d{index // per_directory:04d}")
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f"f{index}.txt"), "wb") as f:
+                f.write(payload)
+    paths["tree"] = tree
+
+    for name, source in (("trivial.py", TRIVIAL_SCRIPT), ("heavy.py", HEAVY_SCRIPT)):
+        with open(os.path.join(root, name), "w") as f:
+            f.write(source)
+    paths["scratch"] = os.path.join(root, "scratch")
+    os.makedirs(paths["scratch"], exist_ok=True)
+    return paths
+
+
+def _remove(path: str):
+    def remove():
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+    return remove
+
+
+def build_cases(paths: dict) -> list[Case]:
+    cases = []
+    for count, directory in paths["dirs"].items():
+        repeats = SLOW_REPEATS if count >= 100_000 else REPEATS
+        cases.append(Case(f"ls {count}", f'ls "{directory}"', repeats))
+        cases.append(Case(f"ls {count} (cold cache)", f'ls "{directory}"', repeats, setup=DIRECTORY_CACHE.invalidate))
+        cases.append(Case(f"ls -l {count}", f'ls -l "{directory}"', repeats))
+        cases.append(Case(f"ls -U {count}", f'ls -U "{directory}"', repeats))
+        cases.append(Case(f"cd {count}", f'cd "{directory}"', REPEATS, setup=DIRECTORY_CACHE.invalidate))
+
+    root = paths["root"]
+    cases.append(Case("run trivial", f'run "{os.path.join(root, "trivial.py")}"'))
+    cases.append(Case("run heavy", f'run "{os.path.join(root, "heavy.py")}"', SLOW_REPEATS))
+    cases.append(Case("run --inproc trivial", f'run --inproc "{os.path.join(root, "trivial.py")}"'))
+
+    big_copy = os.path.join(paths["scratch"], "big_copy.bin")
+    tree_copy = os.path.join(paths["scratch"], "tree_copy")
+    cases.append(Case("copyfile big file", f'copyfile "{paths["big_file"]}" "{big_copy}"', SLOW_REPEATS,
+                      setup=_remove(big_copy)))
+    cases.append(Case("copyfile -r tree", f'copyfile -r "{paths["tree"]}" "{tree_copy}"', SLOW_REPEATS,
+                      setup=_remove(tree_copy)))
+    cases.append(Case("find tree -name", f'find "{paths["tree"]}" -name "f1*.txt"'))
+    cases.append(Case("grep tree", f'grep zzz_absent "{paths["tree"]}"', SLOW_REPEATS)) # Reads every file
+    return cases
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_case(case: Case, cwd: str) -> dict:
+    """Times one case; returns its statistics in milliseconds."""
+    timings = []
+    for iteration in range(case.repeats + 1):
+        if case.setup is not None:
+            case.setup()
+        start = time.perf_counter()
+        output, _, _ = execute_morel_command(case.command, cwd)
+        output_to_string(output) # Streamed commands only do their work as they are read
+        elapsed = (time.perf_counter() - start) * 1000
+        if iteration: # The first run warms caches and imports
+            timings.append(elapsed)
+    ordered = sorted(timings)
+    return {
+        "runs": len(ordered),
+        "min": ordered[0],
+        "p50": statistics.median(ordered),
+        "p90": percentile(ordered, 0.90),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1],
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Returns a description of every case that is slower than its baseline."""
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get("cases", {}).get(name)
+        if previous is None:
+            continue
+        limit = max(previous["p50"] * (1 + tolerance), previous["p50"] + MIN_REGRESSION_MS)
+        if stats["p50"] > limit:
+            regressions.append(f"{name}: p50 {stats['p50']:.2f} ms vs baseline {previous['p50']:.2f} ms "
+                               f"(+{(stats['p50'] / previous['p50'] - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark Morel OS commands through execute_morel_command.")
+    parser.add_argument("--size", choices=sorted(SIZES), default="quick")
+    parser.add_argument("--only", help="run only cases whose name contains this text")
+    parser.add_argument("--fixtures", help="keep fixtures in this directory and reuse them")
+    parser.add_argument("--baseline", help="baseline JSON file (default: benchmarks/baseline-<size>.json)")
+    parser.add_argument("--save-baseline", action="store_true", help="write this run's results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed p50 slowdown (default 0.25 = 25%%)")
+    options = parser.parse_args(argv)
+
+    baseline_path = options.baseline or os.path.join(MOREL_OS_DIR, "benchmarks", f"baseline-{options.size}.json")
+    temporary = None
+    if options.fixtures:
+        fixture_root = os.path.abspath(options.fixtures)
+        os.makedirs(fixture_root, exist_ok=True)
+    else:
+        temporary = tempfile.TemporaryDirectory(prefix="morel-bench-")
+        fixture_root = temporary.name
+
+    original_cwd = os.getcwd() # The 'cd' cases change the process's working directory
+    try:
+        print(f"Preparing '{options.size}' fixtures in {fixture_root} ...")
+        paths = build_fixtures(fixture_root, SIZES[options.size])
+        cases = [case for case in build_cases(paths) if not options.only or options.only in case.name]
+        results = {}
+        print(f"{'case':<26}{'runs':>5}{'min':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}  (ms)")
+        for case in cases:
+            stats = run_case(case, paths["scratch"])
+            results[case.name] = stats
+            print(f"{case.name:<26}{stats['runs']:>5}" + "".join(
+                f"{stats[key]:>10.2f}" for key in ("min", "p50", "p90", "p99", "max")))
+    finally:
+        os.chdir(original_cwd)
+        if temporary is not None:
+            temporary.cleanup()
+
+    status = 0
+    if os.path.exists(baseline_path) and not options.save_baseline:
+        with open(baseline_path, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {baseline_path}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            status = 1
+        else:
+            print(f"\nNo regressions against {baseline_path} (tolerance {options.tolerance:.0%}).")
+    if options.save_baseline:
+        saved_cases = {}
+        if os.path.exists(baseline_path): # Keep the cases this run skipped (--only)
+            with open(baseline_path, "r", encoding="utf-8") as f:
+                saved_cases = json.load(f).get("cases", {})
+        saved_cases.update(results)
+        baseline = {
+            "size": options.size,
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "saved": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "cases": saved_cases,
+        }
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+        print(f"\nBaseline saved to {baseline_path}.")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
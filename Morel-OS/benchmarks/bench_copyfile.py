@@ -0,0 +1,86 @@
+"""
+copyfile engine vs shutil (what 'copyfile' used before).
+
+Usage (from the Morel-OS directory):
+    python benchmarks/bench_copyfile.py [BIG_FILE_MB] [SMALL_FILES] [DIRECTORY]
+
+Builds a fixture in a temporary directory: one BIG_FILE_MB (default 512) file and a tree of
+SMALL_FILES (default 10000) 4 KiB files in 100 directories, under DIRECTORY (default: the
+system temp directory; point it at a Btrfs/XFS mount to see reflinks). Then times:
+  - one large file: shutil.copy2 vs copy_stream
+  - the tree:       shutil.copytree vs copy_stream(recursive=True)
+Each measurement is the best of 3 runs into a fresh destination. The page cache is
+warm after the first run, so the numbers compare copy overhead rather than disk speed.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from morel_commands.copyfile import copy_stream, format_size
+
+REPEATS = 3
+
+
+def make_fixture(root: str, big_file_mb: int, small_files: int) -> tuple[str, str, int]:
+    big_file = os.path.join(root, "big.bin")
+    chunk = os.urandom(1024 * 1024)
+    with open(big_file, "wb") as f:
+        for _ in range(big_file_mb):
+            f.write(chunk)
+    tree = os.path.join(root, "tree")
+    per_directory = max(1, small_files // 100)
+    tree_bytes = 0
+    for index in range(small_files):
+        directory = os.path.join(tree, f"d{index // per_directory}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"f{index}.txt"), "wb") as f:
+            f.write(chunk[:4096])
+        tree_bytes += 4096
+    return big_file, tree, tree_bytes
+
+
+def best_time(copy, destination: str) -> float:
+    timings = []
+    for _ in range(REPEATS):
+        if os.path.isdir(destination):
+            shutil.rmtree(destination)
+        elif os.path.exists(destination):
+            os.remove(destination)
+        start = time.perf_counter()
+        copy(destination)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def report(label: str, byte_count: int, baseline: float, engine: float):
+    print(f"{label}:")
+    print(f"  shutil   {baseline * 1000:8.1f} ms  {format_size(byte_count / baseline)}/s")
+    print(f"  copyfile {engine * 1000:8.1f} ms  {format_size(byte_count / engine)}/s  ({baseline / engine:.1f}x)")
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    big_file_mb = int(argv[0]) if argv else 512
+    small_files = int(argv[1]) if len(argv) > 1 else 10000
+    directory = argv[2] if len(argv) > 2 else None
+    with tempfile.TemporaryDirectory(prefix="morel-copy-bench-", dir=directory) as root:
+        big_file, tree, tree_bytes = make_fixture(root, big_file_mb, small_files)
+        destination = os.path.join(root, "copy")
+
+        baseline = best_time(lambda dst: shutil.copy2(big_file, dst), destination)
+        engine = best_time(lambda dst: list(copy_stream(big_file, dst, recursive=False)), destination)
+        report(f"One {big_file_mb} MiB file", big_file_mb * 1024 * 1024, baseline, engine)
+
+        baseline = best_time(lambda dst: shutil.copytree(tree, dst), destination)
+        engine = best_time(lambda dst: list(copy_stream(tree, dst, recursive=True)), destination)
+        report(f"Tree of {small_files} small files", tree_bytes, baseline, engine)
+        print(list(copy_stream(tree, destination + "-last", recursive=True))[-1])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""
+Frame latency of the GUI terminal while a command floods it with output.
+
+Usage (from the Morel-OS directory; needs a display):
+    python benchmarks/bench_gui_output.py [--lines N] [--chunk-lines N] [--scrollback N]
+                                          [--run] [--budget-ms MS]
+
+Pushes --lines lines (default 1,000,000) through the GUI terminal's real output path:
+chunks are put on a command's event queue by a worker thread, drained on the Tk main
+thread by a gui_launcher.TerminalSession and written through its TerminalOutput
+(gui_terminal.py) into the session's ScrolledText. By default the worker produces chunks of
+--chunk-lines lines as fast as it can; with --run the lines come from a generated script
+started with 'run' on the GUI's worker pool, as if typed in the terminal.
+
+A heartbeat callback is scheduled every GUI_FRAME_MS. How late it runs is the frame
+latency: the time the window could not react to input or repaint. The script reports
+min / p50 / p90 / p99 / max of it and of the flushes, the throughput, and the number of
+lines left in the widget (at most the scrollback cap plus one trim block). The exit
+status is 1 if the worst frame was later than --budget-ms.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tkinter as tk
+from tkinter import ttk
+
+import gui_launcher
+from gui_terminal import GUI_FRAME_MS, GUI_SCROLLBACK_LINES, GUI_TRIM_BLOCK_LINES
+
+LINE_PADDING = "." * 60 # Lines about as long as a typical log line
+
+
+class SyntheticCommand(gui_launcher.GuiCommand):
+    """A GuiCommand whose 'command' produces line_count lines, in chunks, as fast as the queue takes them."""
+
+    def __init__(self, line_count: int, chunk_lines: int):
+        super().__init__("synthetic", os.getcwd())
+        self.line_count = line_count
+        self.chunk_lines = chunk_lines
+
+    def run(self):
+        try:
+            for first in range(0, self.line_count, self.chunk_lines):
+                last = min(self.line_count, first + self.chunk_lines)
+                self.put("\n".join(f"line {number:>9} {LINE_PADDING}" for number in range(first, last)))
+        finally:
+            self.finished.set()
+
+
+def percentile(ordered: list[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def describe(label: str, timings: list[float]) -> str:
+    if not timings:
+        return f"{label:<16} (none)"
+    ordered = sorted(timings)
+    return (f"{label:<16} min {ordered[0]:7.2f}   p50 {percentile(ordered, 0.5):7.2f}   "
+            f"p90 {percentile(ordered, 0.9):7.2f}   p99 {percentile(ordered, 0.99):7.2f}   "
+            f"max {ordered[-1]:7.2f} ms   ({len(ordered)} samples)")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="GUI terminal output benchmark.")
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--chunk-lines", type=int, default=500, help="lines per chunk from the synthetic producer")
+    parser.add_argument("--scrollback", type=int, default=GUI_SCROLLBACK_LINES)
+    parser.add_argument("--run", action="store_true", help="produce the lines with a real 'run' of a generated script")
+    parser.add_argument("--budget-ms", type=float, default=100.0, help="worst acceptable frame latency")
+    options = parser.parse_args(argv)
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"bench_gui_output: cannot open a window: {e}", file=sys.stderr)
+        return 2
+    root.title("Morel OS - output benchmark")
+    notebook = ttk.Notebook(root)
+    notebook.pack(fill=tk.BOTH, expand=True)
+    session = gui_launcher.TerminalSession(notebook, "Benchmark", os.getcwd())
+    session.text_area.config(height=30, width=100)
+    session.input_frame.pack(side=tk.BOTTOM, fill=tk.X, before=session.text_area)
+    output = session.output
+    output.max_lines = options.scrollback
+
+    flush_ms = []
+    timed_flush = output.flush
+    def flush(): # Shadows the method on this instance, so the flushes append() schedules are timed too
+        start = time.perf_counter()
+        timed_flush()
+        flush_ms.append((time.perf_counter() - start) * 1000)
+    output.flush = flush
+
+    frame_ms = []
+    def heartbeat(due: float):
+        now = time.perf_counter()
+        frame_ms.append(max(0.0, (now - due) * 1000))
+        root.after(GUI_FRAME_MS, heartbeat, time.perf_counter() + GUI_FRAME_MS / 1000)
+
+    script_dir = tempfile.TemporaryDirectory()
+    if options.run:
+        with open(os.path.join(script_dir.name, "flood.py"), "w") as f:
+            f.write(f"for number in range({options.lines}):\n"
+                    f"    print(f'line {{number:>9}} {LINE_PADDING}')\n")
+        command = gui_launcher.GuiCommand("run flood.py", script_dir.name).start(gui_launcher.get_executor())
+    else:
+        command = SyntheticCommand(options.lines, options.chunk_lines).start(gui_launcher.get_executor())
+    session.start_command(command)
+    started = time.perf_counter()
+    finished = []
+
+    def wait_until_shown():
+        if session.running_command is None and not output.pending:
+            finished.append(time.perf_counter())
+            root.quit()
+            return
+        root.after(GUI_FRAME_MS, wait_until_shown)
+
+    root.after(GUI_FRAME_MS, heartbeat, time.perf_counter() + GUI_FRAME_MS / 1000)
+    root.after(GUI_FRAME_MS, wait_until_shown)
+    root.mainloop()
+
+    elapsed = finished[0] - started
+    widget_lines = int(session.text_area.index("end-1c").split(".")[0])
+    root.destroy()
+    script_dir.cleanup()
+
+    print(f"{options.lines:,} lines from {'run' if options.run else 'a synthetic command'} in {elapsed:.2f} s "
+          f"({options.lines / elapsed:,.0f} lines/s), {output.flushes} inserts")
+    print(describe("frame latency", frame_ms))
+    print(describe("flush", flush_ms))
+    print(f"lines in the widget: {widget_lines:,} (scrollback {options.scrollback:,} + trim block {GUI_TRIM_BLOCK_LINES:,})")
+    worst = max(frame_ms, default=0.0)
+    if worst > options.budget_ms:
+        print(f"FAIL: worst frame latency {worst:.1f} ms is over the {options.budget_ms:.0f} ms budget")
+        return 1
+    print(f"OK: worst frame latency {worst:.1f} ms (budget {options.budget_ms:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
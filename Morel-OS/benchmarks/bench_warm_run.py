@@ -0,0 +1,62 @@
+"""
+Per-'run' latency: fresh interpreter (plain 'run') vs the pre-warmed pool ('run --warm').
+
+Usage (from the Morel-OS directory):
+    python benchmarks/bench_warm_run.py [RUNS]
+
+Runs a trivial script RUNS times (default 30) each way through run_command_string,
+the same code path the 'run' command uses, and prints min / median / p95 / mean.
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from morel_commands.run import run_command_string
+from morel_commands.warmpool import get_warm_pool
+
+SCRIPT_SOURCE = "import json, sys\nprint(json.dumps(sys.argv[1:]))\n"
+
+
+def time_runs(script_dir: str, runs: int, warm: bool) -> list[float]:
+    timings = []
+    for i in range(runs):
+        start = time.perf_counter()
+        output = run_command_string(script_dir, "bench_script.py", [str(i)], warm=warm)
+        timings.append((time.perf_counter() - start) * 1000)
+        if f'["{i}"]' not in output:
+            raise RuntimeError(f"Unexpected output from {'warm' if warm else 'cold'} run: {output!r}")
+    return timings
+
+
+def describe(label: str, timings: list[float]) -> str:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return (f"{label:<18} min {ordered[0]:7.1f} ms   median {statistics.median(ordered):7.1f} ms   "
+            f"p95 {p95:7.1f} ms   mean {statistics.fmean(ordered):7.1f} ms")
+
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    runs = int(argv[0]) if argv else 30
+    with tempfile.TemporaryDirectory() as script_dir:
+        with open(os.path.join(script_dir, "bench_script.py"), "w") as f:
+            f.write(SCRIPT_SOURCE)
+
+        cold = time_runs(script_dir, runs, warm=False)
+        get_warm_pool().fill()
+        time_runs(script_dir, 2, warm=True) # Let the pool's workers finish starting up
+        warm = time_runs(script_dir, runs, warm=True)
+
+    print(f"{runs} runs of a trivial script:")
+    print(describe("subprocess (run)", cold))
+    print(describe("warm pool (--warm)", warm))
+    print(f"Median speedup: {statistics.median(cold) / statistics.median(warm):.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,179 @@
+"""
+The GUI's file explorer: a ttk.Treeview docked next to the terminal, showing the current
+session's directory.
+
+Directories are read one level at a time, only when they are shown or expanded, on the
+explorer's own worker thread (never on the Tk main thread, and never queued behind the
+commands on the terminals' shared pool) through the shared directory cache
+(dircache.py, os.scandir underneath): reopening an unchanged directory costs one stat().
+Results come back through a queue that the main thread polls with after() while a read
+is in progress, like a running command's output.
+
+Rows are materialized a page (EXPLORER_PAGE_ROWS) at a time. A directory shows its first
+page followed by a "... N more" row; when that row scrolls into view, the next page is
+inserted in its place. A directory of 500,000 entries therefore costs the tree a few
+hundred rows until the user actually scrolls through it.
+
+Double-clicking a directory asks the session to 'cd' into it, double-clicking a Python
+script to 'run' it (see on_activate).
+"""
+import os
+import queue
+import tkinter as tk
+from tkinter import ttk
+
+from morel_commands.dircache import DIRECTORY_CACHE
+
+EXPLORER_PAGE_ROWS = 200 # Rows inserted at once; the next page is inserted when the "more" row is visible
+EXPLORER_POLL_MS = 30 # How often pending directory reads are checked for results
+
+
+def read_directory(path: str):
+    """Runs on a worker thread: the (name, is_dir) entries of 'path', directories first, or the OSError."""
+    try:
+        listing = DIRECTORY_CACHE.get_listing(path)
+    except OSError as e:
+        return None, e
+    entries = listing.entries # Sorted by name
+    return listing, [entry for entry in entries if entry[1]] + [entry for entry in entries if not entry[1]]
+
+
+class FileExplorer:
+    """
+    A lazily expanding, paged tree of one directory (see the module docstring).
+    on_activate(path, is_dir) is called on double-click. close() stops the reading thread.
+    """
+
+    def __init__(self, parent, on_activate):
+        self.on_activate = on_activate
+        self._executor = None # Created on the first read: one thread, so reads never wait for commands
+        self.root_path = None # The directory shown at the top level
+        self._wanted_root = None # The latest directory show() was asked for
+        self._root_listing = None # Its DirectoryListing: the same object means it has not changed
+        self._generation = 0 # Incremented when the tree is rebuilt; older reads are then dropped
+        self._results = queue.SimpleQueue() # (generation, item, path, listing, entries or error)
+        self._reads_in_progress = 0
+        self._paths = {} # Materialized item -> (path, is_dir)
+        self._unread = {} # Directory item -> its placeholder child, until it is first expanded
+        self._more = {} # "... N more" item -> (parent item, directory path, entries, index of the next page)
+
+        self.frame = tk.Frame(parent, background="white")
+        self.tree = ttk.Treeview(self.frame, show="tree", selectmode="browse")
+        scrollbar = ttk.Scrollbar(self.frame, orient=tk.VERTICAL, command=self.tree.yview)
+        def on_scroll(first, last):
+            scrollbar.set(first, last)
+            self._insert_visible_pages()
+        self.tree.configure(yscrollcommand=on_scroll)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.tree.bind("<<TreeviewOpen>>", self._on_open)
+        self.tree.bind("<Double-1>", self._on_activate_row)
+        self.tree.bind("<Return>", self._on_activate_row)
+
+    def show(self, path: str):
+        """Shows 'path' at the top level, or refreshes it if its contents changed since it was read."""
+        self._wanted_root = path
+        self._read("", path)
+
+    def close(self):
+        """Stops the reading thread; reads still queued are dropped."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    # --- Reading directories ---
+    def _read(self, item: str, path: str):
+        generation = self._generation
+        def read_and_report():
+            self._results.put((generation, item, path) + read_directory(path))
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="morel-explorer")
+        self._executor.submit(read_and_report)
+        self._reads_in_progress += 1
+        if self._reads_in_progress == 1:
+            self.tree.after(EXPLORER_POLL_MS, self._poll)
+
+    def _poll(self):
+        while True:
+            try:
+                generation, item, path, listing, entries = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._reads_in_progress -= 1
+            if item == "":
+                if path == self._wanted_root:
+                    self._show_root(path, listing, entries)
+            elif generation == self._generation and self.tree.exists(item):
+                self._show_children(item, path, entries)
+        if self._reads_in_progress:
+            self.tree.after(EXPLORER_POLL_MS, self._poll)
+
+    def _show_root(self, path: str, listing, entries):
+        if path == self.root_path and listing is not None and listing is self._root_listing:
+            return # Unchanged: keep what is expanded and materialized
+        self._generation += 1
+        self.tree.delete(*self.tree.get_children(""))
+        self._paths.clear()
+        self._unread.clear()
+        self._more.clear()
+        self.root_path = path
+        self._root_listing = listing
+        parent_path = os.path.dirname(path)
+        if parent_path != path:
+            self._paths[self.tree.insert("", "end", text="..")] = (parent_path, True)
+        if isinstance(entries, OSError):
+            self.tree.insert("", "end", text=f"({entries.strerror or entries})")
+            return
+        self._insert_page("", path, entries, 0)
+
+    def _show_children(self, item: str, path: str, entries):
+        self.tree.delete(*self.tree.get_children(item)) # The "loading..." placeholder
+        if isinstance(entries, OSError):
+            self.tree.insert(item, "end", text=f"({entries.strerror or entries})")
+        elif not entries:
+            self.tree.insert(item, "end", text="(empty)")
+        else:
+            self._insert_page(item, path, entries, 0)
+
+    # --- Paged rows ---
+    def _insert_page(self, parent: str, path: str, entries: list, start: int):
+        end = min(len(entries), start + EXPLORER_PAGE_ROWS)
+        for name, is_dir in entries[start:end]:
+            item = self.tree.insert(parent, "end", text=name + "/" if is_dir else name)
+            self._paths[item] = (os.path.join(path, name), is_dir)
+            if is_dir: # A placeholder child makes it expandable without reading it
+                self._unread[item] = self.tree.insert(item, "end", text="...")
+        if end < len(entries):
+            more = self.tree.insert(parent, "end", text=f"... {len(entries) - end:,} more")
+            self._more[more] = (parent, path, entries, end)
+
+    def _insert_next_page(self, more: str):
+        parent, path, entries, start = self._more.pop(more)
+        self.tree.delete(more)
+        self._insert_page(parent, path, entries, start)
+
+    def _insert_visible_pages(self):
+        """Called whenever the view changes: replaces "more" rows that are on screen with the next page."""
+        for more in list(self._more):
+            if self.tree.bbox(more): # Empty while scrolled out of view or inside a closed directory
+                self._insert_next_page(more)
+
+    # --- Events ---
+    def _on_open(self, event=None):
+        item = self.tree.focus()
+        placeholder = self._unread.pop(item, None)
+        if placeholder is not None:
+            self.tree.item(placeholder, text="loading...")
+            self._read(item, self._paths[item][0])
+
+    def _on_activate_row(self, event):
+        if event.type == tk.EventType.ButtonPress:
+            item = self.tree.identify_row(event.y)
+        else: # Return on the selected row
+            item = self.tree.focus()
+        if item in self._more:
+            self._insert_next_page(item)
+        elif item in self._paths:
+            path, is_dir = self._paths[item]
+            self.on_activate(path, is_dir)
+        return "break" # Instead of Treeview's own open/close on double-click
@@ -1,10 +1,19 @@
 import tkinter as tk
-from tkinter import scrolledtext
-import platform
+from tkinter import scrolledtext, ttk
 import sys
 import os 
+import queue
+import shlex
 import subprocess 
-import re 
+import threading
+import time
+
+from gui_explorer import FileExplorer
+from gui_terminal import TerminalOutput
+from morel_commands import CANCEL_EVENT, FOREGROUND_PROCESSES, JOB_TABLE
+from morel_commands.jobs import JobTable
+from morel_engine import (COMMAND_REGISTRY, CHANGE_DIRECTORY, PLAIN_OUTPUT, execute_morel_command,
+                          info_command_string, strip_rich_markup)
 
 try:
     import pyperclip
@@ -18,436 +27,543 @@ except ImportError:
           "Install it with: pip install pyperclip")
 
 
-# --- Global Constants (local to GUI Launcher) ---
-MOREL_OS_VERSION = "0.3.1 (GUI Standalone)" # Indicate it's the GUI's version
-ASCII_LOGO = """
-     /$$      /$$                               /$$          /$$$$$$   /$$$$$$ 
-    | $$$    /$$$                              | $$         /$$__  $$ /$$__  $$
-    | $$$$  /$$$$  /$$$$$$   /$$$$$$   /$$$$$$ | $$        | $$  \ $$| $$  \__/
-    | $$ $$/$$ $$ /$$__  $$ /$$__  $$ /$$__  $$| $$ /$$$$$$| $$  | $$|  $$$$$$ 
-    | $$  $$$| $$| $$  \ $$| $$  \__/| $$$$$$$$| $$|______/| $$  | $$ \____  $$
-    | $$\  $ | $$| $$  | $$| $$      | $$_____/| $$        | $$  | $$ /$$  \ $$
-    | $$ \/  | $$|  $$$$$$/| $$      |  $$$$$$$| $$        |  $$$$$$/|  $$$$$$/
-    |__/     |__/ \______/ |__/       \_______/|__/         \______/  \______/ 
-"""
-INFO2_TEXT_CONTENT = (
-    "This is Morel-OS (Graphical Launcher).\n"
-    "Features include in-window info display and a basic terminal.\n\n"
-    "[bold]Supported Commands (GUI Terminal):[/bold]\n"
-    "  [cyan]info[/cyan]                 - display system and OS information\n"
-    "  [cyan]info2[/cyan]                - display this help text\n"
-    "  [cyan]femboy[/cyan]               - display special ASCII art\n"
-    "  [cyan]pwd[/cyan]                  - print the current working directory (for the GUI)\n"
-    "  [cyan]ls [path][/cyan]            - list directory contents (plain text)\n"
-    "  [cyan]cd <directory>[/cyan]       - change current directory (for the GUI)\n"
-    "  [cyan]run <script.py> [args][/cyan] - execute a Python script (output in GUI)\n"
-    "  [cyan]echo [message][/cyan]       - display a message (built-in to GUI terminal)\n"
-    "  [cyan]clear[/cyan]                - clear the GUI terminal screen (built-in)\n"
-    "  [cyan]startgui[/cyan]             - (this GUI is already running)\n"
-    "  [cyan]snake[/cyan]                - (unavailable directly in GUI terminal)\n"
-    "  [cyan]exit / quit[/cyan]          - to hide the terminal input field (not to close GUI)\n"
-    "\nUse the main 'Exit' button to close the GUI launcher."
-)
-FEMBOY_ASCII_ART = """
-                                                             bbbbbbbb
-    ffffffffffffffff                                         b::::::b
-   f::::::::::::::::f                                        b::::::b
-  f::::::::::::::::::f                                       b::::::b
-  f::::::fffffff:::::f                                        b:::::b
-  f:::::f       ffffffeeeeeeeeeeee       mmmmmmm    mmmmmmm   b:::::bbbbbbbbb       ooooooooooo yyyyyyy           yyyyyyy
-  f:::::f           ee::::::::::::ee   mm:::::::m  m:::::::mm b::::::::::::::bb   oo:::::::::::ooy:::::y         y:::::y 
- f:::::::ffffff    e::::::eeeee:::::eem::::::::::mm::::::::::mb::::::::::::::::b o:::::::::::::::oy:::::y       y:::::y  
- f::::::::::::f   e::::::e     e:::::em::::::::::::::::::::::mb:::::bbbbb:::::::bo:::::ooooo:::::o y:::::y     y:::::y   
- f::::::::::::f   e:::::::eeeee::::::em:::::mmm::::::mmm:::::mb:::::b    b::::::bo::::o     o::::o  y:::::y   y:::::y    
- f:::::::ffffff   e:::::::::::::::::e m::::m   m::::m   m::::mb:::::b     b:::::bo::::o     o::::o   y:::::y y:::::y     
-  f:::::f         e::::::eeeeeeeeeee  m::::m   m::::m   m::::mb:::::b     b:::::bo::::o     o::::o    y:::::y:::::y      
-  f:::::f         e:::::::e           m::::m   m::::m   m::::mb:::::b     b:::::bo::::o     o::::o     y:::::::::y       
- f:::::::f        e::::::::e          m::::m   m::::m   m::::mb:::::bbbbbb::::::bo:::::ooooo:::::o      y:::::::y        
- f:::::::f         e::::::::eeeeeeee  m::::m   m::::m   m::::mb::::::::::::::::b o:::::::::::::::o       y:::::y         
- f:::::::f          ee:::::::::::::e  m::::m   m::::m   m::::mb:::::::::::::::b   oo:::::::::::oo       y:::::y          
- fffffffff            eeeeeeeeeeeeee  mmmmmm   mmmmmm   mmmmmmbbbbbbbbbbbbbbbb      ooooooooooo        y:::::y           
-                                                                                                      y:::::y            
-                                                                                                     y:::::y             
-                                                                                                    y:::::y              
-                                                                                                   y:::::y               
-                                                                                                  yyyyyyy                
-"""
-# HIGHSCORE_FILE is not used directly by GUI, snake game manages its own.
-RICH_AVAILABLE = False # GUI uses plain text display in its terminal area.
-
-# --- Helper Functions (Local to GUI Launcher) ---
-def strip_rich_markup(text: str) -> str:
-    """Simple function to remove Rich-style markup tags."""
-    # Improved regex to handle tags with values or spaces if they were to appear.
-    return re.sub(r"\[/?[\w\s=\[\]#]+\]", "", text)
-
-# --- Command Logic Functions (Local to GUI Launcher) ---
-def info_command_string() -> str:
-    python_version = sys.version.split()[0]
-    platform_info = f"{platform.system()} {platform.release()}"
-    cpu_info = platform.processor()
-
-    lines = [
-        ASCII_LOGO.strip(),
-        "\nSystem Information:",
-        f"  OS Name         : Morel OS (Graphical Launcher)",
-        f"  OS Version      : {MOREL_OS_VERSION}",
-        f"  Python Version  : {python_version}",
-        f"  Platform        : {platform_info}",
-    ]
-    if cpu_info:
-        lines.append(f"  CPU             : {cpu_info}")
-    lines.append("\nType 'info2' in terminal for more commands and details.")
-    return "\n".join(lines)
-
-def info2_command_string() -> str:
-    return INFO2_TEXT_CONTENT
-
-def femboy_command_string() -> str:
-    return FEMBOY_ASCII_ART
-
-def pwd_command_string(current_path: str) -> str:
-    return current_path
-
-def ls_command_string(current_os_path: str, path_arg: str = None) -> str:
-    output_lines = []
-    target_path_display = path_arg if path_arg else "."
-    if path_arg is None:
-        resolved_target_path = current_os_path
-    elif os.path.isabs(path_arg):
-        resolved_target_path = path_arg
-    else:
-        resolved_target_path = os.path.abspath(os.path.join(current_os_path, path_arg))
-
-    if not os.path.exists(resolved_target_path):
-        return f"ls: cannot access '{target_path_display}': No such file or directory"
-    if not os.path.isdir(resolved_target_path):
-        return f"ls: cannot list contents of '{target_path_display}': Not a directory"
-    try:
-        entries = os.listdir(resolved_target_path)
-        entries.sort()
-        for entry in entries:
-            full_path_to_entry = os.path.join(resolved_target_path, entry)
-            if os.path.isdir(full_path_to_entry):
-                output_lines.append(f"D: {entry}")
+# --- Command engine ---
+# The GUI terminal runs commands through the same engine as the command-line shell
+# (morel_engine.py), so every command, and every optimization of one, exists once.
+# Commands run on a small pool of worker threads, never on the Tk main thread: a slow
+# 'run' must not freeze the window. The worker puts output chunks on a queue as they are
+# produced, and the main thread drains it every GUI_POLL_MS with root.after, for at most
+# GUI_POLL_BUDGET_MS at a time. What it collects is written through a TerminalOutput
+# (gui_terminal.py), which inserts at most once per frame and bounds the scrollback.
+GUI_OS_NAME = "Morel OS (Graphical Launcher)"
+GUI_WORKER_THREADS = 4 # Commands that may run at once; more wait for a free thread
+GUI_POLL_MS = 30 # How often the main thread collects a running command's output
+GUI_POLL_BUDGET_MS = 15 # Longest a single collection may take; the rest waits for the next one
+GUI_QUEUE_MAX_CHUNKS = 64 # Output chunks a worker may queue before it waits for the UI
+_BUSY_FRAMES = "|/-\\"
+
+_executor = None # Created by get_executor() when the first command runs
+
+def get_executor():
+    """The worker pool that runs GUI commands (thread creation is deferred to the first command)."""
+    global _executor
+    if _executor is None:
+        from concurrent.futures import ThreadPoolExecutor
+        _executor = ThreadPoolExecutor(max_workers=GUI_WORKER_THREADS, thread_name_prefix="morel-gui")
+    return _executor
+
+
+class GuiCommand:
+    """
+    One command line running on a worker thread. Its output chunks are put on 'events' as they
+    are produced; when it has finished, 'result' holds (new_path, should_exit) and 'finished'
+    is set. Only the Tk main thread reads them. 'started' is set once a worker thread has
+    picked it up (all of them may be busy). The queue is bounded: if the UI falls behind,
+    the worker (and so the script whose output it reads) waits. cancel() can be called from
+    any thread: it kills the child processes the command started (run, pipelines), stops
+    reading its output and sets the command's CANCEL_EVENT, which 'fg' and 'wait' poll: they
+    stop waiting and leave the jobs running. 'run --inproc' is refused in the GUI, since a
+    script running inside this interpreter could not be stopped.
+    """
+
+    def __init__(self, command_line: str, current_path: str, jobs=None):
+        self.command_line = command_line
+        self.current_path = current_path
+        self.jobs = jobs # The session's JobTable (see JOB_TABLE); None for the process-wide one
+        self.events = queue.Queue(maxsize=GUI_QUEUE_MAX_CHUNKS)
+        self.started = threading.Event()
+        self.cancelled = threading.Event()
+        self.finished = threading.Event()
+        self.result = (current_path, False)
+        self.processes = [] # Filled by the engine through FOREGROUND_PROCESSES
+        self.future = None
+
+    def start(self, executor):
+        self.future = executor.submit(self.run)
+        return self
+
+    def put(self, text: str):
+        """Queues one chunk of output, waiting while the queue is full; dropped once cancelled."""
+        while not self.cancelled.is_set():
+            try:
+                self.events.put(text, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def run(self):
+        """
+        Runs the command the way the GUI terminal needs it: plain text (no Rich markup) and no
+        process-wide chdir, since the GUI keeps its own current path.
+        """
+        self.started.set()
+        plain_token = PLAIN_OUTPUT.set(True)
+        directory_token = CHANGE_DIRECTORY.set(False)
+        processes_token = FOREGROUND_PROCESSES.set(self.processes)
+        cancel_token = CANCEL_EVENT.set(self.cancelled)
+        jobs_token = JOB_TABLE.set(self.jobs)
+        try:
+            output, new_path, should_exit = execute_morel_command(self.command_line, self.current_path)
+            self.result = (new_path, should_exit)
+            if isinstance(output, str):
+                if output:
+                    self.put(output)
             else:
-                output_lines.append(f"F: {entry}")
-        if not output_lines: return f"Directory '{target_path_display}' is empty."
-        return "\n".join(output_lines)
-    except PermissionError:
-        return f"ls: cannot open directory '{target_path_display}': Permission denied"
-    except Exception as e:
-        return f"ls: error accessing '{target_path_display}': {e}"
-
-def cd_command_processor(current_path: str, target_path_arg: str = None) -> tuple[str, str]:
-    if target_path_arg is None or target_path_arg == "" or target_path_arg == "~":
-        resolved_new_path = os.path.expanduser("~")
-        target_path_display = "~"
-    elif os.path.isabs(target_path_arg):
-        resolved_new_path = os.path.abspath(target_path_arg)
-        target_path_display = target_path_arg
-    else:
-        resolved_new_path = os.path.abspath(os.path.join(current_path, target_path_arg))
-        target_path_display = target_path_arg
+                try:
+                    for chunk in output: # Streamed output (ls, run, find, pipelines...) as it is produced
+                        if self.cancelled.is_set():
+                            break
+                        self.put(chunk)
+                finally:
+                    close = getattr(output, "close", None)
+                    if close is not None:
+                        close() # Stops whatever is still producing output
+        except Exception as e:
+            self.put(f"Error: {e}")
+        finally:
+            JOB_TABLE.reset(jobs_token)
+            CANCEL_EVENT.reset(cancel_token)
+            FOREGROUND_PROCESSES.reset(processes_token)
+            CHANGE_DIRECTORY.reset(directory_token)
+            PLAIN_OUTPUT.reset(plain_token)
+            if self.cancelled.is_set():
+                self._kill_processes() # Any started after cancel() was called
+            self.finished.set()
+
+    def cancel(self):
+        self.cancelled.set()
+        if self.future is not None and self.future.cancel(): # Still waiting for a worker thread
+            self.finished.set()
+        elif not self.finished.is_set():
+            self._kill_processes()
+
+    def _kill_processes(self):
+        for process in list(self.processes):
+            try:
+                process.kill()
+            except OSError: # Already exited
+                pass
+
+
+def output_style(text: str) -> str:
+    """The text area tag for a piece of command output: errors are shown in red."""
+    # Heuristic for error messages from execute_morel_command
+    stripped_output_for_check = text.strip().lower()
+    error_keywords = ["error:", "unknown command:", "cd:", "run:", "script not found",
+                      "no such file or directory", "not a python script",
+                      "missing script name", "not a directory", "permission denied"]
+    if any(keyword in stripped_output_for_check for keyword in error_keywords):
+        return "error_output"
+    return "normal_output"
+
+def gui_startgui_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return "GUI is already running.", current_path, False
+
+def gui_snake_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    # The CLI runs Snake with curses in its own terminal; the GUI has none, so it gets a new console
     try:
-        if not os.path.exists(resolved_new_path):
-            return current_path, f"cd: no such file or directory: {target_path_display}"
-        if not os.path.isdir(resolved_new_path):
-            return current_path, f"cd: not a directory: {target_path_display}"
-        os.listdir(resolved_new_path) 
-        return resolved_new_path, ""
-    except PermissionError:
-        return current_path, f"cd: permission denied: {target_path_display}"
+        script_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "games")
+        snake_script_path = os.path.join(script_dir, "snake_game.py")
+
+        if not os.path.exists(snake_script_path):
+            return f"Error: snake_game.py not found in {script_dir}", current_path, False
+        popen_kwargs = {'cwd': script_dir}
+        if os.name == 'nt':
+            popen_kwargs['creationflags'] = subprocess.CREATE_NEW_CONSOLE
+        process = subprocess.Popen([sys.executable, snake_script_path], **popen_kwargs)
+        return (f"Attempting to launch Snake game in a new console window (PID: {process.pid})...\n"
+                "Its output will appear in the new window, not in this GUI terminal."), current_path, False
+    except FileNotFoundError:
+        return "Error: Python interpreter not found. Cannot start Snake game.", current_path, False
     except Exception as e:
-        return current_path, f"cd: an error occurred: {e}"
+        import traceback
+        return f"An error occurred while trying to start the Snake game: {e}\n{traceback.format_exc()}", current_path, False
 
-def run_command_string(current_path: str, script_name_arg: str, script_args: list[str]) -> str:
-    if not script_name_arg:
-        return "run: missing script name"
-    if os.path.isabs(script_name_arg):
-        resolved_script_path = script_name_arg
-    else:
-        resolved_script_path = os.path.abspath(os.path.join(current_path, script_name_arg))
-    if not resolved_script_path.endswith(".py"):
-        return f"run: not a Python script: {script_name_arg}"
-    if not os.path.exists(resolved_script_path) or not os.path.isfile(resolved_script_path):
-        return f"run: script not found: {script_name_arg}"
-    try:
-        completed_process = subprocess.run(
-            [sys.executable, resolved_script_path] + script_args,
-            capture_output=True, text=True, check=False, cwd=current_path
-        )
-        output_parts = []
-        if completed_process.stdout:
-            output_parts.append(f"Output:\n{completed_process.stdout.strip()}")
-        if completed_process.stderr:
-            output_parts.append(f"Errors:\n{completed_process.stderr.strip()}")
-        if not output_parts: return "[Script executed with no output]"
-        return "\n\n".join(output_parts)
-    except Exception as e:
-        return f"run: failed to execute script '{script_name_arg}': {e}"
-
-# --- Central Command Processor (Local to GUI Launcher) ---
-def execute_morel_command(command_line_string: str, current_path: str) -> tuple[str, str, bool]:
-    parts = command_line_string.strip().split()
-    if not parts:
-        return "", current_path, False 
-
-    command = parts[0].lower()
-    args = parts[1:]
-    output_string = ""
-    new_current_path = current_path
-    should_exit_os = False 
-
-    if command == "exit" or command == "quit": # Should be caught by process_terminal_command for GUI
-        output_string = "Exiting Morel OS GUI..." 
-        should_exit_os = True 
-    elif command == "shutdown": # Add shutdown handling for GUI context
-        output_string = "Morel OS GUI is shutting down..."
-        should_exit_os = True
-    elif command == "restart":
-        output_string = "Morel OS is restarting... (Please re-launch the application manually)"
-        should_exit_os = True
-    elif command == "info":
-        output_string = info_command_string()
-    elif command == "info2":
-        output_string = info2_command_string()
-    elif command == "femboy":
-        output_string = femboy_command_string()
-    elif command == "pwd":
-        output_string = pwd_command_string(current_path)
-    elif command == "ls":
-        path_arg = args[0] if args else None
-        output_string = ls_command_string(current_path, path_arg)
-    elif command == "cd":
-        target_arg = args[0] if args else None
-        proposed_path, message = cd_command_processor(current_path, target_arg)
-        if message:
-            output_string = message
-        else:
-            try:
-                # In GUI, we don't actually change the CWD of the GUI app itself
-                # We just update our current_path_in_gui variable.
-                # os.chdir(proposed_path) # No actual chdir for GUI's context
-                new_current_path = proposed_path
-            except Exception as e: # Should not happen if cd_command_processor is robust
-                output_string = f"cd: error updating path to '{proposed_path}': {e}"
-    elif command == "run":
-        script_name = args[0] if args else None
-        script_args_list = args[1:]
-        if not script_name:
-            output_string = "run: missing script name"
-        else:
-            output_string = run_command_string(current_path, script_name, script_args_list)
-    elif command == "startgui": # This command is specific to the CLI morel_os.py
-        output_string = "GUI is already running." # Or "Command not applicable in GUI."
-    elif command == "snake": # This command is specific to the CLI morel_os.py
-        # Launching snake game via subprocess as defined in the previous step
-        try:
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            snake_script_path = os.path.join(script_dir, "snake_game.py")
+COMMAND_REGISTRY.register("startgui", gui_startgui_handler)
+COMMAND_REGISTRY.register("snake", gui_snake_handler)
 
-            if not os.path.exists(snake_script_path):
-                output_string = f"Error: snake_game.py not found in {script_dir}"
-            else:
-                python_executable = sys.executable
-                cmd_list = [python_executable, snake_script_path]
-                popen_kwargs = {'cwd': script_dir}
-                if os.name == 'nt':
-                    popen_kwargs['creationflags'] = subprocess.CREATE_NEW_CONSOLE
-                
-                process = subprocess.Popen(cmd_list, **popen_kwargs)
-                output_string = (f"Attempting to launch Snake game in a new console window (PID: {process.pid})...\n"
-                                 "Its output will appear in the new window, not in this GUI terminal.")
-        except FileNotFoundError:
-            output_string = "Error: Python interpreter not found. Cannot start Snake game."
-        except Exception as e:
-            import traceback
-            output_string = f"An error occurred while trying to start the Snake game: {e}\n{traceback.format_exc()}"
-    else:
-        output_string = f"Unknown command: {command}"
 
-    return output_string, new_current_path, should_exit_os
 
 
-# --- Global Tkinter references ---
-main_text_area = None
-terminal_input_frame = None
-terminal_input_entry = None
-root = None 
-current_path_in_gui = "" 
-
-# --- Helper functions for Text Area ---
-def clear_main_text_area():
-    global main_text_area
-    if main_text_area:
-        main_text_area.config(state=tk.NORMAL)
-        main_text_area.delete('1.0', tk.END)
-        # State is left NORMAL by this helper
-
-def append_to_main_text_area(text_to_append, style_tag="normal_output"): # Added style_tag
-    global main_text_area
-    if main_text_area:
-        main_text_area.config(state=tk.NORMAL)
-        main_text_area.insert(tk.END, text_to_append, style_tag) # Apply style_tag
-        main_text_area.see(tk.END) 
-        # State is left NORMAL by this helper
+# --- Clipboard helpers (shared by every session's context menus) ---
+def copy_selection(text_widget):
+    """Copies the text selected in text_widget to the clipboard."""
+    try:
+        if text_widget.tag_ranges(tk.SEL): # Check if text is selected
+            selected_text = text_widget.get(tk.SEL_FIRST, tk.SEL_LAST)
+            if CLIPBOARD_AVAILABLE and pyperclip:
+                try:
+                    pyperclip.copy(selected_text)
+                    print("DEBUG: Selected text copied to clipboard via pyperclip.")
+                except Exception as e: # Catch Pyperclip specific exceptions if possible
+                    print(f"DEBUG: Error copying with pyperclip: {e}")
+                    # Attempt Tkinter fallback if pyperclip fails unexpectedly
+                    text_widget.clipboard_clear()
+                    text_widget.clipboard_append(selected_text)
+                    print("DEBUG: Pyperclip failed, selected text copied via Tkinter clipboard as fallback.")
+            else: # pyperclip not available, use Tkinter's clipboard
+                text_widget.clipboard_clear()
+                text_widget.clipboard_append(selected_text)
+                print("DEBUG: Selected text copied to clipboard via Tkinter clipboard.")
+    except tk.TclError as e:
+        # This can happen if selection is attempted on an empty range or other Tcl errors
+        print(f"DEBUG: Tkinter clipboard/selection error: {e}")
+
+def paste_into(entry):
+    """Inserts the clipboard's text at the entry's cursor."""
+    try:
+        if CLIPBOARD_AVAILABLE and pyperclip:
+            text_to_paste = pyperclip.paste()
+            print("DEBUG: Pasting from pyperclip.")
+        else: # Fallback to Tkinter's clipboard if pyperclip not available
+            text_to_paste = entry.clipboard_get()
+            print("DEBUG: Pasting from Tkinter clipboard.")
+
+        if text_to_paste:
+            entry.insert(tk.INSERT, text_to_paste)
+            print(f"DEBUG: Pasted: {text_to_paste[:50]}...") # Log a snippet
+
+    except tk.TclError as e: 
+        print(f"DEBUG: Tkinter clipboard paste error: {e}. Clipboard might be empty or content not text.")
+    except Exception as e: 
+        print(f"DEBUG: Error pasting text: {e}")
+
+
+# --- Terminal sessions ---
+class TerminalSession:
+    """
+    One tab of the notebook: a text area with its own current path, command history (Up/Down
+    in the input line), background jobs and running command. Every session's commands run on
+    the one shared worker pool (get_executor). While its tab is hidden, a session keeps
+    collecting its command's output, but only buffers it (see TerminalOutput.pause).
+    """
+
+    def __init__(self, notebook, title: str, current_path: str):
+        self.notebook = notebook
+        self.title = title
+        self.current_path = current_path
+        self.history = [] # Command lines entered in this session, oldest first
+        self._history_position = None # Index into history while browsing with Up/Down
+        self.jobs = JobTable() # Background jobs started in this session ('run ... &')
+        self.running_command = None # The GuiCommand whose output this session is showing, if any
+        self._busy_frame = 0
+
+        self.frame = tk.Frame(notebook, background="white")
+        self.text_area = scrolledtext.ScrolledText(self.frame, wrap=tk.WORD, height=15, width=70)
+        # Configure default appearance and tags for light theme
+        self.text_area.config(background="white", foreground="black", insertbackground="black", font=("Arial", 10))
+        self.text_area.tag_configure("normal_output", foreground="black")
+        self.text_area.tag_configure("error_output", foreground="red")
+        self.text_area.tag_configure("prompt_style", foreground="darkgray", font=("Arial", 10, "bold")) # Bold prompt
+        self.text_area.tag_configure("echoed_command", foreground="darkblue") # Echoed command
+        self.text_area.pack(side=tk.TOP, padx=10, pady=10, fill=tk.BOTH, expand=True)
+        self.output = TerminalOutput(self.text_area) # Batches and bounds what text_area shows
+
+        self.input_frame = tk.Frame(self.frame, background="white") # Packed while the terminal is shown
+        self.input_entry = tk.Entry(self.input_frame, width=60, font=("Arial", 10))
+        self.input_entry.bind("<Return>", self.submit)
+        self.input_entry.bind("<Up>", lambda event: self._browse_history(-1))
+        self.input_entry.bind("<Down>", lambda event: self._browse_history(1))
+        self.input_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0,5))
+        self.cancel_button = tk.Button(self.input_frame, text="Cancel", command=self.cancel, width=10, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.send_button = tk.Button(self.input_frame, text="Send", command=self.submit, width=10)
+        self.send_button.pack(side=tk.RIGHT, padx=(0,5))
+        self.busy_label = tk.Label(self.input_frame, text="", width=10, anchor=tk.W, background="white")
+        self.busy_label.pack(side=tk.RIGHT)
+
+        # --- Context menus: Copy from the text area, Paste into the input line ---
+        text_area_context_menu = tk.Menu(self.frame, tearoff=0)
+        text_area_context_menu.add_command(label="Copy", command=lambda: copy_selection(self.text_area))
+        def show_text_area_context_menu(event):
+            # Disable "Copy" if no text is selected
+            try:
+                has_selection = bool(self.text_area.tag_ranges(tk.SEL))
+            except tk.TclError: # If selection check fails (e.g. widget disposed)
+                has_selection = False
+            text_area_context_menu.entryconfig("Copy", state=tk.NORMAL if has_selection else tk.DISABLED)
+            text_area_context_menu.tk_popup(event.x_root, event.y_root)
+        self.text_area.bind("<Button-3>", show_text_area_context_menu) # Button-3 is usually right-click
+
+        entry_context_menu = tk.Menu(self.input_frame, tearoff=0)
+        entry_context_menu.add_command(label="Paste", command=lambda: paste_into(self.input_entry))
+        def show_entry_context_menu(event):
+            try:
+                entry_context_menu.tk_popup(event.x_root, event.y_root)
+            except tk.TclError as e:
+                print(f"DEBUG: Error showing entry context menu: {e}")
+        self.input_entry.bind("<Button-3>", show_entry_context_menu)
 
-# --- Action functions ---
-def action_show_info():
-    global main_text_area
-    print("DEBUG: 'Show Info' button clicked, updating text area.")
-    
-    info_content = info_command_string() # Calls local info_command_string
+        notebook.add(self.frame, text=title)
 
-    if main_text_area:
-        try:
-            clear_main_text_area()
-            # Use "normal_output" tag for info content. strip_rich_markup is still important.
-            append_to_main_text_area(strip_rich_markup(info_content).strip() + "\n\n", style_tag="normal_output")
-            main_text_area.config(state=tk.DISABLED) 
-        except Exception as e:
-            print(f"DEBUG: Error updating main_text_area in action_show_info: {e}")
-    else:
-        print("DEBUG_ERROR: main_text_area is None in action_show_info.")
+    # --- Output ---
+    def append(self, text_to_append, style_tag="normal_output"):
+        # Inserted with the rest of this frame's output by self.output (see gui_terminal.py);
+        # the widget's state (NORMAL or DISABLED) is kept as it is when the insert happens
+        self.output.append(text_to_append, style_tag)
 
+    def clear(self):
+        self.output.clear() # State is left NORMAL
 
-def process_terminal_command(event=None): 
-    global main_text_area, terminal_input_entry, current_path_in_gui, root
-    
-    if not terminal_input_entry or not main_text_area:
-        print("DEBUG_ERROR: Terminal components not ready for processing command.")
-        return
+    def set_visible(self, visible: bool):
+        """Called when the session's tab is selected or hidden: hidden tabs only buffer output."""
+        if visible:
+            self.output.resume()
+        else:
+            self.output.pause()
 
-    command_str = terminal_input_entry.get().strip()
-    terminal_input_entry.delete(0, tk.END)
+    def prompt(self):
+        self.append(f"{self.current_path}> ", "prompt_style")
 
-    # Echo the command with the current path using "echoed_command" or "prompt_style"
-    append_to_main_text_area(f"{current_path_in_gui}> ", "prompt_style")
-    append_to_main_text_area(f"{command_str}\n", "echoed_command") # Or use normal_output
+    def show_info(self):
+        info_content = info_command_string(GUI_OS_NAME)
+        try:
+            self.clear()
+            # strip_rich_markup is still important: info is written for the Rich console
+            self.append(strip_rich_markup(info_content).strip() + "\n\n", "normal_output")
+            self.text_area.config(state=tk.DISABLED) 
+        except Exception as e:
+            print(f"DEBUG: Error updating the text area in show_info: {e}")
+
+    # --- Terminal mode ---
+    @property
+    def terminal_visible(self) -> bool:
+        return bool(self.input_frame.winfo_manager())
+
+    def show_terminal(self):
+        self.input_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(0,10), before=self.text_area)
+        self.clear()
+        self.append("Terminal mode activated.\n", "normal_output")
+        self.prompt()
+        self.input_entry.focus_set()
+
+    def hide_terminal(self):
+        self.detach_running_command() # Its output would have nowhere to go
+        self.input_frame.pack_forget()
+        self.clear()
+        self.append("Terminal hidden. Info mode active.\n"
+                    "Click 'Show Info' or 'Toggle Terminal' again.\n", "normal_output")
+        self.text_area.config(state=tk.DISABLED) 
+
+    def toggle_terminal(self):
+        if self.terminal_visible:
+            self.hide_terminal()
+        else:
+            self.show_terminal()
+
+    def _browse_history(self, step: int):
+        if not self.history:
+            return "break"
+        if self._history_position is None:
+            self._history_position = len(self.history)
+        self._history_position = max(0, min(len(self.history), self._history_position + step))
+        self.input_entry.delete(0, tk.END)
+        if self._history_position < len(self.history):
+            self.input_entry.insert(0, self.history[self._history_position])
+        return "break" # Keep Tk's default Up/Down handling out of it
+
+    # --- Commands ---
+    def submit(self, event=None):
+        if self.running_command is not None: # One command at a time; the typed line stays in the entry
+            self.input_entry.bell()
+            return
+        command_str = self.input_entry.get().strip()
+        self.input_entry.delete(0, tk.END)
+        self.run_line(command_str)
+
+    def run_line(self, command_str: str) -> bool:
+        """Runs a command line as if it had been typed. Returns False if a command is already running."""
+        if self.running_command is not None:
+            self.input_entry.bell()
+            return False
+        self._history_position = None
+
+        # Echo the command with the current path
+        self.prompt()
+        self.append(f"{command_str}\n", "echoed_command")
+
+        if not command_str: 
+            self.prompt()
+            return True
+        if not self.history or self.history[-1] != command_str:
+            self.history.append(command_str)
+
+        if command_str.lower() == "clear":
+            self.clear()
+            self.prompt()
+            return True
+        elif command_str.lower() in ["exit", "quit"]: 
+            self.append("Terminal mode deactivated.\n", "normal_output")
+            self.hide_terminal() 
+            return True
+
+        self.start_command(GuiCommand(command_str, self.current_path, self.jobs).start(get_executor()))
+        return True
+
+    def start_command(self, command: GuiCommand):
+        """Shows the output of an already started command as it arrives."""
+        self.running_command = command
+        self.set_busy(True)
+        self.frame.after(GUI_POLL_MS, self.drain, command)
+
+    def drain(self, command: GuiCommand):
+        """Called on the main thread every GUI_POLL_MS while a command runs: shows the output it has produced."""
+        if command is not self.running_command: # Detached: the terminal was hidden or the tab closed
+            return
+        done = command.finished.is_set() # Checked first: all output put before it was set is now queued
+        deadline = time.perf_counter() + GUI_POLL_BUDGET_MS / 1000
+        while True:
+            try:
+                chunk = command.events.get_nowait()
+            except queue.Empty:
+                break
+            plain_output = strip_rich_markup(chunk)
+            if not plain_output.endswith("\n"):
+                plain_output += "\n"
+            self.append(plain_output, output_style(plain_output))
+            if time.perf_counter() > deadline: # Leave the rest for the next call, so the window stays responsive
+                done = False
+                break
+
+        if not done:
+            self._busy_frame = (self._busy_frame + 1) % len(_BUSY_FRAMES)
+            if not self.output.paused:
+                self.busy_label.config(text=self._busy_text(command))
+            self.frame.after(GUI_POLL_MS, self.drain, command)
+            return
+
+        new_path, should_exit_os = command.result
+        self.running_command = None
+        self.set_busy(False)
+        self.current_path = new_path
+        sync_explorer(self) # The command may have changed directory or created files
+        if command.cancelled.is_set():
+            self.append("[Cancelled]\n", "error_output")
+        # Like the shell's prompt: announce this session's background jobs that have finished
+        for notification in self.jobs.finished_notifications():
+            self.append(notification + "\n", "normal_output")
+        if should_exit_os: 
+            self.append("Morel OS 'exit' command received. Closing GUI launcher.\n", "error_output")
+            self.frame.quit() 
+            return 
+        self.prompt()
+
+    def _busy_text(self, command: GuiCommand) -> str:
+        if not command.started.is_set():
+            return "Waiting" # Every worker thread is busy with other sessions' commands
+        return f"Running {_BUSY_FRAMES[self._busy_frame]}"
+
+    def set_busy(self, busy: bool):
+        """Shows or hides the busy indicator (also on the tab) and enables Cancel while a command runs."""
+        self.busy_label.config(text=self._busy_text(self.running_command) if busy else "")
+        self.cancel_button.config(state=tk.NORMAL if busy else tk.DISABLED)
+        self.send_button.config(state=tk.DISABLED if busy else tk.NORMAL)
+        self.text_area.config(cursor="watch" if busy else "xterm")
+        self.notebook.tab(self.frame, text=f"{self.title} *" if busy else self.title)
+
+    def cancel(self):
+        """Cancel button: kills the running command's child processes. Its remaining output is still collected."""
+        if self.running_command is not None:
+            self.running_command.cancel()
+
+    def detach_running_command(self):
+        """Cancels the running command and stops showing its output."""
+        if self.running_command is not None:
+            self.running_command.cancel()
+            self.running_command = None
+            self.set_busy(False)
+
+    def close(self):
+        """Stops everything the session started and removes its tab."""
+        self.detach_running_command()
+        self.jobs.terminate_all()
+        self.notebook.forget(self.frame)
+        self.frame.destroy()
 
-    if not command_str: 
-        append_to_main_text_area(f"{current_path_in_gui}> ", "prompt_style") 
-        return
 
-    if command_str.lower() == "clear":
-        clear_main_text_area()
-        append_to_main_text_area(f"{current_path_in_gui}> ", "prompt_style") 
+# --- Global Tkinter references ---
+root = None 
+notebook = None
+explorer = None # FileExplorer showing the current session's directory
+sessions = [] # TerminalSession objects, in tab order
+_session_count = 0 # For the "Session N" tab titles
+
+def current_session():
+    """The session whose tab is selected."""
+    if not notebook or not sessions:
+        return None
+    selected = notebook.select()
+    for session in sessions:
+        if str(session.frame) == selected:
+            return session
+    return sessions[0]
+
+def new_session(current_path: str) -> TerminalSession:
+    global _session_count
+    _session_count += 1
+    session = TerminalSession(notebook, f"Session {_session_count}", current_path)
+    sessions.append(session)
+    return session
+
+def on_tab_changed(event=None):
+    selected = current_session()
+    for session in sessions:
+        session.set_visible(session is selected)
+    if selected:
+        sync_explorer(selected)
+
+def sync_explorer(session: TerminalSession):
+    """Shows the session's directory in the explorer, if it is the selected session."""
+    if explorer and session is current_session():
+        explorer.show(session.current_path)
+
+def on_explorer_activate(path: str, is_dir: bool):
+    """Double-click in the explorer: 'cd' into a directory or 'run' a Python script in the current session."""
+    session = current_session()
+    if session is None:
         return
-    elif command_str.lower() in ["exit", "quit"]: 
-        append_to_main_text_area("Terminal mode deactivated.\n", "normal_output")
-        action_toggle_terminal() 
+    if is_dir:
+        command_str = f"cd {shlex.quote(path)}"
+    elif path.endswith(".py"):
+        command_str = f"run {shlex.quote(path)}"
+    else:
+        root.bell()
         return
+    if not session.terminal_visible:
+        session.show_terminal()
+    session.run_line(command_str)
 
-    print(f"DEBUG: GUI calling LOCAL execute_morel_command with: '{command_str}', path: '{current_path_in_gui}'")
-    output_str, new_path, should_exit_os = execute_morel_command(command_str, current_path_in_gui)
-    print(f"DEBUG: GUI received from LOCAL execute_morel_command: output='{output_str[:50].replace('\n', ' ')}...', new_path='{new_path}', exit={should_exit_os}")
-    
-    current_path_in_gui = new_path 
-    
-    if output_str:
-        plain_output = strip_rich_markup(output_str)
-        current_style = "normal_output"
-        # Heuristic for error messages from execute_morel_command
-        stripped_output_for_check = plain_output.strip().lower()
-        error_keywords = ["error:", "unknown command:", "cd:", "run:", "script not found", 
-                          "no such file or directory", "not a python script", 
-                          "missing script name", "not a directory", "permission denied"]
-        if any(keyword in stripped_output_for_check for keyword in error_keywords):
-            current_style = "error_output"
-        
-        if not plain_output.endswith("\n"):
-            plain_output += "\n"
-        append_to_main_text_area(plain_output, current_style)
-
-    if should_exit_os: 
-        append_to_main_text_area("Morel OS 'exit' command received. Closing GUI launcher.\n", "error_output")
-        if root: 
-            root.quit() 
-        return 
-
-    append_to_main_text_area(f"{current_path_in_gui}> ", "prompt_style") 
+# --- Action functions ---
+def action_show_info():
+    print("DEBUG: 'Show Info' button clicked, updating text area.")
+    session = current_session()
+    if session:
+        session.show_info()
+    else:
+        print("DEBUG_ERROR: No session in action_show_info.")
 
 def action_toggle_terminal():
-    global main_text_area, terminal_input_frame, terminal_input_entry, root, current_path_in_gui
     print("DEBUG: 'Toggle Terminal' button clicked.")
-
-    if not root: 
-        print("DEBUG_ERROR: Root window not available for terminal toggle.")
+    session = current_session()
+    if session:
+        session.toggle_terminal()
+    else:
+        print("DEBUG_ERROR: No session available for terminal toggle.")
+
+def action_new_session():
+    """Opens a terminal in a new tab, starting in the current session's directory."""
+    current = current_session()
+    session = new_session(current.current_path if current else os.getcwd())
+    notebook.select(session.frame)
+    session.show_terminal()
+
+def action_close_session():
+    session = current_session()
+    if session is None or len(sessions) == 1: # The last tab stays
+        root.bell()
         return
-
-    if terminal_input_frame is None: 
-        print("DEBUG: Creating terminal UI elements for the first time.")
-        terminal_input_frame = tk.Frame(root)
-        terminal_input_frame.config(background="white") # Set frame background
-        
-        terminal_input_entry = tk.Entry(terminal_input_frame, width=60, font=("Arial", 10))
-        terminal_input_entry.bind("<Return>", process_terminal_command)
-        terminal_input_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0,5))
-
-        send_button = tk.Button(terminal_input_frame, text="Send", command=process_terminal_command, width=10)
-        send_button.pack(side=tk.RIGHT)
-
-        # --- Context Menu for terminal_input_entry ---
-        entry_context_menu = tk.Menu(terminal_input_frame, tearoff=0)
-
-        def entry_paste_text():
-            global terminal_input_entry, root, CLIPBOARD_AVAILABLE, pyperclip # Access globals
-            if not terminal_input_entry: return
-
-            try:
-                text_to_paste = ""
-                if CLIPBOARD_AVAILABLE and pyperclip:
-                    text_to_paste = pyperclip.paste()
-                    print("DEBUG: Pasting from pyperclip.")
-                elif root: # Fallback to Tkinter's clipboard if pyperclip not available
-                    text_to_paste = root.clipboard_get()
-                    print("DEBUG: Pasting from Tkinter clipboard.")
-                else: # Should not happen if root exists
-                    print("DEBUG: Root not available for Tkinter clipboard.")
-                    return
-                
-                if text_to_paste:
-                    terminal_input_entry.insert(tk.INSERT, text_to_paste)
-                    print(f"DEBUG: Pasted: {text_to_paste[:50]}...") # Log a snippet
-
-            except tk.TclError as e: 
-                print(f"DEBUG: Tkinter clipboard paste error: {e}. Clipboard might be empty or content not text.")
-            except Exception as e: 
-                print(f"DEBUG: Error pasting text: {e}")
-
-        entry_context_menu.add_command(label="Paste", command=entry_paste_text)
-
-        def show_entry_context_menu(event):
-            global CLIPBOARD_AVAILABLE, pyperclip, root # Access globals
-            # Always enable Paste for now, let paste handler manage empty.
-            # More complex checks could be added here if desired.
-            entry_context_menu.entryconfig("Paste", state=tk.NORMAL)
-            try:
-                entry_context_menu.tk_popup(event.x_root, event.y_root)
-            except tk.TclError as e:
-                print(f"DEBUG: Error showing entry context menu: {e}")
-
-
-        terminal_input_entry.bind("<Button-3>", show_entry_context_menu)
-
-    if not terminal_input_frame.winfo_ismapped(): 
-        print("DEBUG: Terminal is hidden, showing it.")
-        terminal_input_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=(5,10)) 
-        
-        clear_main_text_area()
-        append_to_main_text_area("Terminal mode activated.\n", "normal_output")
-        append_to_main_text_area(f"{current_path_in_gui}> ", "prompt_style")
-        main_text_area.config(state=tk.NORMAL) 
-        if terminal_input_entry:
-            terminal_input_entry.focus_set()
-    else: 
-        print("DEBUG: Terminal is visible, hiding it.")
-        terminal_input_frame.pack_forget()
-        clear_main_text_area()
-        append_to_main_text_area("Terminal hidden. Info mode active.\n"
-                                 "Click 'Show Info' or 'Toggle Terminal' again.\n", "normal_output")
-        main_text_area.config(state=tk.DISABLED) 
+    sessions.remove(session)
+    session.close()
 
 
 if __name__ == "__main__":
@@ -466,19 +582,26 @@ if __name__ == "__main__":
 
     terminal_button = tk.Button(command_button_frame, text="Toggle Terminal", command=action_toggle_terminal, width=button_width)
     terminal_button.pack(side=tk.LEFT, padx=5)
+
+    new_session_button = tk.Button(command_button_frame, text="New Session", command=action_new_session, width=button_width)
+    new_session_button.pack(side=tk.LEFT, padx=5)
+
+    close_session_button = tk.Button(command_button_frame, text="Close Session", command=action_close_session, width=button_width)
+    close_session_button.pack(side=tk.LEFT, padx=5)
     
     exit_button = tk.Button(command_button_frame, text="Exit", command=root.quit, width=button_width)
     exit_button.pack(side=tk.RIGHT, padx=5)
 
-    main_text_area = scrolledtext.ScrolledText(root, wrap=tk.WORD, height=15, width=70)
-    # Configure default appearance and tags for light theme
-    main_text_area.config(background="white", foreground="black", insertbackground="black", font=("Arial", 10)) # Added font
-    main_text_area.tag_configure("normal_output", foreground="black")
-    main_text_area.tag_configure("error_output", foreground="red")
-    main_text_area.tag_configure("prompt_style", foreground="darkgray", font=("Arial", 10, "bold")) # Bold prompt
-    main_text_area.tag_configure("echoed_command", foreground="darkblue") # Echoed command
+    # The explorer is docked to the left of the terminal tabs; the divider can be dragged
+    panes = ttk.PanedWindow(root, orient=tk.HORIZONTAL)
+    panes.pack(padx=10, pady=(0,10), fill=tk.BOTH, expand=True)
+    explorer = FileExplorer(panes, on_explorer_activate)
+    panes.add(explorer.frame, weight=1)
+    notebook = ttk.Notebook(panes)
+    panes.add(notebook, weight=3)
+    notebook.bind("<<NotebookTabChanged>>", on_tab_changed)
 
-    main_text_area.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+    first_session = new_session(os.getcwd())
     
     initial_message = """Welcome to Morel OS Graphical Launcher!
 
@@ -486,65 +609,25 @@ Click 'Show Info' to display system information in this area.
 Click 'Toggle Terminal' to activate a basic command line interface here.
 When terminal is active, you can type commands like 'echo [your message]' or 'clear'.
 Type 'exit' or 'quit' in the terminal to hide it.
+Click 'New Session' to open another terminal in its own tab; each tab has its own
+current directory, command history and background jobs.
+The explorer on the left shows the current directory: double-click a folder to 'cd'
+into it, or a Python script to 'run' it.
 
 Use the main 'Exit' button to close this launcher.
 """
     # Insert initial message with "normal_output" tag
-    main_text_area.config(state=tk.NORMAL)
-    main_text_area.insert(tk.END, initial_message, "normal_output") # Apply normal_output tag
-    main_text_area.config(state=tk.DISABLED)
-
-    current_path_in_gui = os.getcwd()
-    print(f"DEBUG: Initial current_path_in_gui: {current_path_in_gui}")
-
-    # --- Context Menu for main_text_area ---
-    text_area_context_menu = tk.Menu(root, tearoff=0)
-
-    def text_area_copy_selection():
-        global main_text_area, root # Ensure access to root for clipboard
-        if not main_text_area: return
-        try:
-            if main_text_area.tag_ranges(tk.SEL): # Check if text is selected
-                selected_text = main_text_area.get(tk.SEL_FIRST, tk.SEL_LAST)
-                if CLIPBOARD_AVAILABLE and pyperclip:
-                    try:
-                        pyperclip.copy(selected_text)
-                        print("DEBUG: Selected text copied to clipboard via pyperclip.")
-                    except Exception as e: # Catch Pyperclip specific exceptions if possible
-                        print(f"DEBUG: Error copying with pyperclip: {e}")
-                        # Attempt Tkinter fallback if pyperclip fails unexpectedly
-                        if root: # Check if root is available
-                            root.clipboard_clear()
-                            root.clipboard_append(selected_text)
-                            print("DEBUG: Pyperclip failed, selected text copied via Tkinter clipboard as fallback.")
-                elif root: # pyperclip not available, use Tkinter's clipboard
-                    root.clipboard_clear()
-                    root.clipboard_append(selected_text)
-                    print("DEBUG: Selected text copied to clipboard via Tkinter clipboard.")
-        except tk.TclError as e:
-            # This can happen if selection is attempted on an empty range or other Tcl errors
-            print(f"DEBUG: Tkinter clipboard/selection error: {e}")
-
-    text_area_context_menu.add_command(label="Copy", command=text_area_copy_selection)
-
-    def show_text_area_context_menu(event):
-        global main_text_area # Ensure access
-        if not main_text_area: return
-        # Display the menu at the click position
-        # Disable "Copy" if no text is selected
-        try:
-            if main_text_area.tag_ranges(tk.SEL):
-                text_area_context_menu.entryconfig("Copy", state=tk.NORMAL)
-            else:
-                text_area_context_menu.entryconfig("Copy", state=tk.DISABLED)
-        except tk.TclError: # If selection check fails (e.g. widget disposed)
-                text_area_context_menu.entryconfig("Copy", state=tk.DISABLED)
-        
-        text_area_context_menu.tk_popup(event.x_root, event.y_root)
-
-    main_text_area.bind("<Button-3>", show_text_area_context_menu) # Button-3 is usually right-click
+    first_session.text_area.insert(tk.END, initial_message, "normal_output")
+    first_session.text_area.config(state=tk.DISABLED)
 
-
-    root.minsize(600, 450) 
+    root.minsize(960, 450) 
     
     root.mainloop()
+
+    # Closing the window must not leave a running script or background job behind
+    for session in sessions:
+        session.detach_running_command()
+        session.jobs.terminate_all()
+    explorer.close()
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
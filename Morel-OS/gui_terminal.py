@@ -0,0 +1,139 @@
+"""
+The GUI terminal's output pane: a Tk Text widget with bounded scrollback and batched inserts.
+
+Output is not inserted into the widget as it arrives. append() adds it to a pending list,
+and one flush per frame (GUI_FRAME_MS, scheduled with after()) inserts everything pending
+in a single Text.insert call and scrolls to the end once. A command printing thousands
+of lines a second costs the UI one insert per frame, not one (plus a see()) per chunk.
+Each flush inserts at most about GUI_FRAME_MAX_LINES lines and leaves the rest for the
+next frame, so one flush never holds the event loop for long.
+
+The widget keeps at most max_lines lines (GUI_SCROLLBACK_LINES; the MOREL_GUI_SCROLLBACK
+environment variable overrides it, 0 means unlimited). Lines are deleted from the top in
+blocks of GUI_TRIM_BLOCK_LINES once the text is that far over the cap, so the delete
+happens once per block instead of on every frame. Pending output that would be trimmed
+as soon as it was inserted never reaches Tk: when a command produces output faster than
+it can be shown, only its last max_lines lines are inserted.
+
+A paused TerminalOutput (the GUI pauses the sessions whose tab is hidden) only buffers:
+nothing is inserted until resume(), and the buffer is bounded by the same cap.
+"""
+import os
+from collections import deque
+
+GUI_SCROLLBACK_LINES = int(os.environ.get("MOREL_GUI_SCROLLBACK", "10000"))
+GUI_TRIM_BLOCK_LINES = 1000 # Lines deleted at once when the widget goes over the cap
+GUI_FRAME_MS = 16 # At most one insert per frame (about 60 per second)
+GUI_FRAME_MAX_LINES = 2000 # Lines inserted by one flush; the rest waits for the next frame
+
+
+def last_lines(text: str, count: int) -> str:
+    """The last 'count' lines of text (a trailing newline does not start another line)."""
+    end = len(text) - 1 if text.endswith("\n") else len(text)
+    position = end
+    for _ in range(count):
+        position = text.rfind("\n", 0, position)
+        if position < 0:
+            return text
+    return text[position + 1:]
+
+
+class TerminalOutput:
+    """Batches and bounds what is written to one Text widget (see the module docstring)."""
+
+    def __init__(self, text_widget, max_lines: int = GUI_SCROLLBACK_LINES):
+        self.text = text_widget
+        self.max_lines = max_lines
+        self._pending = deque() # (text, tag) not inserted yet, oldest first
+        self._pending_lines = 0 # Newlines in _pending
+        self._replace = False # The pending output alone fills the scrollback: delete the widget's text first
+        self._flush_id = None
+        self.paused = False
+        self.flushes = 0 # Inserts done, for benchmarks/bench_gui_output.py
+
+    @property
+    def pending(self) -> bool:
+        """Whether output is waiting for the next flush."""
+        return bool(self._pending)
+
+    def append(self, text: str, tag: str = "normal_output"):
+        if not text:
+            return
+        self._pending.append((text, tag))
+        self._pending_lines += text.count("\n")
+        if self.max_lines and self._pending_lines > self.max_lines:
+            self._drop_overflow()
+        if self._flush_id is None and not self.paused:
+            self._flush_id = self.text.after(GUI_FRAME_MS, self.flush)
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+        if self._pending and self._flush_id is None:
+            self._flush_id = self.text.after(GUI_FRAME_MS, self.flush)
+
+    def _drop_overflow(self):
+        """Discards pending output older than the last max_lines lines: it would be trimmed right away."""
+        while len(self._pending) > 1:
+            lines = self._pending[0][0].count("\n")
+            if self._pending_lines - lines < self.max_lines:
+                break
+            self._pending.popleft()
+            self._pending_lines -= lines
+        first_text, first_tag = self._pending[0]
+        if self._pending_lines > self.max_lines: # One chunk is longer than the whole scrollback
+            kept = last_lines(first_text, self.max_lines - (self._pending_lines - first_text.count("\n")))
+            self._pending[0] = (kept, first_tag)
+            self._pending_lines -= first_text.count("\n") - kept.count("\n")
+        self._replace = True
+
+    def flush(self):
+        """Inserts pending output (one Text.insert), trims the scrollback and scrolls to the end."""
+        self._flush_id = None
+        if self.paused or not self._pending:
+            return
+        runs = [] # [tag, [texts]] with consecutive chunks of the same tag joined
+        lines = 0
+        while self._pending and lines < GUI_FRAME_MAX_LINES:
+            chunk, tag = self._pending.popleft()
+            chunk_lines = chunk.count("\n")
+            lines += chunk_lines
+            self._pending_lines -= chunk_lines
+            if runs and runs[-1][0] == tag:
+                runs[-1][1].append(chunk)
+            else:
+                runs.append([tag, [chunk]])
+        insert_args = []
+        for tag, texts in runs:
+            insert_args += ["".join(texts), tag]
+
+        state = self.text.cget("state")
+        self.text.config(state="normal")
+        if self._replace:
+            self.text.delete("1.0", "end")
+            self._replace = False
+        self.text.insert("end", *insert_args)
+        self._trim()
+        self.text.config(state=state)
+        self.text.see("end")
+        self.flushes += 1
+        if self._pending:
+            self._flush_id = self.text.after(GUI_FRAME_MS, self.flush)
+
+    def _trim(self):
+        if not self.max_lines:
+            return
+        line_count = int(self.text.index("end-1c").split(".")[0])
+        excess = line_count - self.max_lines
+        if excess >= GUI_TRIM_BLOCK_LINES:
+            self.text.delete("1.0", f"{excess + 1}.0")
+
+    def clear(self):
+        """Deletes everything shown and everything pending. The widget is left editable, as before."""
+        self._pending.clear()
+        self._pending_lines = 0
+        self._replace = False
+        self.text.config(state="normal")
+        self.text.delete("1.0", "end")
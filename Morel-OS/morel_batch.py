@@ -0,0 +1,154 @@
+"""
+Non-interactive use of Morel OS: running many command lines without the prompt.
+
+  python morel_os.py -c "ls" -c "cd docs" -c "ls -l"  - run the given commands in order
+  python morel_os.py script.morel                      - run a file of commands ('-' reads stdin)
+  python morel_os.py --json ...                        - print one JSON object per command
+
+Commands go straight to execute_morel_command: no prompt is built and Rich is never
+imported, and output is plain text (PLAIN_OUTPUT is set, as for a pipeline stage that
+writes to a file), and INTERACTIVE is cleared, so commands that normally finish their work
+in the background (e.g. 'locate --add-root') do it before returning. In a script, blank
+lines and lines starting with '#' are skipped.
+'cd' carries over to the following commands, and 'shutdown' ends the batch.
+
+The exit status is 1 if any command line could not be run at all (an unknown command or a
+parse error, see ENGINE_ERROR_PREFIXES), else 0. Morel commands have no exit status of their
+own: a command that fails (e.g. 'cd' to a missing directory, or a script that 'run' started
+exiting non-zero) reports it in its output only, and does not change the batch's status.
+
+From Python, run_commands() takes any iterable of command lines and yields a
+CommandResult (output, new path, exit flag, duration) per command:
+
+    from morel_batch import run_commands
+    for result in run_commands(["cd /tmp", "ls"]):
+        print(result.path, result.duration, result.output)
+"""
+import json
+import os
+import sys
+import time
+
+from morel_commands import INTERACTIVE, PLAIN_OUTPUT
+
+
+# How execute_morel_command answers a command line it could not run at all
+ENGINE_ERROR_PREFIXES = ("Unknown command: ", "Error parsing command: ")
+
+
+def is_engine_error(output) -> bool:
+    return isinstance(output, str) and output.startswith(ENGINE_ERROR_PREFIXES)
+
+
+class CommandResult:
+    """The outcome of one command line run by run_commands()."""
+
+    __slots__ = ("command", "output", "path", "should_exit", "duration")
+
+    def __init__(self, command: str, output: str, path: str, should_exit: bool, duration: float):
+        self.command = command
+        self.output = output # Streamed output already joined into one string
+        self.path = path # Current path after the command
+        self.should_exit = should_exit
+        self.duration = duration # Seconds, including producing all of the output
+
+    @property
+    def failed(self) -> bool:
+        """True if the command line could not be run at all (see ENGINE_ERROR_PREFIXES)."""
+        return is_engine_error(self.output)
+
+    def to_dict(self) -> dict:
+        return {"command": self.command, "output": self.output, "path": self.path,
+                "exit": self.should_exit, "error": self.failed, "duration_ms": round(self.duration * 1000, 3)}
+
+    def __repr__(self):
+        return f"CommandResult({self.command!r}, path={self.path!r}, exit={self.should_exit}, {self.duration * 1000:.1f} ms)"
+
+
+def script_lines(lines):
+    """The command lines of a script: without newlines, blank lines or '#' comments."""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def _default_execute():
+    from morel_engine import execute_morel_command
+    return execute_morel_command
+
+
+def _execute(execute, command_line: str, current_path: str, on_chunk=None):
+    """Runs one command with plain output. Returns (output, new_path, should_exit, seconds)."""
+    started = time.perf_counter()
+    token = PLAIN_OUTPUT.set(True)
+    interactive_token = INTERACTIVE.set(False)
+    try:
+        output, new_path, should_exit = execute(command_line, current_path)
+        if not isinstance(output, str):
+            chunks = []
+            for chunk in output:
+                if on_chunk is not None:
+                    on_chunk(chunk)
+                else:
+                    chunks.append(chunk)
+            output = "\n".join(chunks)
+        elif on_chunk is not None and output:
+            on_chunk(output)
+    finally:
+        INTERACTIVE.reset(interactive_token)
+        PLAIN_OUTPUT.reset(token)
+    return output, new_path, should_exit, time.perf_counter() - started
+
+
+def run_commands(command_lines, current_path: str = None, stop_on_exit: bool = True, execute=None):
+    """
+    Runs command lines one after another and yields a CommandResult for each.
+    The current path starts at current_path (default: the process's working directory)
+    and follows 'cd'. With stop_on_exit, a command that exits ('shutdown') ends the run.
+    execute defaults to morel_engine.execute_morel_command.
+    """
+    execute = execute or _default_execute()
+    current_path = current_path or os.getcwd()
+    for command_line in command_lines:
+        output, current_path, should_exit, duration = _execute(execute, command_line, current_path)
+        yield CommandResult(command_line, output, current_path, should_exit, duration)
+        if should_exit and stop_on_exit:
+            return
+
+
+def run_batch(command_lines, json_lines: bool = False, out=None, execute=None) -> int:
+    """
+    The morel_os.py batch mode: prints each command's output (streamed as it is produced)
+    or, with json_lines, one JSON object per command. Returns the process exit status:
+    1 if any command line could not be run (see the module docstring), else 0.
+    """
+    out = out or sys.stdout
+    execute = execute or _default_execute()
+    failed = False
+    if json_lines:
+        for result in run_commands(command_lines, execute=execute):
+            out.write(json.dumps(result.to_dict()) + "\n")
+            failed = failed or result.failed
+        out.flush()
+        return 1 if failed else 0
+
+    def print_chunk(chunk: str):
+        out.write(chunk + "\n")
+
+    current_path = os.getcwd()
+    for command_line in command_lines:
+        output, current_path, should_exit, _ = _execute(execute, command_line, current_path, on_chunk=print_chunk)
+        failed = failed or is_engine_error(output)
+        if should_exit:
+            break
+    out.flush()
+    return 1 if failed else 0
+
+
+def open_script(path: str):
+    """Returns the command lines of a script file ('-' for stdin). Raises OSError."""
+    if path == "-":
+        return script_lines(sys.stdin)
+    with open(path, "r", encoding="utf-8") as f:
+        return list(script_lines(f))
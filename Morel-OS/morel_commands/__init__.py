@@ -0,0 +1,116 @@
+"""
+Command registry for Morel OS.
+
+execute_morel_command looks commands up here instead of walking an if/elif
+chain, so dispatch is a single dict lookup no matter how many commands exist.
+
+Every handler is called as handler(args, current_path) and returns the same
+(output_string, new_current_path, should_exit) tuple as execute_morel_command.
+Commands registered with reads_input=True (filters such as 'head') can also be
+given the output of the previous pipeline stage as handler(args, current_path,
+stdin=line_batches), an iterator of lists of lines (see pipeline.py).
+Handlers that live in their own module are registered as LazyCommand objects,
+so that module (and whatever it imports) is only loaded the first time the
+command is actually used.
+"""
+import importlib
+from contextvars import ContextVar
+
+# True while a handler is called for a pipeline stage whose output goes to another
+# command or a file rather than the terminal: such output must not contain Rich markup.
+PLAIN_OUTPUT = ContextVar("morel_plain_output", default=False)
+
+# Whether 'cd' also changes the process's working directory. Front ends that keep a
+# current path per session (the GUI) set it to False.
+CHANGE_DIRECTORY = ContextVar("morel_change_directory", default=True)
+
+# When set to a list, every child process a foreground command starts is appended to it
+# (anything with a kill() method), so a front end can cancel the command by killing them.
+# Background jobs are not tracked.
+FOREGROUND_PROCESSES = ContextVar("morel_foreground_processes", default=None)
+
+# A threading.Event that a front end sets to cancel the running command (the GUI's Cancel
+# button). Killing the FOREGROUND_PROCESSES stops most commands; those that block without
+# a child process of their own (fg, wait) poll this event instead and give up when it is set.
+CANCEL_EVENT = ContextVar("morel_cancel_event", default=None)
+
+# False while commands run from a script or -c (morel_batch.py). The process may then exit as
+# soon as the last command returns, so a command must not leave work it depends on (such as
+# building locate's index) to a background thread alone.
+INTERACTIVE = ContextVar("morel_interactive", default=True)
+
+# The JobTable used by 'run ... &', jobs, fg, wait and kill; None means the shell's own
+# (jobs.JOBS). The GUI gives each terminal session its own table.
+JOB_TABLE = ContextVar("morel_job_table", default=None)
+
+
+def track_foreground_process(process):
+    """Records a child process of the running command, if the caller is tracking them."""
+    processes = FOREGROUND_PROCESSES.get()
+    if processes is not None:
+        processes.append(process)
+
+
+class LazyCommand:
+    """A handler that imports 'module_name' and looks up 'attr_name' on first call."""
+
+    def __init__(self, module_name: str, attr_name: str):
+        self.module_name = module_name
+        self.attr_name = attr_name
+        self._target = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def resolve(self):
+        """Imports the handler module (once) and returns the real handler."""
+        if self._target is None:
+            module = importlib.import_module(self.module_name)
+            self._target = getattr(module, self.attr_name)
+        return self._target
+
+    def __call__(self, args: list[str], current_path: str, **kwargs) -> tuple[str, str, bool]:
+        return self.resolve()(args, current_path, **kwargs)
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"LazyCommand({self.module_name}:{self.attr_name}, {state})"
+
+
+class CommandRegistry:
+    """Maps command names and aliases to handlers."""
+
+    def __init__(self):
+        self._handlers = {}
+        self._aliases = {} # alias -> primary command name
+        self._input_readers = set() # Primary names of commands that accept stdin=
+
+    def register(self, name: str, handler, aliases: tuple[str, ...] = (), reads_input: bool = False):
+        name = name.lower()
+        self._handlers[name] = handler
+        for alias in aliases:
+            alias = alias.lower()
+            self._handlers[alias] = handler
+            self._aliases[alias] = name
+        if reads_input:
+            self._input_readers.add(name)
+
+    def get(self, name: str):
+        """Returns the handler for 'name' (already lower-cased by the caller) or None."""
+        return self._handlers.get(name)
+
+    def primary_name(self, name: str) -> str:
+        """Returns the command an alias points to, or 'name' itself."""
+        return self._aliases.get(name, name)
+
+    def reads_input(self, name: str) -> bool:
+        """True if the command (or alias) consumes the previous pipeline stage's output."""
+        return self.primary_name(name) in self._input_readers
+
+    def names(self) -> list[str]:
+        """All registered command names and aliases, sorted."""
+        return sorted(self._handlers)
+
+    def __contains__(self, name):
+        return name in self._handlers
@@ -0,0 +1,40 @@
+"""The 'copytext' and 'pastetext' commands (require pyperclip)."""
+
+try:
+    import pyperclip
+    CLIPBOARD_AVAILABLE = True
+except ImportError:
+    pyperclip = None
+    CLIPBOARD_AVAILABLE = False
+
+
+def copytext_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    if not CLIPBOARD_AVAILABLE:
+        return "copytext: pyperclip library not available. Please install it using 'pip install pyperclip'.", current_path, False
+    if not args:
+        return "copytext: no text provided to copy.", current_path, False
+    text_to_copy = " ".join(args)
+    try:
+        pyperclip.copy(text_to_copy) # pyperclip should be available if CLIPBOARD_AVAILABLE is True
+        output_string = "Text copied to clipboard."
+    except pyperclip.PyperclipException as e:
+        output_string = f"copytext: error copying to clipboard - {e}"
+    except Exception as e:
+        output_string = f"copytext: unexpected error during copy - {e}"
+    return output_string, current_path, False
+
+
+def pastetext_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    if not CLIPBOARD_AVAILABLE:
+        return "pastetext: pyperclip library not available. Please install it using 'pip install pyperclip'.", current_path, False
+    try:
+        pasted_text = pyperclip.paste() if pyperclip else None # Check if pyperclip is not None
+        if pasted_text:
+            output_string = pasted_text
+        else:
+            output_string = "pastetext: clipboard is empty or does not contain plain text."
+    except pyperclip.PyperclipException as e:
+        output_string = f"pastetext: error pasting from clipboard - {e}"
+    except Exception as e:
+        output_string = f"pastetext: unexpected error during paste - {e}"
+    return output_string, current_path, False
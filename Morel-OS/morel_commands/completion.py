@@ -0,0 +1,146 @@
+"""
+Tab completion for the interactive prompt (readline).
+
+The first word of a command line (or of a pipeline stage, after '|') completes to a
+command name. Every other word completes to a path relative to the current path.
+'~', absolute paths and any depth of directories work. Directories get a trailing '/'.
+Files get a space. Names starting with '.' are only offered once a '.' has been typed.
+
+Candidates come from PrefixTrie objects (trie.py): one over the command names, and
+one per directory listing in the shared directory cache (dircache.py). A Tab press
+therefore costs one stat() of the directory plus a few dict lookups, whatever the
+size of the directory; the listing is re-read only when the directory has changed.
+When more than COMPLETION_MAX_MATCHES names match, only their common prefix is
+inserted (nothing is listed), so Tab never builds 100,000 strings.
+
+Arguments also complete to what was typed after the same command before: the
+COMPLETION_HISTORY_SUGGESTIONS best ranked by the command history (history.py, by
+frequency and recency). For commands that take paths, only suggestions that exist
+relative to the current path are offered.
+
+readline is part of Python on Linux and macOS. On Windows it is provided by the
+optional pyreadline3 package; without it the prompt works as before, without completion.
+"""
+import os
+import re
+
+COMPLETION_MAX_MATCHES = 1000
+COMPLETION_HISTORY_SUGGESTIONS = 5
+# Commands whose arguments are paths: history suggestions for them must exist
+COMPLETION_PATH_COMMANDS = {"cd", "ls", "run", "copyfile", "open", "du", "find", "cat"}
+# Word separators: paths keep their '/', '.', '-' and '~'
+COMPLETER_DELIMITERS = " \t\n|<>;\"'"
+
+_ANSI_ESCAPE = re.compile(r"(\x1b\[[0-9;]*[A-Za-z])")
+
+
+class MorelCompleter:
+    """The readline completer. The shell sets current_path before each prompt."""
+
+    def __init__(self, command_names: list[str], current_path: str = None, history=None):
+        from morel_commands.trie import PrefixTrie
+        self.commands = PrefixTrie(sorted(command_names))
+        self.current_path = current_path or os.getcwd()
+        self.history = history # A history.CommandHistory, or None
+        self._matches = []
+
+    def complete(self, text: str, state: int):
+        """readline's completer protocol: called with state 0, 1, 2... until it returns None."""
+        if state == 0:
+            import readline
+            line = readline.get_line_buffer()
+            try:
+                self._matches = self.matches(line[:readline.get_begidx()], text)
+            except Exception: # An exception inside a readline completer is silently swallowed anyway
+                self._matches = []
+        return self._matches[state] if state < len(self._matches) else None
+
+    def matches(self, before: str, text: str) -> list[str]:
+        """Candidates for the word 'text', preceded on the line by 'before'."""
+        stage = before.rsplit("|", 1)[-1]
+        if not stage.strip():
+            return self.command_matches(text)
+        matches = self.path_matches(text)
+        if self.history is not None:
+            suggestions = self.history_matches(stage.split()[0].lower(), text)
+            if suggestions:
+                matches = suggestions + [match for match in matches if match not in suggestions]
+        return matches
+
+    def command_matches(self, text: str) -> list[str]:
+        prefix = text.lower()
+        if self.commands.count(prefix) > COMPLETION_MAX_MATCHES:
+            return self._common_prefix_only(self.commands.common_prefix(prefix), prefix, "")
+        return [name + " " for name in self.commands.completions(prefix)]
+
+    def path_matches(self, text: str) -> list[str]:
+        from morel_commands.dircache import DIRECTORY_CACHE
+        separator_index = max(text.rfind("/"), text.rfind(os.sep))
+        directory_part, base = text[:separator_index + 1], text[separator_index + 1:]
+        directory = os.path.expanduser(directory_part.replace("\\ ", " ")) if directory_part else "."
+        directory = os.path.normpath(os.path.join(self.current_path, directory))
+        try:
+            listing = DIRECTORY_CACHE.get_listing(directory)
+        except OSError:
+            return []
+
+        trie = listing.trie
+        lo, hi = trie.range(base)
+        ranges = [(lo, hi)]
+        if not base: # Hidden entries only when asked for; they are one contiguous range
+            hidden_lo, hidden_hi = trie.range(".")
+            ranges = [(lo, hidden_lo), (hidden_hi, hi)]
+        count = sum(end - start for start, end in ranges)
+        if count > COMPLETION_MAX_MATCHES:
+            return self._common_prefix_only(trie.common_prefix(base), base, directory_part)
+
+        entries = listing.entries
+        matches = []
+        for start, end in ranges:
+            for name, is_dir in entries[start:end]:
+                matches.append(directory_part + name.replace(" ", "\\ ") + ("/" if is_dir else " "))
+        return matches
+
+    def history_matches(self, command_name: str, text: str) -> list[str]:
+        matches = []
+        for argument in self.history.suggestions(command_name, text, COMPLETION_HISTORY_SUGGESTIONS):
+            path = os.path.join(self.current_path, os.path.expanduser(argument))
+            if os.path.isdir(path):
+                matches.append(argument.rstrip("/") + "/")
+            elif command_name not in COMPLETION_PATH_COMMANDS or os.path.exists(path):
+                matches.append(argument + " ")
+        return matches
+
+    @staticmethod
+    def _common_prefix_only(common: str, typed: str, directory_part: str) -> list[str]:
+        # Too many to list: extend the word as far as it is unambiguous (or beep)
+        return [directory_part + common] if len(common) > len(typed) else []
+
+
+def readline_prompt(prompt: str) -> str:
+    """
+    Marks the ANSI escapes in a rendered prompt as zero-width (\\001...\\002), so readline
+    knows where the cursor is when it redraws the line after listing completions.
+    """
+    return _ANSI_ESCAPE.sub("\x01\\1\x02", prompt)
+
+
+def install_completion(command_names: list[str], current_path: str = None, history=None):
+    """
+    Installs tab completion (and, with a history.CommandHistory, loads its recent commands
+    into readline). Returns the MorelCompleter, or None if readline is unavailable.
+    """
+    try:
+        import readline
+    except ImportError:
+        return None
+    if history is not None:
+        history.load_readline(readline)
+    completer = MorelCompleter(command_names, current_path, history)
+    readline.set_completer(completer.complete)
+    readline.set_completer_delims(COMPLETER_DELIMITERS)
+    if "libedit" in (readline.__doc__ or ""): # macOS's system Python
+        readline.parse_and_bind("bind ^I rl_complete")
+    else:
+        readline.parse_and_bind("tab: complete")
+    return completer
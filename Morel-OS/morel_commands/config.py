@@ -0,0 +1,28 @@
+"""
+Where Morel OS keeps its per-user files (indexes, caches).
+
+  $MOREL_CONFIG_DIR                  if set
+  %APPDATA%\\Morel-OS                 on Windows
+  $XDG_CONFIG_HOME/morel-os          elsewhere (default ~/.config/morel-os)
+"""
+import os
+import sys
+
+
+def morel_config_dir(create: bool = True) -> str:
+    """Returns the Morel config directory, creating it unless create=False."""
+    directory = os.environ.get("MOREL_CONFIG_DIR")
+    if not directory:
+        if sys.platform == "win32" and os.environ.get("APPDATA"):
+            directory = os.path.join(os.environ["APPDATA"], "Morel-OS")
+        else:
+            base = os.environ.get("XDG_CONFIG_HOME") or os.path.join(os.path.expanduser("~"), ".config")
+            directory = os.path.join(base, "morel-os")
+    if create:
+        os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def config_file_path(name: str, create_dir: bool = True) -> str:
+    """Path of a file in the Morel config directory."""
+    return os.path.join(morel_config_dir(create_dir), name)
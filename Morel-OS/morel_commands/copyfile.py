@@ -0,0 +1,360 @@
+"""
+The 'copyfile' command: copies a file, or with -r a whole directory tree.
+
+  copyfile [-r] [-j WORKERS] <source> <destination_file_or_directory>
+
+File data is copied by the kernel wherever possible, trying in order:
+  1. a reflink (FICLONE ioctl, Linux): on Btrfs, XFS and other copy-on-write filesystems
+     the copy shares the source's blocks and takes no time whatever the file size;
+  2. os.copy_file_range (Linux): an in-kernel copy, done server-side on NFS/SMB;
+  3. os.sendfile: an in-kernel copy for kernels or filesystems without copy_file_range;
+  4. a read/write loop with one reused buffer (other platforms).
+A method that fails as "not supported" is not tried again for the rest of the command.
+Permissions and times are copied afterwards with shutil.copystat, as shutil.copy2 does.
+
+Directory trees are walked with os.scandir: directories are created by the walking thread,
+files are copied by a pool of COPY_WORKERS threads (the copy calls release the GIL), which
+is what makes trees of many small files fast. Symlinks are recreated as symlinks. Copies
+that take longer than COPY_PROGRESS_INTERVAL seconds print progress and throughput.
+"""
+import errno
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import fcntl
+except ImportError: # Windows
+    fcntl = None
+
+COPY_WORKERS = 8 # Threads copying files of a directory tree
+COPY_CHUNK_BYTES = 8 * 1024 * 1024 # Bytes per kernel copy call; also how often progress is counted
+COPY_BUFFER_BYTES = 1024 * 1024 # Buffer for the read/write fallback
+COPY_PROGRESS_INTERVAL = 0.5 # Seconds between progress lines
+_MAX_QUEUED_FILES = COPY_WORKERS * 64 # The walk waits when this many files are queued, so huge trees use bounded memory
+_MAX_LISTED_ERRORS = 20
+
+_O_BINARY = getattr(os, "O_BINARY", 0) # Windows only
+FICLONE = 0x40049409 if fcntl is not None and sys.platform.startswith("linux") else None # From <linux/fs.h>
+
+# errno values meaning "this copy method does not work here", as opposed to a real I/O error
+_UNSUPPORTED_ERRNOS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.ENOTTY, errno.EBADF,
+                       getattr(errno, "ENOTSUP", errno.EOPNOTSUPP)}
+
+
+class CopyCancelled(Exception):
+    """Raised in a copying thread once the command has been stopped."""
+
+
+class CopySession:
+    """Shared state of one copyfile command: progress counters, the methods that still work, errors."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.bytes_copied = 0
+        self.bytes_total = 0 # Sizes of the files started so far
+        self.files_copied = 0
+        self.files_total = 0
+        self.methods = Counter() # Copy method -> number of files
+        self.errors = []
+        self.cancelled = threading.Event()
+        self._unsupported = set()
+
+    def supports(self, method: str) -> bool:
+        return method not in self._unsupported
+
+    def mark_unsupported(self, method: str):
+        with self.lock:
+            self._unsupported.add(method)
+
+    def add_file(self):
+        with self.lock:
+            self.files_total += 1
+
+    def add_total_bytes(self, size: int):
+        with self.lock:
+            self.bytes_total += size
+
+    def add_bytes(self, byte_count: int):
+        if self.cancelled.is_set():
+            raise CopyCancelled()
+        with self.lock:
+            self.bytes_copied += byte_count
+
+    def file_done(self, method: str):
+        with self.lock:
+            self.files_copied += 1
+            self.methods[method] += 1
+
+    def add_error(self, message: str):
+        with self.lock:
+            self.errors.append(message)
+
+
+def format_size(byte_count: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if byte_count < 1024 or unit == "GiB":
+            return f"{byte_count:.0f} {unit}" if unit == "B" else f"{byte_count:.1f} {unit}"
+        byte_count /= 1024
+
+
+def _kernel_copy(method: str, copy_call, session: CopySession) -> bool:
+    """
+    Runs copy_call(offset) until it returns 0. Returns False (nothing copied) if the
+    method turns out to be unsupported here; real errors are raised.
+    """
+    offset = 0
+    while True:
+        try:
+            copied = copy_call(offset)
+        except OSError as e:
+            if offset == 0 and e.errno in _UNSUPPORTED_ERRNOS:
+                session.mark_unsupported(method)
+                return False
+            raise
+        if copied == 0:
+            return True
+        offset += copied
+        session.add_bytes(copied)
+
+
+def copy_file_data(source_fd: int, destination_fd: int, size: int, session: CopySession) -> str:
+    """Copies the contents of one open file to another; returns the name of the method that worked."""
+    if FICLONE is not None and size and session.supports("reflink"):
+        try:
+            fcntl.ioctl(destination_fd, FICLONE, source_fd)
+            session.add_bytes(size)
+            return "reflink"
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRNOS and e.errno != errno.EPERM:
+                raise
+            session.mark_unsupported("reflink")
+
+    if hasattr(os, "copy_file_range") and session.supports("copy_file_range"):
+        # Uses (and advances) both files' positions, so a later fallback starts where this stopped
+        if _kernel_copy("copy_file_range", lambda offset: os.copy_file_range(source_fd, destination_fd, COPY_CHUNK_BYTES), session):
+            return "copy_file_range"
+
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux") and session.supports("sendfile"):
+        if _kernel_copy("sendfile", lambda offset: os.sendfile(destination_fd, source_fd, offset, COPY_CHUNK_BYTES), session):
+            return "sendfile"
+
+    buffer = memoryview(bytearray(COPY_BUFFER_BYTES))
+    while True:
+        if hasattr(os, "readv"):
+            chunk = buffer[:os.readv(source_fd, [buffer])]
+        else: # Windows
+            chunk = memoryview(os.read(source_fd, COPY_BUFFER_BYTES))
+        if not chunk:
+            return "read/write"
+        written = 0
+        while written < len(chunk):
+            written += os.write(destination_fd, chunk[written:])
+        session.add_bytes(len(chunk))
+
+
+def copy_one_file(source_path: str, destination_path: str, session: CopySession):
+    """Copies one file's data and metadata (like shutil.copy2). Errors are recorded in the session."""
+    if session.cancelled.is_set():
+        return
+    try:
+        # Raw descriptors rather than file objects: for trees of small files the per-file overhead matters
+        source_fd = os.open(source_path, os.O_RDONLY | _O_BINARY)
+        try:
+            destination_fd = os.open(destination_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o666)
+            try:
+                size = os.fstat(source_fd).st_size
+                session.add_total_bytes(size)
+                method = copy_file_data(source_fd, destination_fd, size, session)
+            finally:
+                os.close(destination_fd)
+        finally:
+            os.close(source_fd)
+        shutil.copystat(source_path, destination_path)
+        session.file_done(method)
+    except CopyCancelled: # Don't leave a partial copy behind
+        try:
+            os.remove(destination_path)
+        except OSError:
+            pass
+    except OSError as e:
+        session.add_error(f"{source_path}: {e.strerror or e}")
+
+
+def _walk_tree(source_root: str, destination_root: str, session: CopySession, copy_file, directories: list):
+    """
+    Creates the directory structure and calls copy_file(source, destination) for each file.
+    Yields after every directory, so the caller can report progress during long walks.
+    The (source, destination) directory pairs are appended to 'directories', for copying
+    their metadata once the files are done.
+    """
+    stack = [(source_root, destination_root)]
+    while stack:
+        source_dir, destination_dir = stack.pop()
+        try:
+            os.makedirs(destination_dir, exist_ok=True)
+            directories.append((source_dir, destination_dir))
+            with os.scandir(source_dir) as scandir_iterator:
+                for entry in scandir_iterator:
+                    destination = os.path.join(destination_dir, entry.name)
+                    try:
+                        if entry.is_symlink():
+                            os.symlink(os.readlink(entry.path), destination)
+                        elif entry.is_dir():
+                            stack.append((entry.path, destination))
+                        elif entry.is_file():
+                            session.add_file() # Sizes come from the copying threads' fstat(), not a stat() here
+                            copy_file(entry.path, destination)
+                        else:
+                            session.add_error(f"{entry.path}: skipped (not a regular file)")
+                    except OSError as e:
+                        session.add_error(f"{entry.path}: {e.strerror or e}")
+        except OSError as e:
+            session.add_error(f"{source_dir}: {e.strerror or e}")
+        yield
+
+
+def _progress_line(session: CopySession, started: float) -> str:
+    elapsed = max(time.perf_counter() - started, 1e-9)
+    with session.lock:
+        copied, total = session.bytes_copied, session.bytes_total
+        files_copied, files_total = session.files_copied, session.files_total
+    if files_total > 1: # The total of a tree is only known once the walk is over
+        done = f"{format_size(copied)}, {files_copied}/{files_total} files"
+    else:
+        done = f"{format_size(copied)} of {format_size(total)}" + (f" ({copied * 100 // total}%)" if total else "")
+    return f"copyfile: {done}, {format_size(copied / elapsed)}/s"
+
+
+def _summary(session: CopySession, elapsed: float) -> str:
+    methods = ", ".join(f"{method}: {count}" for method, count in session.methods.most_common())
+    rate = format_size(session.bytes_copied / max(elapsed, 1e-9))
+    return f"{format_size(session.bytes_copied)} in {elapsed:.2f} s, {rate}/s; {methods or 'no files'}"
+
+
+def copy_stream(source_path: str, destination_path: str, recursive: bool, workers: int = COPY_WORKERS):
+    """
+    Copies a file (recursive=False) or a directory tree into destination_path (the final
+    path, already resolved). Yields progress lines while copying, then a summary.
+    Stopping the iteration early cancels the copy.
+    """
+    session = CopySession()
+    started = time.perf_counter()
+    last_report = started
+    completed = False
+    # One slot per queued or running file: the walk blocks when all are taken, so huge trees
+    # use bounded memory, and holding every slot means every file is done.
+    slots = threading.BoundedSemaphore(_MAX_QUEUED_FILES)
+    with ThreadPoolExecutor(max_workers=workers if recursive else 1, thread_name_prefix="copyfile") as pool:
+        try:
+            def copy_file(source, destination):
+                slots.acquire()
+                pool.submit(copy_one_file, source, destination, session).add_done_callback(lambda _: slots.release())
+
+            directories = []
+            if recursive:
+                for _ in _walk_tree(source_path, destination_path, session, copy_file, directories):
+                    if time.perf_counter() - last_report >= COPY_PROGRESS_INTERVAL:
+                        last_report = time.perf_counter()
+                        yield _progress_line(session, started)
+            else:
+                session.add_file()
+                copy_file(source_path, destination_path)
+
+            for _ in range(_MAX_QUEUED_FILES):
+                while not slots.acquire(timeout=COPY_PROGRESS_INTERVAL):
+                    yield _progress_line(session, started)
+            for source_dir, destination_dir in reversed(directories): # Deepest first, after their contents
+                try:
+                    shutil.copystat(source_dir, destination_dir)
+                except OSError as e:
+                    session.add_error(f"{destination_dir}: {e.strerror or e}")
+            completed = True
+        finally:
+            if not completed: # Stopped early (or failed): running copies stop at their next chunk
+                session.cancelled.set()
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    if recursive:
+        yield f"Copied {session.files_copied} files from '{source_path}' to '{destination_path}' ({_summary(session, elapsed)})."
+    elif not session.errors:
+        yield f"File '{os.path.basename(source_path)}' copied to '{destination_path}' ({_summary(session, elapsed)})."
+    if session.errors:
+        listed = "\n".join(f"  {error}" for error in session.errors[:_MAX_LISTED_ERRORS])
+        more = f"\n  ... and {len(session.errors) - _MAX_LISTED_ERRORS} more" if len(session.errors) > _MAX_LISTED_ERRORS else ""
+        yield f"copyfile: {len(session.errors)} error(s):\n{listed}{more}"
+
+
+def _resolve(current_path: str, path_arg: str) -> str:
+    return os.path.abspath(os.path.join(current_path, path_arg) if not os.path.isabs(path_arg) else path_arg)
+
+
+def copyfile_command_stream(current_path: str, source_arg: str, destination_arg: str,
+                            recursive: bool = False, workers: int = COPY_WORKERS):
+    """
+    Checks the arguments and returns an error message string, or the copy_stream() iterator.
+    An existing directory as destination means "copy into it", as with shutil.copy2.
+    """
+    source_path = _resolve(current_path, source_arg)
+    if not os.path.exists(source_path):
+        return f"copyfile: source file '{source_arg}' not found at '{source_path}'."
+    source_is_dir = os.path.isdir(source_path)
+    if source_is_dir and not recursive:
+        return f"copyfile: source '{source_arg}' is a directory (use 'copyfile -r' to copy a directory tree)."
+    if not source_is_dir and not os.path.isfile(source_path):
+        return f"copyfile: source '{source_arg}' is not a file."
+
+    destination_path = _resolve(current_path, destination_arg)
+    if os.path.isdir(destination_path):
+        destination_path = os.path.join(destination_path, os.path.basename(source_path))
+    else:
+        dest_parent_dir = os.path.dirname(destination_path)
+        if not os.path.exists(dest_parent_dir):
+            return f"copyfile: destination directory '{dest_parent_dir}' does not exist."
+
+    if os.path.exists(destination_path) and os.path.samefile(source_path, destination_path):
+        return "copyfile: source and destination are the same file."
+    if source_is_dir:
+        if (destination_path + os.sep).startswith(source_path.rstrip(os.sep) + os.sep):
+            return f"copyfile: cannot copy directory '{source_arg}' into itself."
+        if os.path.exists(destination_path) and not os.path.isdir(destination_path):
+            return f"copyfile: destination '{destination_arg}' exists and is not a directory."
+    elif os.path.isdir(destination_path):
+        return f"copyfile: destination '{destination_path}' is a directory."
+    return copy_stream(source_path, destination_path, source_is_dir, workers)
+
+
+def copyfile_command_string(current_path: str, source_file_arg: str, destination_arg: str, recursive: bool = False) -> str:
+    """Like copyfile_command_stream, but waits for the copy and returns all output at once."""
+    result = copyfile_command_stream(current_path, source_file_arg, destination_arg, recursive)
+    return result if isinstance(result, str) else "\n".join(result)
+
+
+_USAGE = "Usage: copyfile [-r] [-j WORKERS] <source> <destination_file_or_directory>"
+
+
+def copyfile_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    recursive = False
+    workers = COPY_WORKERS
+    paths = []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in ("-r", "-R"):
+            recursive = True
+        elif arg == "-j" and index + 1 < len(args):
+            index += 1
+            if not args[index].isdigit() or int(args[index]) < 1:
+                return f"copyfile: invalid worker count: {args[index]}", current_path, False
+            workers = int(args[index])
+        else:
+            paths.append(arg)
+        index += 1
+    if len(paths) != 2:
+        return f"copyfile: incorrect number of arguments. {_USAGE}", current_path, False
+    return copyfile_command_stream(current_path, paths[0], paths[1], recursive, workers), current_path, False
@@ -0,0 +1,144 @@
+"""
+Shared directory-metadata cache for ls, cd validation and path completion.
+
+Listings are kept in a bounded LRU keyed by absolute path. Each lookup costs a
+single stat() of the directory: if its modification time is unchanged, the cached
+entry names and types are reused; otherwise the directory is re-read with os.scandir.
+Creating, deleting or renaming an entry updates the directory's mtime, so listings
+never go stale. (Changes to a file's *contents* do not, which is why 'ls -l' sizes
+and times are not cached here.)
+"""
+import os
+import threading
+from collections import OrderedDict
+
+DIRCACHE_MAX_DIRECTORIES = 128 # Least recently used listings are evicted beyond this
+
+
+class DirectoryListing:
+    """A cached snapshot of one directory: sorted (name, is_dir) pairs plus the mtime they belong to."""
+
+    __slots__ = ("path", "mtime_ns", "entries", "_names", "_trie")
+
+    def __init__(self, path: str, mtime_ns: int, entries: list[tuple[str, bool]]):
+        self.path = path
+        self.mtime_ns = mtime_ns
+        self.entries = entries # Sorted by name
+        self._names = None
+        self._trie = None
+
+    @property
+    def names(self) -> list[str]:
+        """Sorted entry names (built once per listing)."""
+        if self._names is None:
+            self._names = [name for name, _ in self.entries]
+        return self._names
+
+    @property
+    def trie(self):
+        """A PrefixTrie over the entry names, for completion; its indices are indices into entries."""
+        if self._trie is None:
+            from morel_commands.trie import PrefixTrie
+            self._trie = PrefixTrie(self.names)
+        return self._trie
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def _read_directory(path: str, mtime_ns: int) -> DirectoryListing:
+    entries = []
+    with os.scandir(path) as scandir_iterator:
+        for entry in scandir_iterator:
+            try:
+                is_dir = entry.is_dir() # Uses the type returned with the entry, no stat() on most systems
+            except OSError:
+                is_dir = False
+            entries.append((entry.name, is_dir))
+    entries.sort()
+    return DirectoryListing(path, mtime_ns, entries)
+
+
+class DirectoryCache:
+    """Bounded, thread-safe LRU of DirectoryListing objects, invalidated by directory mtime."""
+
+    def __init__(self, max_directories: int = DIRCACHE_MAX_DIRECTORIES):
+        self.max_directories = max_directories
+        self._listings = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0 # Misses caused by a changed mtime (a subset of misses)
+        self.evictions = 0
+
+    def get_listing(self, path: str) -> DirectoryListing:
+        """
+        Returns the listing of the directory at 'path' (must be absolute).
+        Raises FileNotFoundError, NotADirectoryError or PermissionError like os.scandir would.
+        """
+        stat_result = os.stat(path)
+        with self._lock:
+            listing = self._listings.get(path)
+            if listing is not None:
+                if listing.mtime_ns == stat_result.st_mtime_ns:
+                    self._listings.move_to_end(path)
+                    self.hits += 1
+                    return listing
+                self.invalidations += 1
+            self.misses += 1
+
+        # Read outside the lock so a huge directory does not block other threads.
+        listing = _read_directory(path, stat_result.st_mtime_ns)
+        with self._lock:
+            self._listings[path] = listing
+            self._listings.move_to_end(path)
+            while len(self._listings) > self.max_directories:
+                self._listings.popitem(last=False)
+                self.evictions += 1
+        return listing
+
+    def invalidate(self, path: str = None):
+        """Drops one cached path, or everything if path is None."""
+        with self._lock:
+            if path is None:
+                self._listings.clear()
+            else:
+                self._listings.pop(path, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directories": len(self._listings),
+                "max_directories": self.max_directories,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# The one cache shared by every command (and both front ends) in this process.
+DIRECTORY_CACHE = DirectoryCache()
+
+
+def dircache_command_string(args: list[str]) -> str:
+    if args and args[0] == "clear":
+        DIRECTORY_CACHE.invalidate()
+        return "Directory cache cleared."
+    if args:
+        return "dircache: usage: dircache [clear]"
+    stats = DIRECTORY_CACHE.stats()
+    return "\n".join([
+        "Directory cache:",
+        f"  Cached directories : {stats['directories']} / {stats['max_directories']}",
+        f"  Hits               : {stats['hits']}",
+        f"  Misses             : {stats['misses']} ({stats['invalidations']} after a directory changed)",
+        f"  Evictions          : {stats['evictions']}",
+        f"  Hit rate           : {stats['hit_rate']:.1%}",
+    ])
+
+
+def dircache_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return dircache_command_string(args), current_path, False
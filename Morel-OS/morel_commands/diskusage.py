@@ -0,0 +1,309 @@
+"""
+The 'du' command, backed by a persistent per-directory size index.
+
+  du [-d DEPTH] [-b] [--apparent-size] [--rescan] [path]
+
+The index stores, for every directory it has seen, the directory's mtime, the space used
+by the files directly in it and the names of its subdirectories, one row per directory
+in the SQLite database DU_INDEX_FILE in the Morel config directory (see config.py). The
+first 'du' of a tree in a session loads only that tree's rows (a range scan of the path
+key) into memory; afterwards only the rows of directories that were re-read or have
+disappeared are written back, so a small change costs a small write however large the
+index is.
+
+A directory's mtime changes whenever an entry is created, deleted or renamed in it, but
+not when something deeper down changes, and not when a file's contents grow. So each
+'du' still visits every directory of the tree, but with one stat() per directory: only
+directories whose mtime changed are read again with os.scandir (which, with the stat()
+of each of their files, is where the time goes on a cold walk). Files rewritten in place
+keep their old size in the index until their directory changes; 'du --rescan' re-reads
+everything.
+
+Sizes are disk usage (allocated blocks, like du) or, with --apparent-size, file sizes.
+Symlinks are not followed; hard-linked files are counted once per link.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from morel_commands.config import config_file_path
+
+DU_INDEX_FILE = "du_index.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS dirs(path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL, disk INTEGER NOT NULL,
+                                apparent INTEGER NOT NULL, files INTEGER NOT NULL, children TEXT NOT NULL) WITHOUT ROWID;
+"""
+
+# A record is [mtime_ns, disk_bytes, apparent_bytes, file_count, [subdirectory names]]
+_MTIME, _DISK, _APPARENT, _FILES, _CHILDREN = range(5)
+
+
+def _disk_bytes(stat_result: os.stat_result) -> int:
+    blocks = getattr(stat_result, "st_blocks", None) # Not available on Windows
+    return blocks * 512 if blocks is not None else stat_result.st_size
+
+
+class RefreshResult:
+    """What one refresh of a tree did, and the directories it found (parents before children)."""
+
+    def __init__(self):
+        self.directories = [] # (path, depth), in walk order
+        self.checked = 0
+        self.rescanned = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+
+def _subtree_range(path: str) -> tuple[str, str]:
+    """Bounds of the paths strictly below 'path', for a range scan of the path key."""
+    prefix = path.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def _storable(path: str) -> bool:
+    """False for a path SQLite cannot store (undecodable bytes); such a directory is simply re-read next session."""
+    try:
+        path.encode("utf-8")
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+class DiskUsageIndex:
+    """Per-directory sizes keyed by absolute path, loaded from and saved to one SQLite database, a tree at a time."""
+
+    def __init__(self, index_path: str = None):
+        self.index_path = index_path
+        self._connection = None
+        self._records = {} # The rows of every loaded tree
+        self._loaded_roots = [] # Trees whose rows are all in _records
+        self._changed = set() # Paths whose row must be written by save()
+        self._removed = set() # Paths whose row must be deleted by save()
+        self._lock = threading.Lock()
+
+    def _path(self) -> str:
+        if self.index_path is None:
+            self.index_path = config_file_path(DU_INDEX_FILE)
+        return self.index_path
+
+    def _database(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._path(), timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL") # Another session can read while this one writes
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _load(self, root: str):
+        """Reads the rows of the tree under 'root' unless a loaded tree already contains it."""
+        prefix = root.rstrip(os.sep) + os.sep
+        if any(root == loaded or root.startswith(loaded.rstrip(os.sep) + os.sep) for loaded in self._loaded_roots):
+            return
+        try:
+            low, high = _subtree_range(root)
+            rows = self._database().execute(
+                "SELECT path, mtime_ns, disk, apparent, files, children FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+                (root, low, high)) if _storable(root) else ()
+            for path, mtime_ns, disk, apparent, files, children in rows:
+                self._records.setdefault(path, [mtime_ns, disk, apparent, files, json.loads(children)])
+        except (sqlite3.Error, ValueError): # Missing or unreadable: start this tree empty
+            pass
+        self._loaded_roots = [loaded for loaded in self._loaded_roots if not loaded.startswith(prefix)] + [root]
+
+    def _set(self, path: str, record: list):
+        self._records[path] = record
+        self._changed.add(path)
+        self._removed.discard(path)
+
+    def _forget(self, path: str):
+        if self._records.pop(path, None) is not None:
+            self._removed.add(path)
+        self._changed.discard(path)
+
+    def save(self):
+        """Writes the rows that changed since the last save, in one transaction."""
+        with self._lock:
+            if not self._changed and not self._removed:
+                return
+            try:
+                connection = self._database()
+                with connection:
+                    connection.executemany("DELETE FROM dirs WHERE path = ?",
+                                           [(path,) for path in self._removed if _storable(path)])
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO dirs(path, mtime_ns, disk, apparent, files, children) VALUES (?, ?, ?, ?, ?, ?)",
+                        [(path, *self._records[path][:_CHILDREN], json.dumps(self._records[path][_CHILDREN]))
+                         for path in self._changed if _storable(path)])
+            except sqlite3.Error as e:
+                raise OSError(str(e)) from None
+            self._changed.clear()
+            self._removed.clear()
+
+    def clear(self):
+        """Forgets every directory, here and in the database."""
+        with self._lock:
+            self._database().execute("DELETE FROM dirs")
+            self._database().commit()
+            self._records = {}
+            self._loaded_roots = []
+            self._changed.clear()
+            self._removed.clear()
+
+    def __len__(self):
+        """Directories in the trees loaded so far."""
+        with self._lock:
+            return len(self._records)
+
+    def _scan(self, path: str, mtime_ns: int, errors: list) -> list:
+        disk = apparent = files = 0
+        children = []
+        with os.scandir(path) as scandir_iterator:
+            for entry in scandir_iterator:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        children.append(entry.name)
+                    else:
+                        stat_result = entry.stat(follow_symlinks=False)
+                        disk += _disk_bytes(stat_result)
+                        apparent += stat_result.st_size
+                        files += 1
+                except OSError as e:
+                    errors.append(f"{entry.path}: {e.strerror or e}")
+        return [mtime_ns, disk, apparent, files, children]
+
+    def refresh(self, root: str, rescan: bool = False) -> RefreshResult:
+        """
+        Brings the records of the tree under 'root' (an absolute directory path) up to date.
+        Records of directories that no longer exist under it are dropped.
+        """
+        result = RefreshResult()
+        started = time.perf_counter()
+        with self._lock:
+            self._load(root)
+            records = self._records
+            visited = set()
+            stack = [(root, 0)]
+            while stack:
+                path, depth = stack.pop()
+                try:
+                    mtime_ns = os.lstat(path).st_mtime_ns
+                    result.checked += 1
+                    record = records.get(path)
+                    if rescan or record is None or record[_MTIME] != mtime_ns:
+                        record = self._scan(path, mtime_ns, result.errors)
+                        self._set(path, record)
+                        result.rescanned += 1
+                except OSError as e:
+                    result.errors.append(f"{path}: {e.strerror or e}")
+                    self._forget(path)
+                    continue
+                visited.add(path)
+                result.directories.append((path, depth))
+                stack.extend((os.path.join(path, name), depth + 1) for name in reversed(record[_CHILDREN]))
+
+            if result.rescanned: # Only then can directories have disappeared
+                prefix = root.rstrip(os.sep) + os.sep
+                stale = [path for path in records if path.startswith(prefix) and path not in visited]
+                for path in stale:
+                    self._forget(path)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def totals(self, result: RefreshResult, apparent: bool = False) -> dict:
+        """Total size of every directory in a refreshed tree: {path: (bytes, files)}."""
+        size_field = _APPARENT if apparent else _DISK
+        totals = {}
+        with self._lock:
+            for path, _ in reversed(result.directories): # Children come before their parents
+                record = self._records[path]
+                size, files = record[size_field], record[_FILES]
+                for name in record[_CHILDREN]:
+                    child_size, child_files = totals.get(os.path.join(path, name), (0, 0))
+                    size += child_size
+                    files += child_files
+                totals[path] = (size, files)
+        return totals
+
+
+# One index per process, shared by every 'du' (and both front ends).
+DU_INDEX = DiskUsageIndex()
+
+
+def _format_size(byte_count: int, raw_bytes: bool) -> str:
+    if raw_bytes:
+        return str(byte_count)
+    from morel_commands.copyfile import format_size
+    return format_size(byte_count)
+
+
+def du_command_string(current_path: str, path_arg: str = None, max_depth: int = 0, raw_bytes: bool = False,
+                      apparent: bool = False, rescan: bool = False, index: DiskUsageIndex = DU_INDEX) -> str:
+    display_root = path_arg or "."
+    path_arg = os.path.expanduser(path_arg or ".")
+    # Resolved, so a symlinked root is checked by its real directory's mtime
+    root = os.path.realpath(path_arg if os.path.isabs(path_arg) else os.path.join(current_path, path_arg))
+    try:
+        stat_result = os.stat(root)
+    except OSError as e:
+        return f"du: cannot access '{display_root}': {e.strerror or e}"
+    if not os.path.isdir(root):
+        size = stat_result.st_size if apparent else _disk_bytes(stat_result)
+        return f"{_format_size(size, raw_bytes):>10}  {display_root}"
+
+    result = index.refresh(root, rescan)
+    totals = index.totals(result, apparent)
+    try:
+        index.save()
+    except OSError as e:
+        result.errors.append(f"index not saved: {e.strerror or e}")
+
+    if root not in totals: # Removed or made unreadable since the stat() above
+        return f"du: cannot read '{display_root}': {result.errors[0] if result.errors else 'unknown error'}"
+
+    lines = []
+    for path, depth in result.directories:
+        if depth <= max_depth:
+            size, _ = totals[path]
+            display = display_root if path == root else os.path.join(display_root, os.path.relpath(path, root))
+            lines.append((path, f"{_format_size(size, raw_bytes):>10}  {display}"))
+    lines.sort(key=lambda item: item[0])
+    output = [line for _, line in lines]
+    size, files = totals[root]
+    output.append(f"{files} files; {result.checked} directories checked, {result.rescanned} read "
+                  f"in {result.elapsed * 1000:.0f} ms")
+    if result.errors:
+        output.append(f"du: {len(result.errors)} error(s), e.g. {result.errors[0]}")
+    return "\n".join(output)
+
+
+_USAGE = "Usage: du [-d DEPTH] [-b] [--apparent-size] [--rescan] [path]"
+
+
+def du_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    max_depth = 0
+    raw_bytes = apparent = rescan = False
+    path_arg = None
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg == "-d" and index + 1 < len(args) and args[index + 1].isdigit():
+            index += 1
+            max_depth = int(args[index])
+        elif arg == "-b":
+            raw_bytes = True
+        elif arg == "--apparent-size":
+            apparent = True
+        elif arg == "--rescan":
+            rescan = True
+        elif arg.startswith("-") and len(arg) > 1:
+            return f"du: invalid option '{arg}'. {_USAGE}", current_path, False
+        elif path_arg is None:
+            path_arg = arg
+        else:
+            return f"du: only one path can be given. {_USAGE}", current_path, False
+        index += 1
+    return du_command_string(current_path, path_arg, max_depth, raw_bytes, apparent, rescan), current_path, False
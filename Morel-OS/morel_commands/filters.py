@@ -0,0 +1,152 @@
+"""
+Line filters for pipelines: head, tail, wc and cat.
+
+Each one reads the previous stage's output (stdin=, line batches, see pipeline.py) or
+the files named on its command line, and streams its result. head stops reading as
+soon as it has enough lines, which lets the stages before it stop early too.
+
+  head [-n N | -N | N] [file]   - first N lines (default 10)
+  tail [-n N | -N | N] [file]   - last N lines (default 10)
+  wc [-l] [file]                - line, word and character counts (-l: lines only)
+  cat [file | - ...]            - concatenate files ('-' is the piped input)
+"""
+import os
+from collections import deque
+
+from morel_commands.pipeline import close_batches, read_line_batches
+
+DEFAULT_LINE_COUNT = 10
+
+
+def _open_batches(current_path: str, file_arg: str):
+    """Line batches of a file relative to Morel OS's current path. Raises OSError."""
+    full_path = os.path.join(current_path, os.path.expanduser(file_arg))
+    return read_line_batches(open(full_path, "rb"), close=True)
+
+
+def _input(command: str, current_path: str, file_arg: str, stdin):
+    """Returns (batches, error_message) for a filter reading one file or its piped input."""
+    if file_arg is not None:
+        try:
+            return _open_batches(current_path, file_arg), ""
+        except OSError as e:
+            return None, f"{command}: cannot open '{file_arg}': {e.strerror}"
+    if stdin is None:
+        return None, f"{command}: no input (use it after '|', or give a file name)"
+    return stdin, ""
+
+
+def _parse_count(command: str, args: list[str]) -> tuple[int, str, str]:
+    """Parses '[-n N | -N | N] [file]'. Returns (count, file_arg, error_message)."""
+    count, file_arg = DEFAULT_LINE_COUNT, None
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        try:
+            if arg == "-n" and index + 1 < len(args):
+                index += 1
+                count = int(args[index])
+            elif arg.startswith("-") and arg[1:].isdigit():
+                count = int(arg[1:])
+            elif arg.isdigit(): # 'head 20' as well as 'head -n 20' / 'head -20'
+                count = int(arg)
+            elif file_arg is None:
+                file_arg = arg
+            else:
+                return 0, None, f"{command}: only one file can be given"
+        except ValueError:
+            return 0, None, f"{command}: invalid line count: {args[index]}"
+        index += 1
+    if count < 0:
+        return 0, None, f"{command}: invalid line count: {count}"
+    return count, file_arg, ""
+
+
+def head_lines(batches, count: int):
+    """Yields the first 'count' lines (as chunks), then stops reading."""
+    remaining = count
+    try:
+        for batch in batches:
+            if remaining <= 0:
+                break
+            if len(batch) >= remaining:
+                yield "\n".join(batch[:remaining])
+                break
+            remaining -= len(batch)
+            yield "\n".join(batch)
+    finally:
+        close_batches(batches)
+
+
+def tail_lines(batches, count: int):
+    """Yields the last 'count' lines once the input has ended; only those are kept in memory."""
+    last_lines = deque(maxlen=count)
+    for batch in batches:
+        last_lines.extend(batch)
+    if last_lines:
+        yield "\n".join(last_lines)
+
+
+def head_handler(args: list[str], current_path: str, stdin=None) -> tuple[str, str, bool]:
+    count, file_arg, error_message = _parse_count("head", args)
+    if error_message:
+        return error_message, current_path, False
+    batches, error_message = _input("head", current_path, file_arg, stdin)
+    if error_message:
+        return error_message, current_path, False
+    return head_lines(batches, count), current_path, False
+
+
+def tail_handler(args: list[str], current_path: str, stdin=None) -> tuple[str, str, bool]:
+    count, file_arg, error_message = _parse_count("tail", args)
+    if error_message:
+        return error_message, current_path, False
+    batches, error_message = _input("tail", current_path, file_arg, stdin)
+    if error_message:
+        return error_message, current_path, False
+    return tail_lines(batches, count), current_path, False
+
+
+def wc_counts(batches, lines_only: bool = False):
+    """Yields the counts once the input has ended."""
+    line_count = word_count = char_count = 0
+    for batch in batches:
+        line_count += len(batch)
+        if not lines_only:
+            for line in batch:
+                word_count += len(line.split())
+                char_count += len(line) + 1 # Plus the newline
+    if lines_only:
+        yield str(line_count)
+    else:
+        yield f"{line_count:>8}{word_count:>8}{char_count:>8}"
+
+
+def wc_handler(args: list[str], current_path: str, stdin=None) -> tuple[str, str, bool]:
+    lines_only = "-l" in args
+    file_args = [arg for arg in args if arg != "-l"]
+    if len(file_args) > 1:
+        return "wc: only one file can be given", current_path, False
+    batches, error_message = _input("wc", current_path, file_args[0] if file_args else None, stdin)
+    if error_message:
+        return error_message, current_path, False
+    return wc_counts(batches, lines_only), current_path, False
+
+
+def _cat_chunks(sources):
+    for batches in sources:
+        for batch in batches:
+            yield "\n".join(batch)
+
+
+def cat_handler(args: list[str], current_path: str, stdin=None) -> tuple[str, str, bool]:
+    file_args = args or ["-"]
+    sources = []
+    for file_arg in file_args:
+        batches, error_message = _input("cat", current_path, None if file_arg == "-" else file_arg, stdin)
+        if error_message:
+            for opened in sources:
+                close_batches(opened)
+            return error_message, current_path, False
+        sources.append(batches)
+    return _cat_chunks(sources), current_path, False
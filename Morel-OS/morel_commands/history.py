@@ -0,0 +1,341 @@
+"""
+Persistent command history and the 'history' command.
+
+  history [-n N]          - the last N (default 20) commands, with when they were run
+  history <text>          - the most recent distinct commands containing 'text' (any case)
+  history --top [N]       - the commands run most often, most frequent and recent first
+
+Every command typed at the prompt is appended to HISTORY_FILE in the Morel config
+directory (see config.py) as one "unix time<TAB>command" line, escaped so a record is
+always exactly one line. The file is opened with O_APPEND and each record is written
+with a single os.write(), so several Morel sessions can share it without losing or
+interleaving records. It is never rewritten.
+
+Startup does not read the whole file: the shell hands readline the last
+HISTORY_READLINE_TAIL lines, found by scanning the mmap()ed file backwards from its end,
+so the cost is the same for a hundred lines and for a million. The full index (each
+distinct command with its use count and last use, and the arguments used with each
+command) is built on a background thread. Later, only the bytes appended since then,
+by this session or others, are parsed.
+
+Once the index is ready, readline's own history is replaced by the distinct commands
+in order of last use (at most HISTORY_READLINE_ENTRIES), followed by whatever was typed
+while the index was loading, so Up and Ctrl-R reach the whole history without wading
+through repeats. Ctrl-R itself remains readline's incremental search, a linear scan of
+those entries: Python's readline module cannot bind a key to Python code, so the index
+cannot back it. 'history <text>' searches the index: all distinct commands, most recent
+first, joined into one lower-cased string that a single str.find() scans. Tab completion also offers arguments used before with the
+same command (see completion.py), ranked by frecency: count weighted by how recently
+they were used (the weight halves every HISTORY_HALF_LIFE commands).
+"""
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from morel_commands.config import config_file_path
+
+HISTORY_FILE = "history.log"
+HISTORY_READLINE_TAIL = 1000 # Lines given to readline at startup
+HISTORY_READLINE_ENTRIES = 10000 # Distinct commands given to readline once indexed
+HISTORY_HALF_LIFE = 1000 # Commands after which a use counts half as much for ranking
+HISTORY_DEFAULT_COUNT = 20
+
+
+def encode_record(command: str, when: float) -> bytes:
+    escaped = command.replace("\\", "\\\\").replace("\n", "\\n").replace("\r", "\\r")
+    return f"{int(when)}\t{escaped}\n".encode("utf-8", "surrogateescape")
+
+
+def decode_record(line: str):
+    """(unix time, command) for one line of the history file, or None if it is not a record."""
+    when, separator, escaped = line.partition("\t")
+    if not separator or not when.isdigit():
+        return None
+    if "\\" not in escaped:
+        return int(when), escaped
+    parts, index = [], 0
+    while True:
+        backslash = escaped.find("\\", index)
+        if backslash < 0 or backslash + 1 >= len(escaped):
+            parts.append(escaped[index:])
+            break
+        parts.append(escaped[index:backslash])
+        parts.append({"n": "\n", "r": "\r"}.get(escaped[backslash + 1], escaped[backslash + 1]))
+        index = backslash + 2
+    return int(when), "".join(parts)
+
+
+def _mapped(path: str):
+    """(mmap, size) of a file, or (None, 0) if it is missing or empty."""
+    import mmap
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return None, 0
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size
+    except OSError:
+        return None, 0
+
+
+class HistoryIndex:
+    """Distinct commands with their use count and last use, and the arguments used per command."""
+
+    def __init__(self):
+        self.sequence = 0 # Records indexed so far
+        self.commands = {} # Command -> [count, last sequence number, last unix time]
+        self.arguments = {} # Command name -> {argument: [count, last sequence number]}
+        self._search = None # (lower-cased joined text, entry start offsets, commands), most recent first
+
+    def add(self, when: int, command: str):
+        self.sequence += 1
+        entry = self.commands.get(command)
+        if entry is None:
+            self.commands[command] = [1, self.sequence, when]
+        else:
+            entry[0] += 1
+            entry[1] = self.sequence
+            entry[2] = when
+        words = command.split()
+        if len(words) > 1:
+            per_command = self.arguments.setdefault(words[0].lower(), {})
+            for word in words[1:]:
+                if word.startswith("-") or word in ("|", "<", ">", "&"):
+                    continue
+                usage = per_command.get(word)
+                if usage is None:
+                    per_command[word] = [1, self.sequence]
+                else:
+                    usage[0] += 1
+                    usage[1] = self.sequence
+        self._search = None
+
+    def by_recency(self) -> list[str]:
+        return sorted(self.commands, key=lambda command: self.commands[command][1], reverse=True)
+
+    def search(self, text: str, limit: int = 0) -> list[str]:
+        """Distinct commands containing 'text' (case-insensitive), most recent first."""
+        if self._search is None:
+            commands = self.by_recency()
+            offsets, offset = [], 0
+            for command in commands:
+                offsets.append(offset)
+                offset += len(command) + 1
+            self._search = ("\n".join(commands).lower(), offsets, commands)
+        haystack, offsets, commands = self._search
+        needle = text.lower()
+        found = []
+        position = haystack.find(needle)
+        while position >= 0:
+            index = bisect_right(offsets, position) - 1
+            found.append(commands[index])
+            if limit and len(found) >= limit:
+                break
+            if index + 1 >= len(offsets):
+                break
+            position = haystack.find(needle, offsets[index + 1])
+        return found
+
+    def frecency(self, count: int, last_sequence: int) -> float:
+        return count * 0.5 ** ((self.sequence - last_sequence) / HISTORY_HALF_LIFE)
+
+    def top_commands(self, limit: int) -> list[tuple[str, int]]:
+        ranked = sorted(self.commands.items(), key=lambda item: self.frecency(item[1][0], item[1][1]), reverse=True)
+        return [(command, entry[0]) for command, entry in ranked[:limit]]
+
+    def argument_suggestions(self, command_name: str, prefix: str, limit: int) -> list[str]:
+        """Arguments used before with command_name that start with prefix, best ranked first."""
+        per_command = self.arguments.get(command_name.lower())
+        if not per_command:
+            return []
+        candidates = [(self.frecency(*usage), argument) for argument, usage in per_command.items()
+                      if argument.startswith(prefix) and argument != prefix]
+        candidates.sort(reverse=True)
+        return [argument for _, argument in candidates[:limit]]
+
+
+class CommandHistory:
+    """The history file of this user, shared by every session, and its lazily built index."""
+
+    def __init__(self, path: str = None):
+        self._path = path
+        self._fd = None
+        self._index = HistoryIndex()
+        self._indexed_bytes = 0 # Bytes of the file parsed into the index (always whole lines)
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._loader = None
+        self._readline_synced = False
+        self._readline_loaded = 0 # Entries load_readline() gave readline; later ones were typed in this session
+
+    @property
+    def path(self) -> str:
+        if self._path is None:
+            self._path = config_file_path(HISTORY_FILE)
+        return self._path
+
+    def append(self, command: str):
+        """Records one command line (errors writing the history never reach the user)."""
+        command = command.strip()
+        if not command:
+            return
+        try:
+            record = encode_record(command, time.time())
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT | getattr(os, "O_CLOEXEC", 0), 0o600)
+                with open(self.path, "rb") as f: # A session that crashed mid-write may have left a partial line
+                    size = f.seek(0, os.SEEK_END)
+                    if size:
+                        f.seek(size - 1)
+                        if f.read(1) != b"\n":
+                            record = b"\n" + record
+            os.write(self._fd, record)
+        except OSError:
+            pass
+
+    def tail(self, count: int) -> list[tuple[int, str]]:
+        """The last 'count' records (unix time, command) in the file, oldest first, read from its end only."""
+        mapped, size = _mapped(self.path)
+        if mapped is None:
+            return []
+        try:
+            end = size if mapped[size - 1:size] == b"\n" else mapped.rfind(b"\n") + 1 # Skip a partial last line
+            start = end
+            for _ in range(count):
+                if start <= 0:
+                    break
+                start = mapped.rfind(b"\n", 0, start - 1) + 1
+            lines = mapped[start:end].decode("utf-8", "surrogateescape").splitlines()
+        finally:
+            mapped.close()
+        records = (decode_record(line) for line in lines)
+        return [record for record in records if record is not None]
+
+    def start_loading(self):
+        """Builds the index on a background thread (once)."""
+        with self._lock:
+            if self._loader is not None:
+                return
+            self._loader = threading.Thread(target=self._load, name="morel-history", daemon=True)
+        self._loader.start()
+
+    def _load(self):
+        try:
+            self.refresh()
+        finally:
+            self._ready.set()
+
+    def refresh(self):
+        """Indexes the records appended to the file since the last refresh (by any session)."""
+        with self._lock:
+            mapped, size = _mapped(self.path)
+            if mapped is None:
+                return
+            try:
+                if size < self._indexed_bytes: # Truncated or replaced: start over
+                    self._index, self._indexed_bytes = HistoryIndex(), 0
+                end = mapped.rfind(b"\n", self._indexed_bytes) + 1
+                if end <= self._indexed_bytes:
+                    return
+                text = mapped[self._indexed_bytes:end].decode("utf-8", "surrogateescape")
+            finally:
+                mapped.close()
+            self._indexed_bytes = end
+            index = self._index
+            for line in text.splitlines():
+                record = decode_record(line)
+                if record is not None:
+                    index.add(*record)
+
+    def index(self, wait: bool = True):
+        """The up-to-date index, or None if wait is False and it is still being built."""
+        if not self._ready.is_set():
+            if not wait:
+                return None
+            self.start_loading()
+            self._ready.wait()
+        self.refresh()
+        return self._index
+
+    def load_readline(self, readline):
+        """At startup: gives readline the tail of the file, and starts indexing the rest."""
+        for _, command in self.tail(HISTORY_READLINE_TAIL):
+            readline.add_history(command)
+        self._readline_loaded = readline.get_current_history_length()
+        self.start_loading()
+
+    def sync_readline(self, readline):
+        """
+        Called before each prompt: once the index is ready, replaces readline's history with the
+        distinct commands in order of last use, then the lines typed since load_readline() (which
+        the index may not have seen yet). Cheap (a flag check) once it has been done.
+        """
+        if self._readline_synced or not self._ready.is_set():
+            return
+        with self._lock:
+            recent = self._index.by_recency()[:HISTORY_READLINE_ENTRIES]
+        typed = [readline.get_history_item(position)
+                 for position in range(self._readline_loaded + 1, readline.get_current_history_length() + 1)]
+        typed = list(dict.fromkeys(reversed([command for command in typed if command])))[::-1] # Last use wins
+        typed_set = set(typed)
+        merged = [command for command in reversed(recent) if command not in typed_set] + typed
+        readline.clear_history()
+        for command in merged[-HISTORY_READLINE_ENTRIES:]:
+            readline.add_history(command)
+        self._readline_synced = True
+
+    def suggestions(self, command_name: str, prefix: str, limit: int) -> list[str]:
+        """Ranked arguments for completion; empty while the index is being built (Tab never waits)."""
+        index = self.index(wait=False)
+        if index is None:
+            return []
+        with self._lock:
+            return index.argument_suggestions(command_name, prefix, limit)
+
+
+# The history of this user, shared by the interactive shell and completion.
+HISTORY = CommandHistory()
+
+
+def _format_time(when: int) -> str:
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(when))
+
+
+def history_command_string(args: list[str], history: CommandHistory = HISTORY) -> str:
+    index = history.index()
+    if args and args[0] == "--top":
+        try:
+            limit = int(args[1]) if len(args) > 1 else HISTORY_DEFAULT_COUNT
+        except ValueError:
+            return "history: --top needs a number."
+        top = index.top_commands(limit)
+        if not top:
+            return "history: no commands recorded yet."
+        return "\n".join(f"{count:>7}  {command}" for command, count in top)
+
+    if args and args[0] == "-n":
+        try:
+            count = int(args[1])
+        except (IndexError, ValueError):
+            return "history: -n needs a number."
+        args = args[2:]
+    else:
+        count = HISTORY_DEFAULT_COUNT
+    if args: # Search
+        text = " ".join(args)
+        matches = index.search(text, count)
+        if not matches:
+            return f"history: no command contains '{text}'."
+        return "\n".join(f"{_format_time(index.commands[command][2])}  {command}" for command in matches)
+
+    recent = history.tail(count) if count else []
+    if not recent:
+        return "history: no commands recorded yet."
+    first_number = index.sequence - len(recent) + 1
+    return "\n".join(f"{first_number + offset:>7}  {_format_time(when)}  {command}"
+                     for offset, (when, command) in enumerate(recent))
+
+
+def history_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return history_command_string(args), current_path, False
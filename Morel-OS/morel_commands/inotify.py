@@ -0,0 +1,84 @@
+"""
+Minimal Linux inotify binding (ctypes, no third-party package) for the locate indexer.
+
+Only directory-entry changes are watched: an entry created, deleted or moved in a watched
+directory. read_changes() reports which directories changed, not what changed in them;
+the caller re-reads those directories.
+"""
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ONLYDIR | IN_DONT_FOLLOW
+
+_EVENT_HEADER = struct.Struct("iIII") # wd, mask, cookie, name length
+_READ_BYTES = 64 * 1024
+
+
+class Inotify:
+    """One inotify instance and the directory each of its watch descriptors belongs to."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+        self._paths = {} # Watch descriptor -> directory path
+
+    def add_watch(self, path: str) -> int:
+        """Watches one directory. Raises OSError (ENOSPC when out of watches, ENOENT if gone)."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error), path)
+        self._paths[wd] = path # The same directory (e.g. after a move) gets its old wd back
+        return wd
+
+    def read_changes(self, timeout: float) -> tuple[set, bool]:
+        """
+        Waits up to 'timeout' seconds for events. Returns (changed directory paths, overflowed);
+        overflowed means the kernel dropped events and the watched trees must be re-checked.
+        """
+        changed = set()
+        overflowed = False
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return changed, overflowed
+        while True:
+            try:
+                data = os.read(self.fd, _READ_BYTES)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size + name_length
+                if mask & IN_Q_OVERFLOW:
+                    overflowed = True
+                elif mask & IN_IGNORED: # The directory was deleted (or unmounted)
+                    self._paths.pop(wd, None)
+                elif wd in self._paths:
+                    changed.add(self._paths[wd])
+        return changed, overflowed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -0,0 +1,162 @@
+"""
+In-process execution for 'run --inproc': the script runs inside the shell's own interpreter.
+
+This is the fastest path for small trusted helper scripts that are run over and over:
+there is no process to start, modules the script imports stay loaded for the next run,
+and the compiled code object is cached (CompiledScriptCache), so an unchanged script is
+not even re-read. Because the script shares the shell's process it must be trusted:
+it can change anything the shell can.
+
+Each run gets the isolation runpy would give it plus a bit more: a fresh __main__
+namespace, its own sys.argv and sys.path, the cwd set to Morel OS's current path,
+stdin empty, and stdout/stderr recorded through the same OutputBuffers as a normal
+'run'. All of that is restored afterwards. Any exception, SystemExit and Ctrl+C
+included, ends the script, never the shell.
+
+The script runs to completion before its output is shown (like 'run --capture'),
+since the shell's own stdout is redirected while it runs.
+"""
+import builtins
+import io
+import os
+import sys
+import threading
+import traceback
+import types
+from collections import OrderedDict
+from importlib.util import source_hash
+
+from morel_commands.run import RUN_MEMORY_CAP_BYTES, RUN_SPILL_TO_FILE, RecordedRun
+from morel_commands.warm_worker import script_traceback, system_exit_code
+
+INPROC_CACHE_MAX_SCRIPTS = 64 # Compiled code objects kept; least recently used are evicted beyond this
+
+_inproc_lock = threading.Lock() # sys.stdout, argv and the cwd are process-wide, so one in-process run at a time
+
+
+class CompiledScriptCache:
+    """
+    Bounded, thread-safe LRU of compiled scripts keyed by absolute path.
+    A cached entry is reused while the file's (mtime_ns, size) is unchanged. If the stat
+    changed, the source is re-read and hashed, and only recompiled if the hash differs
+    (so a 'touch' or a checkout that rewrites identical content costs a read, not a compile).
+    """
+
+    def __init__(self, max_scripts: int = INPROC_CACHE_MAX_SCRIPTS):
+        self.max_scripts = max_scripts
+        self._scripts = OrderedDict() # path -> (mtime_ns, size, source hash, code object)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.compiles = 0
+
+    def get_code(self, path: str) -> types.CodeType:
+        """Returns the code object for the script at 'path'. Raises OSError or SyntaxError."""
+        stat_result = os.stat(path)
+        with self._lock:
+            cached = self._scripts.get(path)
+            if cached is not None and cached[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+                self._scripts.move_to_end(path)
+                self.hits += 1
+                return cached[3]
+
+        with open(path, "rb") as script_file:
+            source = script_file.read()
+        source_digest = source_hash(source)
+        unchanged = cached is not None and cached[2] == source_digest
+        code = cached[3] if unchanged else compile(source, path, "exec", dont_inherit=True)
+        with self._lock:
+            if unchanged:
+                self.hits += 1
+            else:
+                self.compiles += 1
+            self._scripts[path] = (stat_result.st_mtime_ns, stat_result.st_size, source_digest, code)
+            self._scripts.move_to_end(path)
+            while len(self._scripts) > self.max_scripts:
+                self._scripts.popitem(last=False)
+        return code
+
+    def clear(self):
+        with self._lock:
+            self._scripts.clear()
+
+
+COMPILED_SCRIPT_CACHE = CompiledScriptCache()
+
+
+class _LineRecorder(io.TextIOBase):
+    """A text stream that hands each complete line to RecordedRun.record_line()."""
+
+    def __init__(self, script_run: RecordedRun, stream_name: str):
+        self._script_run = script_run
+        self._stream_name = stream_name
+        self._partial = ""
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._script_run.record_line(self._stream_name, line)
+        return len(text)
+
+    def finish(self):
+        if self._partial:
+            self._script_run.record_line(self._stream_name, self._partial)
+            self._partial = ""
+
+
+def run_inproc(script_path: str, script_args: list[str], current_path: str,
+               max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE) -> tuple[RecordedRun, int]:
+    """
+    Runs the script in this interpreter and returns (recorded output, exit code).
+    Raises OSError if the script cannot be read; every error raised by the script itself
+    (including a SyntaxError) is reported on its stderr with exit code 1.
+    """
+    script_run = RecordedRun(max_memory_bytes, spill, sink=lambda item: None) # Buffers only, nothing reads a queue
+    stdout_recorder = _LineRecorder(script_run, "stdout")
+    stderr_recorder = _LineRecorder(script_run, "stderr")
+    main_module = types.ModuleType("__main__")
+    main_module.__dict__.update(__file__=script_path, __builtins__=builtins, __loader__=None,
+                                __spec__=None, __package__=None, __cached__=None)
+
+    with _inproc_lock:
+        saved_argv, saved_path, saved_cwd = sys.argv, sys.path[:], os.getcwd()
+        saved_streams = sys.stdin, sys.stdout, sys.stderr
+        saved_main = sys.modules.get("__main__")
+        exit_code = 0
+        started = False
+        try:
+            sys.stdin, sys.stdout, sys.stderr = io.StringIO(), stdout_recorder, stderr_recorder
+            try:
+                code = COMPILED_SCRIPT_CACHE.get_code(script_path) # Inside the redirect, so a SyntaxError lands in stderr
+                os.chdir(current_path)
+                sys.argv = [script_path] + list(script_args)
+                sys.path[0] = os.path.dirname(script_path) # What 'python script.py' puts first on sys.path
+                sys.modules["__main__"] = main_module
+                started = True
+                exec(code, main_module.__dict__)
+            except SystemExit as e:
+                exit_code = system_exit_code(e)
+            except OSError as e:
+                if not started: # Reading the script (or entering its directory) failed, not the script itself
+                    raise
+                traceback.print_exception(type(e), e, script_traceback(e, script_path))
+                exit_code = 1
+            except BaseException as e: # Includes KeyboardInterrupt: Ctrl+C stops the script, not the shell
+                traceback.print_exception(type(e), e, script_traceback(e, script_path))
+                exit_code = 1
+        finally:
+            stdout_recorder.finish()
+            stderr_recorder.finish()
+            sys.stdin, sys.stdout, sys.stderr = saved_streams
+            if saved_main is not None:
+                sys.modules["__main__"] = saved_main
+            sys.argv, sys.path[:] = saved_argv, saved_path
+            os.chdir(saved_cwd)
+            script_run.record_eof("stdout")
+            script_run.record_eof("stderr")
+            script_run._finish_buffers()
+    return script_run, exit_code
+
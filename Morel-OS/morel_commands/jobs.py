@@ -0,0 +1,440 @@
+"""
+Background jobs for the Morel shell.
+
+  run <script.py> [args...] &   - start a script in the background, prints "[id] pid"
+  jobs                          - list jobs with status, PID, elapsed time and CPU time
+  fg [id]                       - show a job's output so far, then follow it until it exits
+                                  (Ctrl+C returns to the prompt and leaves the job running)
+  wait [id...]                  - block until the given jobs (default: all) have exited
+
+fg and wait own no process that a front end could kill to cancel them, so they also give
+up (leaving the jobs running) when the CANCEL_EVENT of the command is set.
+  kill [-SIGNAL] id...          - send a signal (default SIGTERM) to jobs
+
+Job ids may be written as '1' or '%1'. Like a shell, the table forgets a finished job once it
+has been announced: at once if it printed nothing, otherwise when 'fg' has shown its output or
+when more than JOBS_KEEP_FINISHED newer finished jobs are waiting to be read. Each job's stdout and stderr are recorded in the
+same capped/spillable OutputBuffers that 'run' uses, so a chatty background script never
+blocks on a full pipe and never stalls the prompt.
+"""
+import atexit
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+from morel_commands import CANCEL_EVENT, JOB_TABLE
+from morel_commands.run import RUN_MEMORY_CAP_BYTES, RUN_SPILL_TO_FILE, RUN_STREAM_BATCH_LINES, ScriptRun
+
+_CANCEL_POLL_SECONDS = 0.1 # How often a blocked fg or wait checks CANCEL_EVENT
+JOBS_KEEP_FINISHED = 10 # Announced jobs whose output can still be read with 'fg'; older ones are removed
+
+try:
+    _CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+except (AttributeError, ValueError, OSError): # Not on POSIX
+    _CLOCK_TICKS = None
+
+
+def _format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
+
+
+def _describe_returncode(returncode: int) -> str:
+    if returncode == 0:
+        return "Done"
+    if returncode < 0: # Killed by a signal (POSIX)
+        try:
+            return f"Killed ({signal.Signals(-returncode).name})"
+        except ValueError:
+            return f"Killed (signal {-returncode})"
+    return f"Exit {returncode}"
+
+
+class Job:
+    """One background script: its ScriptRun, timing, CPU usage and (optional) attached follower."""
+
+    def __init__(self, job_id: int, command: list[str], cwd: str, description: str,
+                 max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE):
+        self.job_id = job_id
+        self.description = description
+        self.started = time.monotonic()
+        self.ended = None
+        self.cpu_seconds = None # Final user+sys time, known once the job has been reaped
+        self.notified = False # Whether the shell has announced that this job finished
+        self._follower = None # queue.SimpleQueue fed while 'fg' is following the job
+        self._done = threading.Event()
+        self.script_run = ScriptRun(command, cwd, max_memory_bytes, spill, sink=self._record)
+        self._waiter = threading.Thread(target=self._wait_for_exit, daemon=True)
+        self._waiter.start()
+
+    @property
+    def pid(self) -> int:
+        return self.script_run.process.pid
+
+    @property
+    def returncode(self):
+        return self.script_run.process.returncode if self.done else None
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    @property
+    def status(self) -> str:
+        return _describe_returncode(self.returncode) if self.done else "Running"
+
+    @property
+    def elapsed_seconds(self) -> float:
+        return (self.ended if self.ended is not None else time.monotonic()) - self.started
+
+    def _record(self, item):
+        # Called by the reader threads with ScriptRun.record_lock held. Must never block:
+        # the follower queue is unbounded, and the buffers already cap what is kept.
+        follower = self._follower
+        if follower is not None:
+            follower.put(item)
+
+    def _wait_for_exit(self):
+        process = self.script_run.process
+        if hasattr(os, "wait4"):
+            # Reap the child ourselves to get its resource usage; Popen then sees the returncode we set.
+            try:
+                _, status, rusage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+                self.cpu_seconds = rusage.ru_utime + rusage.ru_stime
+            except ChildProcessError:
+                process.wait()
+        else:
+            process.wait()
+        self.script_run.wait() # Joins the reader threads, so all output is recorded
+        self.ended = time.monotonic()
+        self._done.set()
+
+    def current_cpu_seconds(self):
+        """User+sys CPU time so far, or None where it cannot be read (running job on a non-Linux system)."""
+        if self.done:
+            return self.cpu_seconds
+        if _CLOCK_TICKS is None:
+            return None
+        try:
+            with open(f"/proc/{self.pid}/stat") as stat_file:
+                fields = stat_file.read().rsplit(")", 1)[1].split()
+            return (int(fields[11]) + int(fields[12])) / _CLOCK_TICKS # utime + stime, in clock ticks
+        except (OSError, IndexError, ValueError):
+            return None
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def follow(self):
+        """
+        Returns (stdout_so_far, stderr_so_far, follower_queue, open_streams). The queue then receives
+        every (stream_name, line) recorded after the snapshot; line is None at each stream's EOF,
+        and open_streams says how many EOFs are still to come.
+        """
+        follower = queue.SimpleQueue()
+        with self.script_run.record_lock:
+            stdout_text = self.script_run.stdout_buffer.getvalue()
+            stderr_text = self.script_run.stderr_buffer.getvalue()
+            open_streams = self.script_run.open_streams
+            self._follower = follower
+        return stdout_text, stderr_text, follower, open_streams
+
+    def unfollow(self):
+        with self.script_run.record_lock:
+            self._follower = None
+
+    def send_signal(self, signal_number: int):
+        if not self.done:
+            self.script_run.process.send_signal(signal_number)
+
+    def close(self):
+        """Kills the job if it is still running and discards its recorded output (see OutputBuffer.close())."""
+        if not self.done:
+            try:
+                self.script_run.process.kill()
+            except OSError:
+                pass
+        self.script_run.stdout_buffer.close()
+        self.script_run.stderr_buffer.close()
+
+    @property
+    def has_output(self) -> bool:
+        return bool(self.script_run.stdout_buffer.line_count or self.script_run.stderr_buffer.line_count)
+
+    def overflow_notes(self) -> list[str]:
+        return [note for note in (self.script_run.stdout_buffer.describe_overflow(),
+                                  self.script_run.stderr_buffer.describe_overflow()) if note]
+
+
+class JobTable:
+    """All background jobs of this shell session."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def start(self, command: list[str], cwd: str, description: str,
+              max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE) -> Job:
+        with self._lock:
+            job_id = self._next_id
+            self._next_id += 1
+        job = Job(job_id, command, cwd, description, max_memory_bytes, spill)
+        with self._lock:
+            self._jobs[job_id] = job
+        return job
+
+    def get(self, job_id: int):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def all(self) -> list[Job]:
+        with self._lock:
+            return [self._jobs[job_id] for job_id in sorted(self._jobs)]
+
+    def latest(self):
+        jobs = self.all()
+        return jobs[-1] if jobs else None
+
+    def remove(self, job_id: int):
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+        if job is not None:
+            job.close()
+
+    def finished_notifications(self) -> list[str]:
+        """'[id]  Done  script.py' lines for jobs that finished since the last call (shown before the prompt)."""
+        lines = []
+        for job in self.all():
+            if job.done and not job.notified:
+                job.notified = True
+                lines.append(f"[{job.job_id}]  {job.status:<18} {job.description}")
+        self.remove_announced()
+        return lines
+
+    def remove_announced(self):
+        """Removes announced jobs with nothing left to read, and all but the newest JOBS_KEEP_FINISHED others."""
+        announced = [job for job in self.all() if job.done and job.notified]
+        unread = [job for job in announced if job.has_output]
+        for job in announced:
+            if not job.has_output:
+                self.remove(job.job_id)
+        for job in unread[:max(len(unread) - JOBS_KEEP_FINISHED, 0)]:
+            self.remove(job.job_id)
+
+    def terminate_all(self):
+        for job in self.all():
+            job.close()
+
+
+# The job table of this shell process. Running jobs are killed when the shell exits.
+JOBS = JobTable()
+atexit.register(JOBS.terminate_all)
+
+
+def current_jobs() -> JobTable:
+    """The job table of the session running the current command (see JOB_TABLE)."""
+    jobs = JOB_TABLE.get()
+    return JOBS if jobs is None else jobs
+
+
+def start_background_job(current_path: str, resolved_script_path: str, script_name_arg: str, script_args: list[str],
+                         max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE) -> str:
+    description = " ".join([script_name_arg] + script_args)
+    try:
+        job = current_jobs().start([sys.executable, resolved_script_path] + script_args, current_path, description,
+                         max_memory_bytes, spill)
+    except Exception as e:
+        return f"run: failed to execute script '{script_name_arg}': {e}"
+    return f"[{job.job_id}] {job.pid}"
+
+
+def _parse_job_id(job_arg: str):
+    try:
+        return int(job_arg[1:] if job_arg.startswith("%") else job_arg)
+    except ValueError:
+        return None
+
+
+def _lookup_job(command: str, job_arg: str):
+    """Returns (job, error_message)."""
+    if job_arg is None:
+        job = current_jobs().latest()
+        return (job, "") if job else (None, f"{command}: no current job")
+    job_id = _parse_job_id(job_arg)
+    if job_id is None:
+        return None, f"{command}: invalid job id: {job_arg}"
+    job = current_jobs().get(job_id)
+    return (job, "") if job else (None, f"{command}: no such job: {job_arg}")
+
+
+def jobs_command_string() -> str:
+    jobs = current_jobs().all()
+    if not jobs:
+        return "No background jobs."
+    lines = [f"{'ID':<5} {'Status':<18} {'PID':>7}  {'Elapsed':>8}  {'CPU':>8}  Command"]
+    for job in jobs:
+        cpu_seconds = job.current_cpu_seconds()
+        cpu = f"{cpu_seconds:.2f}s" if cpu_seconds is not None else "-"
+        lines.append(f"{'[' + str(job.job_id) + ']':<5} {job.status:<18} {job.pid:>7}  "
+                     f"{_format_seconds(job.elapsed_seconds):>8}  {cpu:>8}  {job.description}")
+        if job.done:
+            job.notified = True
+    return "\n".join(lines)
+
+
+class _Cancelled(Exception):
+    """Raised inside fg when the front end cancels it; handled like Ctrl+C."""
+
+
+def _wait_or_cancel(wait, cancel_event):
+    """
+    Calls wait(timeout) until it returns something other than None or False.
+    Raises _Cancelled once cancel_event is set; without one, simply calls wait(None).
+    """
+    if cancel_event is None:
+        return wait(None)
+    while True:
+        result = wait(_CANCEL_POLL_SECONDS)
+        if result is not None and result is not False:
+            return result
+        if cancel_event.is_set():
+            raise _Cancelled()
+
+
+def _follower_get(follower: queue.SimpleQueue):
+    def get(timeout):
+        try:
+            return follower.get(timeout=timeout)
+        except queue.Empty:
+            return None
+    return get
+
+
+def fg_command_stream(job: Job, jobs: JobTable, cancel_event=None):
+    """
+    Prints what the job has produced so far, then follows it live until it exits, then removes
+    it from 'jobs'. Ctrl+C, or setting cancel_event, stops following and leaves the job running.
+    """
+    stdout_text, stderr_text, follower, open_streams = job.follow()
+    current_stream = None
+    try:
+        snapshot = []
+        if stdout_text:
+            snapshot += ["Output:", stdout_text]
+            current_stream = "stdout"
+        if stderr_text:
+            snapshot += ["Errors:", stderr_text]
+            current_stream = "stderr"
+        if snapshot:
+            yield "\n".join(snapshot)
+
+        while open_streams:
+            lines = []
+            # Block for the next line, then take whatever else is waiting
+            item = _wait_or_cancel(_follower_get(follower), cancel_event)
+            while True:
+                stream_name, line = item
+                if line is None:
+                    open_streams -= 1
+                else:
+                    if stream_name != current_stream:
+                        current_stream = stream_name
+                        lines.append("Output:" if stream_name == "stdout" else "Errors:")
+                    lines.append(line)
+                if not open_streams or len(lines) >= RUN_STREAM_BATCH_LINES:
+                    break
+                try:
+                    item = follower.get_nowait()
+                except queue.Empty:
+                    break
+            if lines:
+                yield "\n".join(lines)
+        job.wait()
+    except (KeyboardInterrupt, _Cancelled):
+        job.unfollow()
+        yield f"\n[{job.job_id}]  Running            {job.description} (still in the background)"
+        return
+    job.unfollow()
+    jobs.remove(job.job_id)
+    yield "\n".join(job.overflow_notes() + [f"[{job.job_id}]  {job.status:<18} {job.description}"])
+
+
+def wait_command_string(args: list[str], cancel_event=None) -> str:
+    if args:
+        jobs = []
+        for job_arg in args:
+            job, error_message = _lookup_job("wait", job_arg)
+            if error_message:
+                return error_message
+            jobs.append(job)
+    else:
+        jobs = current_jobs().all()
+    if not jobs:
+        return "wait: no background jobs."
+    try:
+        for job in jobs:
+            _wait_or_cancel(job.wait, cancel_event)
+    except (KeyboardInterrupt, _Cancelled):
+        return "wait: interrupted (jobs are still running)."
+    for job in jobs:
+        job.notified = True
+    return "\n".join(f"[{job.job_id}]  {job.status:<18} {job.description}" for job in jobs)
+
+
+def kill_command_string(args: list[str]) -> str:
+    usage = "kill: usage: kill [-SIGNAL] <job_id>..."
+    signal_number = signal.SIGTERM
+    if args and args[0].startswith("-"):
+        signal_name = args[0][1:].upper()
+        try:
+            signal_number = int(signal_name) if signal_name.isdigit() else signal.Signals[
+                signal_name if signal_name.startswith("SIG") else "SIG" + signal_name]
+        except KeyError:
+            return f"kill: unknown signal: {args[0][1:]}"
+        args = args[1:]
+    if not args:
+        return usage
+
+    messages = []
+    for job_arg in args:
+        job, error_message = _lookup_job("kill", job_arg)
+        if error_message:
+            messages.append(error_message)
+        elif job.done:
+            messages.append(f"kill: job [{job.job_id}] has already finished")
+        else:
+            try:
+                job.send_signal(signal_number)
+                try:
+                    signal_label = signal.Signals(signal_number).name
+                except ValueError:
+                    signal_label = str(signal_number)
+                messages.append(f"[{job.job_id}] sent {signal_label}")
+            except (OSError, ValueError) as e:
+                messages.append(f"kill: failed to signal job [{job.job_id}]: {e}")
+    return "\n".join(messages)
+
+
+def jobs_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return jobs_command_string(), current_path, False
+
+
+def fg_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    job, error_message = _lookup_job("fg", args[0] if args else None)
+    if error_message:
+        return error_message, current_path, False
+    return fg_command_stream(job, current_jobs(), CANCEL_EVENT.get()), current_path, False
+
+
+def wait_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return wait_command_string(args, CANCEL_EVENT.get()), current_path, False
+
+
+def kill_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return kill_command_string(args), current_path, False
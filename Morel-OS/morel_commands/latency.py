@@ -0,0 +1,179 @@
+"""
+Per-command latency histograms, fed by execute_morel_command, and the 'stats' command.
+
+  stats [command]          - count, mean, p50, p95, p99 and max per command this session
+  stats --json [command]   - the same, plus the histogram buckets, as JSON
+  stats --reset            - forget everything recorded so far
+
+Every command line is timed with perf_counter_ns, under the command's name (aliases count
+as the command they point to; pipelines as 'pipeline'). For streamed output the time spent
+producing the chunks is added, but not the time the caller spends printing them.
+
+A histogram is a fixed array of log-linear buckets: 8 per power of two, so any latency
+from 1 ns to centuries lands in one of 512 buckets with at most 12.5% error. Recording is
+a bit_length(), a shift and an increment; nothing is allocated and nothing is sorted.
+"""
+import threading
+import time
+
+_SUB_BUCKET_BITS = 3
+_SUB_BUCKETS = 1 << _SUB_BUCKET_BITS
+_BUCKET_COUNT = 64 * _SUB_BUCKETS
+
+
+def bucket_index(nanoseconds: int) -> int:
+    if nanoseconds < _SUB_BUCKETS:
+        return max(nanoseconds, 0)
+    shift = nanoseconds.bit_length() - 1 - _SUB_BUCKET_BITS
+    return ((shift + 1) << _SUB_BUCKET_BITS) | ((nanoseconds >> shift) & (_SUB_BUCKETS - 1))
+
+
+def bucket_bounds(index: int) -> tuple[int, int]:
+    """[low, high) nanoseconds covered by a bucket."""
+    if index < _SUB_BUCKETS:
+        return index, index + 1
+    shift = (index >> _SUB_BUCKET_BITS) - 1
+    mantissa = _SUB_BUCKETS | (index & (_SUB_BUCKETS - 1))
+    return mantissa << shift, (mantissa + 1) << shift
+
+
+class LatencyHistogram:
+    """Latencies of one command."""
+
+    __slots__ = ("counts", "count", "total_ns", "min_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKET_COUNT
+        self.count = 0
+        self.total_ns = 0
+        self.min_ns = None
+        self.max_ns = 0
+
+    def record(self, nanoseconds: int):
+        self.counts[bucket_index(nanoseconds)] += 1
+        self.count += 1
+        self.total_ns += nanoseconds
+        if self.min_ns is None or nanoseconds < self.min_ns:
+            self.min_ns = nanoseconds
+        if nanoseconds > self.max_ns:
+            self.max_ns = nanoseconds
+
+    def percentile(self, fraction: float) -> int:
+        """Approximate latency (ns) below which 'fraction' of the calls fall."""
+        if not self.count:
+            return 0
+        rank = max(1, round(fraction * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return min(max((low + high) // 2, self.min_ns), self.max_ns)
+        return self.max_ns
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "mean_ms": self.total_ns / self.count / 1e6 if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) / 1e6,
+            "p95_ms": self.percentile(0.95) / 1e6,
+            "p99_ms": self.percentile(0.99) / 1e6,
+            "max_ms": self.max_ns / 1e6,
+        }
+
+    def buckets(self) -> list[list[int]]:
+        """Non-empty buckets as [low_ns, high_ns, count]."""
+        return [[*bucket_bounds(index), count] for index, count in enumerate(self.counts) if count]
+
+
+class LatencyRecorder:
+    """One histogram per command name."""
+
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock() # Commands can run on GUI and job threads too
+        self.started = time.time()
+
+    def add(self, name: str, nanoseconds: int):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.record(nanoseconds)
+
+    def record(self, name: str, started_ns: int, output):
+        """
+        Records a command that started at started_ns (perf_counter_ns) and returned 'output'.
+        A string is recorded now; a stream is returned wrapped, and recorded once it is
+        exhausted or closed.
+        """
+        elapsed = time.perf_counter_ns() - started_ns
+        if isinstance(output, str):
+            self.add(name, elapsed)
+            return output
+        return self._timed_stream(name, elapsed, output)
+
+    def _timed_stream(self, name: str, elapsed: int, output):
+        iterator = iter(output)
+        try:
+            while True:
+                chunk_started = time.perf_counter_ns()
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter_ns() - chunk_started
+                    break
+                elapsed += time.perf_counter_ns() - chunk_started
+                yield chunk
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                close()
+            self.add(name, elapsed)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: (histogram.summary(), histogram.buckets()) for name, histogram in self._histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self.started = time.time()
+
+
+# The recorder execute_morel_command reports to (one per process, shared by both front ends).
+COMMAND_LATENCY = LatencyRecorder()
+
+
+def stats_command_string(args: list[str], recorder: LatencyRecorder = COMMAND_LATENCY) -> str:
+    as_json = "--json" in args
+    if "--reset" in args:
+        recorder.reset()
+        return "Command statistics cleared."
+    names = [arg for arg in args if not arg.startswith("--")]
+    snapshot = recorder.snapshot()
+    if names:
+        snapshot = {name: data for name, data in snapshot.items() if name in names}
+
+    if as_json:
+        import json # Only needed here; the engine imports this module at startup
+        return json.dumps({
+            "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(recorder.started)),
+            "commands": {name: dict(summary, buckets_ns=buckets) for name, (summary, buckets) in sorted(snapshot.items())},
+        }, indent=2)
+    if not snapshot:
+        return "stats: no commands recorded yet." if not names else f"stats: no calls of {', '.join(names)} recorded."
+
+    lines = [f"{'command':<12}{'count':>8}{'mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}  (ms)"]
+    by_total_time = sorted(snapshot.items(), key=lambda item: item[1][0]["mean_ms"] * item[1][0]["count"], reverse=True)
+    for name, (summary, _) in by_total_time:
+        lines.append(f"{name:<12}{summary['count']:>8}" + "".join(
+            f"{summary[key]:>10.2f}" for key in ("mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms")))
+    return "\n".join(lines)
+
+
+def stats_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    unknown = [arg for arg in args if arg.startswith("--") and arg not in ("--json", "--reset")]
+    if unknown:
+        return f"stats: unknown option {unknown[0]}. Usage: stats [--json] [--reset] [command...]", current_path, False
+    return stats_command_string(args), current_path, False
@@ -0,0 +1,34 @@
+"""The 'open' command: opens a file with its default application or runs an executable."""
+import os
+import subprocess
+import sys
+
+
+def open_command_string(app_to_open: str, app_args_for_open: list[str]) -> str:
+    output_string = f"Attempting to open '{app_to_open}'..."
+    try:
+        if os.name == 'nt': # For Windows
+            try:
+                os.startfile(app_to_open)
+                output_string = f"Attempting to open '{app_to_open}' with default application..."
+            except OSError: # Catch specific error from startfile
+                # If startfile fails, try Popen for executables or commands in PATH
+                subprocess.Popen([app_to_open] + app_args_for_open, creationflags=subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP, close_fds=True)
+                output_string = f"Attempting to launch '{app_to_open}' as a command..."
+        elif sys.platform == 'darwin': # For macOS
+            subprocess.Popen(['open', app_to_open] + app_args_for_open)
+        elif sys.platform.startswith('linux'): # For Linux
+            subprocess.Popen(['xdg-open', app_to_open] + app_args_for_open)
+        else:
+            output_string = f"open: unsupported operating system '{sys.platform}'"
+    except FileNotFoundError:
+        output_string = f"open: command or application '{app_to_open}' not found."
+    except Exception as e:
+        output_string = f"open: failed to open '{app_to_open}'. Error: {e}"
+    return output_string
+
+
+def open_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    if not args:
+        return "open: missing application name or path", current_path, False
+    return open_command_string(args[0], args[1:]), current_path, False
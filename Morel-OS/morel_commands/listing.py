@@ -0,0 +1,149 @@
+"""
+Directory listing engine for the 'ls' command.
+
+Built on os.scandir: DirEntry.is_dir() uses the file type the OS already returned
+with the directory entry, so a plain listing does no per-entry stat() call, and the
+long format (-l) reuses the single stat result DirEntry caches for size and mtime.
+
+Plain sorted listings come from the shared DirectoryCache (see dircache.py), so
+listing an unchanged directory again costs one stat() of the directory itself.
+
+Output is produced as a stream of chunks (up to LS_CHUNK_SIZE lines each) so the
+caller can print the first entries of a huge directory while the rest is formatted.
+"""
+import os
+import time
+from operator import attrgetter
+
+from morel_commands.dircache import DIRECTORY_CACHE
+
+LS_CHUNK_SIZE = 1000 # Lines per streamed chunk
+
+_entry_name = attrgetter("name")
+
+
+def resolve_listing_path(current_os_path: str, path_arg: str = None) -> str:
+    """Resolves the 'ls' argument against Morel OS's current path."""
+    if path_arg is None:
+        return current_os_path
+    if os.path.isabs(path_arg):
+        return path_arg
+    return os.path.abspath(os.path.join(current_os_path, path_arg))
+
+
+def format_line(name: str, is_dir: bool, rich_markup: bool = False) -> str:
+    """Formats one 'ls' output line."""
+    if rich_markup:
+        # These style tags will be interpreted by console.print() if it's the Rich console
+        if is_dir:
+            return f"[bold cyan]📁 {name}[/bold cyan]"
+        return f"[white]📄 {name}[/white]" # Must be a file or link, treat as file for simplicity
+    return f"D: {name}" if is_dir else f"F: {name}"
+
+
+def format_entry(entry: os.DirEntry, rich_markup: bool = False, long_format: bool = False) -> str:
+    """Formats one DirEntry as an 'ls' output line."""
+    try:
+        is_dir = entry.is_dir()
+    except OSError:
+        is_dir = False # Broken entry, treat as file for simplicity
+
+    if not long_format:
+        return format_line(entry.name, is_dir, rich_markup)
+    try:
+        stat_result = entry.stat() # Cached on the DirEntry after the first call
+        size = str(stat_result.st_size)
+        mtime = time.strftime("%Y-%m-%d %H:%M", time.localtime(stat_result.st_mtime))
+    except OSError: # e.g. a dangling symlink
+        size, mtime = "?", "?"
+    return format_line(f"{size:>12}  {mtime}  {entry.name}", is_dir, rich_markup)
+
+
+def _chunks(lines, chunk_size: int):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= chunk_size:
+            yield "\n".join(batch)
+            batch = []
+    if batch:
+        yield "\n".join(batch)
+
+
+def _entry_lines(entries, rich_markup: bool, long_format: bool):
+    return (format_entry(entry, rich_markup, long_format) for entry in entries)
+
+
+def _unsorted_chunks(scandir_iterator, target_path_display: str, rich_markup: bool, long_format: bool, chunk_size: int):
+    """Large-directory mode: each batch is sorted on its own and emitted as soon as it has been read."""
+    produced_any = False
+    with scandir_iterator:
+        batch = []
+        try:
+            for entry in scandir_iterator:
+                batch.append(entry)
+                if len(batch) >= chunk_size:
+                    batch.sort(key=_entry_name)
+                    yield from _chunks(_entry_lines(batch, rich_markup, long_format), chunk_size)
+                    produced_any = True
+                    batch = []
+        except OSError as e:
+            yield f"ls: error reading '{target_path_display}': {e}"
+            return
+        if batch:
+            batch.sort(key=_entry_name)
+            yield from _chunks(_entry_lines(batch, rich_markup, long_format), chunk_size)
+            produced_any = True
+    if not produced_any:
+        yield f"Directory '{target_path_display}' is empty."
+
+
+def _access_error(error: Exception, path_arg: str, target_path_display: str) -> str:
+    if isinstance(error, FileNotFoundError):
+        return f"ls: cannot access '{target_path_display}': No such file or directory"
+    if isinstance(error, NotADirectoryError):
+        if path_arg is not None: # Only error if they tried to list contents of a file path
+            return f"ls: cannot list contents of '{target_path_display}': Not a directory"
+        return f"ls: current path '{target_path_display}' is not a directory."
+    if isinstance(error, PermissionError):
+        return f"ls: cannot open directory '{target_path_display}': Permission denied"
+    return f"ls: error accessing '{target_path_display}': {error}"
+
+
+def ls_command_stream(current_os_path: str, path_arg: str = None, long_format: bool = False,
+                      unsorted: bool = False, rich_markup: bool = False, chunk_size: int = LS_CHUNK_SIZE):
+    """
+    Lists the directory named by path_arg (relative to current_os_path).
+    Returns an error message string, or an iterator of output chunks.
+    With unsorted=True (large-directory mode) entries are streamed in scandir order,
+    one sorted chunk at a time, instead of reading the whole directory before printing.
+    """
+    target_path_display = path_arg if path_arg else "." # For error messages
+    resolved_target_path = resolve_listing_path(current_os_path, path_arg)
+
+    if not long_format and not unsorted:
+        try:
+            listing = DIRECTORY_CACHE.get_listing(resolved_target_path)
+        except Exception as e:
+            return _access_error(e, path_arg, target_path_display)
+        if not listing:
+            return f"Directory '{target_path_display}' is empty."
+        return _chunks((format_line(name, is_dir, rich_markup) for name, is_dir in listing.entries), chunk_size)
+
+    try:
+        scandir_iterator = os.scandir(resolved_target_path)
+    except Exception as e:
+        return _access_error(e, path_arg, target_path_display)
+
+    if unsorted:
+        return _unsorted_chunks(scandir_iterator, target_path_display, rich_markup, long_format, chunk_size)
+
+    try:
+        with scandir_iterator:
+            entries = list(scandir_iterator)
+    except Exception as e:
+        return _access_error(e, path_arg, target_path_display)
+    if not entries:
+        return f"Directory '{target_path_display}' is empty."
+    entries.sort(key=_entry_name) # Sort for consistent output
+    return _chunks(_entry_lines(entries, rich_markup, long_format), chunk_size)
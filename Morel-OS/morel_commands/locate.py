@@ -0,0 +1,558 @@
+"""
+The 'locate' command: instant path search over an on-disk SQLite index.
+
+  locate [-n N] [-d | -f] <pattern>   - paths containing 'pattern' (case-insensitive);
+                                        a pattern with * ? [ ] must match the whole path
+  locate --add-root <dir>             - index a directory tree (and start indexing it)
+  locate --remove-root <dir>          - stop indexing a tree and drop its entries
+  locate --roots | --status           - show the indexed trees / the indexer's state
+  locate --update                     - re-check every indexed tree now
+
+The index (LOCATE_DB_FILE in the Morel config directory, see config.py) holds one row
+per file or directory under the configured roots, plus each directory's mtime. Path
+search uses an FTS5 table with the trigram tokenizer, so a substring query is an index
+lookup rather than a scan of every path; patterns shorter than three characters, and
+SQLite builds without trigram support, fall back to LIKE.
+
+The index is maintained by a background thread in the shell process, started by the
+first 'locate' of the session, so interactive queries never wait for it. It first walks every root,
+stat()ing each directory and re-reading only those whose mtime differs from the index
+(as 'du' does). On Linux it then watches the directories with inotify and re-reads a
+directory as soon as an entry is created, deleted or moved in it. Without inotify, or
+when the trees have more directories than the inotify watch limit allows, it repeats
+the mtime walk every LOCATE_POLL_SECONDS instead. Until its first walk has finished, a
+query notes that the index is still being built.
+
+In a script or -c run (INTERACTIVE is False) the process exits after its last command,
+taking the indexer thread with it, so there 'locate --add-root', '--remove-root' and
+'--update' wait for the walk, and a query waits for the first walk, each for at most
+LOCATE_BATCH_WAIT_SECONDS. A walk cut short is committed as far as it got, and the
+next run continues from there (directories whose mtime is unchanged are not re-read).
+
+The results of the last 'locate' can be used as @1, @2, ... in 'cd', 'open' and 'run'
+('cd @3' goes to the directory containing result 3 if it is a file).
+"""
+import fnmatch
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+from morel_commands import INTERACTIVE, PLAIN_OUTPUT
+from morel_commands.config import config_file_path
+
+LOCATE_DB_FILE = "locate.db"
+LOCATE_DEFAULT_LIMIT = 200 # Results shown when -n is not given; -n 0 shows all
+LOCATE_POLL_SECONDS = 60.0 # Interval between mtime walks when inotify is not used
+LOCATE_BATCH_WAIT_SECONDS = 30.0 # Longest a non-interactive command waits for the indexer's walk
+LOCATE_PRUNE_NAMES = {".git", ".hg", ".svn", "__pycache__"} # Directories not indexed (like updatedb's PRUNENAMES)
+LOCATE_MAX_REFERENCES = 1000 # Results of the last query that can be used as @N
+_COMMIT_EVERY = 500 # Directories re-read per write transaction, so queries see progress
+_STREAM_BATCH = 500 # Rows fetched per output chunk
+_EVENT_SETTLE_SECONDS = 0.2 # Events arriving within this time are handled together
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS roots(path TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dirs(path TEXT PRIMARY KEY, mtime_ns INTEGER NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS entries(id INTEGER PRIMARY KEY, path TEXT NOT NULL UNIQUE,
+                                   parent TEXT NOT NULL, is_dir INTEGER NOT NULL);
+CREATE INDEX IF NOT EXISTS entries_parent ON entries(parent);
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(path, content='entries', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS entries_fts_insert AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts(rowid, path) VALUES (new.id, new.path);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_fts_delete AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts(entries_fts, rowid, path) VALUES ('delete', old.id, old.path);
+END;
+"""
+
+_schema_lock = threading.Lock()
+_schema_ready = {} # Database path -> whether it has the trigram FTS table
+
+
+def open_database(db_path: str = None) -> tuple[sqlite3.Connection, bool]:
+    """Opens (and on first use creates) the index. Returns (connection, has_trigram_index)."""
+    db_path = db_path or config_file_path(LOCATE_DB_FILE)
+    connection = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    with _schema_lock:
+        if db_path not in _schema_ready:
+            connection.execute("PRAGMA journal_mode=WAL") # Queries read while the indexer writes
+            connection.executescript(_SCHEMA)
+            try:
+                connection.executescript(_FTS_SCHEMA)
+            except sqlite3.OperationalError: # SQLite older than 3.34, or built without FTS5
+                pass
+            connection.commit()
+            _schema_ready[db_path] = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'entries_fts'").fetchone() is not None
+    connection.execute("PRAGMA synchronous=NORMAL")
+    return connection, _schema_ready[db_path]
+
+
+def _subtree_range(path: str) -> tuple[str, str]:
+    """Bounds of the paths strictly below 'path', for a range scan of a path index."""
+    prefix = path.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def _delete_subtree(connection: sqlite3.Connection, path: str):
+    low, high = _subtree_range(path)
+    connection.execute("DELETE FROM entries WHERE path >= ? AND path < ?", (low, high))
+    connection.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))
+
+
+def _under_roots(path: str, roots) -> bool:
+    return any(path == root or path.startswith(_subtree_range(root)[0]) for root in roots)
+
+
+def rescan_directory(connection: sqlite3.Connection, path: str, mtime_ns: int) -> list[str]:
+    """
+    Brings the entries directly in one directory up to date.
+    Returns the subdirectories that are new to the index (their contents still need reading).
+    """
+    indexed = dict(connection.execute("SELECT path, is_dir FROM entries WHERE parent = ?", (path,)))
+    current = {}
+    with os.scandir(path) as scandir_iterator:
+        for entry in scandir_iterator:
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+            if is_dir and entry.name in LOCATE_PRUNE_NAMES:
+                continue
+            current[entry.path] = int(is_dir)
+
+    new_directories = []
+    removed = [(entry_path,) for entry_path, is_dir in indexed.items() if current.get(entry_path) != is_dir]
+    for entry_path, is_dir in indexed.items():
+        if is_dir and current.get(entry_path) != is_dir:
+            _delete_subtree(connection, entry_path)
+    connection.executemany("DELETE FROM entries WHERE path = ?", removed)
+    added = [(entry_path, path, is_dir) for entry_path, is_dir in current.items() if indexed.get(entry_path) != is_dir]
+    connection.executemany("INSERT INTO entries(path, parent, is_dir) VALUES (?, ?, ?)", added)
+    new_directories.extend(entry_path for entry_path, _, is_dir in added if is_dir)
+    connection.execute("INSERT OR REPLACE INTO dirs(path, mtime_ns) VALUES (?, ?)", (path, mtime_ns))
+    return new_directories
+
+
+class LocateIndexer(threading.Thread):
+    """Background thread keeping the index of every root up to date (see the module docstring)."""
+
+    def __init__(self, db_path: str = None):
+        super().__init__(name="locate-indexer", daemon=True)
+        self.db_path = db_path
+        self.mode = "starting" # Then "indexing", "idle" (walk done, watcher starting), "inotify" or "polling"
+        self.last_sync = None # time.time() of the last completed walk
+        self.last_sync_seconds = None
+        self.error = None
+        self.completed_syncs = 0 # Walks that finished without being restarted
+        self._wake = threading.Event()
+        self._full_sync = True
+        self._stop_requested = threading.Event()
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock) # Notified when completed_syncs grows
+
+    def request_sync(self) -> int:
+        """
+        Asks for a full mtime walk of every root (after --update or a roots change).
+        Returns completed_syncs as of the request, for wait_for_sync().
+        """
+        with self._lock:
+            self._full_sync = True
+            completed_syncs = self.completed_syncs
+        self._wake.set()
+        return completed_syncs
+
+    def wait_for_sync(self, completed_syncs: int, timeout: float) -> bool:
+        """Waits until more than completed_syncs walks have finished. False on timeout or if the indexer stopped."""
+        deadline = time.monotonic() + timeout
+        with self._synced:
+            while self.completed_syncs <= completed_syncs:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.is_alive():
+                    return False
+                self._synced.wait(min(remaining, 0.5)) # Wakes up now and then in case run() failed
+            return True
+
+    def stop(self):
+        self._stop_requested.set()
+        self._wake.set()
+
+    def run(self):
+        try:
+            connection, _ = open_database(self.db_path)
+        except (OSError, sqlite3.Error) as e:
+            self.error = str(e)
+            return
+        try:
+            while not self._stop_requested.is_set():
+                roots = [row[0] for row in connection.execute("SELECT path FROM roots")]
+                directories = self._sync(connection, roots)
+                if self._full_sync:
+                    continue
+                watcher = self._start_watcher(directories)
+                if watcher is not None:
+                    self.mode = "inotify"
+                    try:
+                        self._watch(connection, watcher)
+                    finally:
+                        watcher.close()
+                else:
+                    self.mode = "polling"
+                    self._wake.wait(LOCATE_POLL_SECONDS)
+                    self._wake.clear()
+        except sqlite3.Error as e:
+            self.error = str(e)
+        finally:
+            connection.close()
+
+    def _sync(self, connection: sqlite3.Connection, roots: list[str]) -> list[str]:
+        """Walks every root, re-reading directories whose mtime changed. Returns all directories."""
+        with self._lock:
+            self._full_sync = False
+        self.mode = "indexing"
+        started = time.perf_counter()
+        known = dict(connection.execute("SELECT path, mtime_ns FROM dirs"))
+        for path in [path for path in known if not _under_roots(path, roots)]: # Left over from a removed root
+            connection.execute("DELETE FROM entries WHERE parent = ?", (path,))
+            connection.execute("DELETE FROM dirs WHERE path = ?", (path,))
+            del known[path]
+        directories = []
+        pending_writes = 0
+        for root in roots:
+            stack = [root]
+            while stack and not self._stop_requested.is_set():
+                if self._full_sync: # Roots changed or --update during the walk: start over
+                    break
+                path = stack.pop()
+                try:
+                    mtime_ns = os.lstat(path).st_mtime_ns
+                    if known.get(path) != mtime_ns:
+                        rescan_directory(connection, path, mtime_ns)
+                        pending_writes += 1
+                        if pending_writes >= _COMMIT_EVERY:
+                            connection.commit()
+                            pending_writes = 0
+                except OSError: # Gone or unreadable: forget it and everything below it
+                    connection.execute("DELETE FROM entries WHERE path = ?", (path,))
+                    _delete_subtree(connection, path)
+                    continue
+                directories.append(path)
+                stack.extend(row[0] for row in connection.execute(
+                    "SELECT path FROM entries WHERE parent = ? AND is_dir = 1", (path,)))
+        connection.commit()
+        self.last_sync = time.time()
+        self.last_sync_seconds = time.perf_counter() - started
+        with self._synced:
+            if not self._full_sync and not self._stop_requested.is_set(): # Not restarted by request_sync()
+                self.mode = "idle" # Until run() has started the watcher
+                self.completed_syncs += 1
+                self._synced.notify_all()
+        return directories
+
+    def _start_watcher(self, directories: list[str]):
+        """Returns an inotify watcher covering every directory, or None to poll instead."""
+        if not sys.platform.startswith("linux") or not directories:
+            return None
+        from morel_commands.inotify import Inotify
+        try:
+            watcher = Inotify()
+        except OSError:
+            return None
+        for path in directories:
+            try:
+                watcher.add_watch(path)
+            except FileNotFoundError: # Removed since the walk; its parent's event will catch up
+                continue
+            except OSError: # ENOSPC: more directories than fs.inotify.max_user_watches
+                watcher.close()
+                return None
+        return watcher
+
+    def _watch(self, connection: sqlite3.Connection, watcher):
+        """Re-reads directories as inotify reports changes, until a full walk is requested."""
+        while not self._stop_requested.is_set():
+            with self._lock:
+                if self._full_sync:
+                    return
+            changed, overflow = watcher.read_changes(timeout=0.5)
+            if overflow: # Events were lost
+                self.request_sync()
+                return
+            if not changed:
+                continue
+            time.sleep(_EVENT_SETTLE_SECONDS) # A burst (e.g. unpacking an archive) is handled at once
+            more, overflow = watcher.read_changes(timeout=0)
+            if overflow:
+                self.request_sync()
+                return
+            changed.update(more)
+            pending = list(changed)
+            while pending:
+                path = pending.pop()
+                try:
+                    mtime_ns = os.lstat(path).st_mtime_ns
+                    new_directories = rescan_directory(connection, path, mtime_ns)
+                except OSError: # The directory itself is gone; its parent has an event too
+                    continue
+                for new_directory in new_directories:
+                    try:
+                        watcher.add_watch(new_directory)
+                    except FileNotFoundError:
+                        continue
+                    except OSError: # Out of watches: switch to polling
+                        connection.commit()
+                        return
+                    pending.append(new_directory)
+            connection.commit()
+
+
+_indexer = None
+_indexer_lock = threading.Lock()
+LAST_RESULTS = [] # (path, is_dir) of the last query, for @N references
+
+
+def ensure_indexer(db_path: str = None) -> LocateIndexer:
+    """Starts the background indexer for this process (once)."""
+    global _indexer
+    with _indexer_lock:
+        if _indexer is None or not _indexer.is_alive():
+            _indexer = LocateIndexer(db_path)
+            _indexer.start()
+        return _indexer
+
+
+def _has_glob(pattern: str) -> bool:
+    return any(char in pattern for char in "*?[")
+
+
+def _longest_literal(pattern: str) -> str:
+    """The longest run of a glob pattern without wildcards, used to narrow the search first."""
+    literal, current, in_class = "", "", False
+    for char in pattern:
+        if in_class:
+            in_class = char != "]"
+        elif char in "*?[":
+            in_class = char == "["
+            literal, current = max(literal, current, key=len), ""
+        else:
+            current += char
+    return max(literal, current, key=len)
+
+
+def query_paths(connection: sqlite3.Connection, has_trigram: bool, pattern: str, kind: str = None, limit: int = 0):
+    """
+    Yields (path, is_dir) for paths containing 'pattern', or matching it as a glob.
+    kind is None, "d" (directories only) or "f" (files only); limit 0 means no limit.
+    """
+    glob = _has_glob(pattern)
+    needle = _longest_literal(pattern) if glob else pattern
+    conditions, parameters = [], []
+    if has_trigram and len(needle) >= 3:
+        source = "entries_fts JOIN entries ON entries.id = entries_fts.rowid"
+        conditions.append("entries_fts MATCH ?")
+        parameters.append('"' + needle.replace('"', '""') + '"')
+    else:
+        source = "entries"
+        if needle:
+            conditions.append("entries.path LIKE ? ESCAPE '\\'")
+            parameters.append("%" + needle.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if kind is not None:
+        conditions.append("entries.is_dir = ?")
+        parameters.append(1 if kind == "d" else 0)
+    sql = f"SELECT entries.path, entries.is_dir FROM {source}"
+    if conditions:
+        sql += " WHERE " + " AND ".join(conditions)
+    if limit and not glob: # A glob is checked below, so the SQL limit would cut too early
+        sql += f" LIMIT {int(limit)}"
+
+    cursor = connection.execute(sql, parameters)
+    matcher = fnmatch.translate(pattern.lower()) if glob else None
+    if matcher is not None:
+        import re
+        matcher = re.compile(matcher)
+    produced = 0
+    while True:
+        rows = cursor.fetchmany(_STREAM_BATCH)
+        if not rows:
+            return
+        for path, is_dir in rows:
+            if matcher is not None and not matcher.match(path.lower()):
+                continue
+            yield path, bool(is_dir)
+            produced += 1
+            if limit and produced >= limit:
+                return
+
+
+def _locate_stream(connection, rows, plain: bool, started: float, limit: int, note: str = ""):
+    LAST_RESULTS.clear()
+    count = 0
+    chunk = []
+    try:
+        for path, is_dir in rows:
+            count += 1
+            if count <= LOCATE_MAX_REFERENCES:
+                LAST_RESULTS.append((path, is_dir))
+            chunk.append(path if plain else f"{count:>5}  {path}{os.sep if is_dir else ''}")
+            if len(chunk) >= _STREAM_BATCH:
+                yield "\n".join(chunk)
+                chunk = []
+        if chunk:
+            yield "\n".join(chunk)
+        if not plain:
+            if count == 0:
+                yield "locate: no matches."
+            else:
+                more = f" (first {limit}; use -n to see more)" if limit and count >= limit else ""
+                yield f"{count} result(s){more} in {(time.perf_counter() - started) * 1000:.1f} ms; use @N with cd, open or run."
+            if note:
+                yield note
+        elif note and count == 0: # Plain output stays data only, unless there is none at all
+            yield note
+    finally:
+        connection.close()
+
+
+def expand_references(command: str, args: list[str]) -> tuple[list[str], str]:
+    """
+    Replaces @N arguments with the paths of the last 'locate' results.
+    For 'cd', a file result is replaced by its directory. Returns (args, error_message).
+    """
+    expanded = []
+    for arg in args:
+        if len(arg) > 1 and arg[0] == "@" and arg[1:].isdigit():
+            number = int(arg[1:])
+            if not 1 <= number <= len(LAST_RESULTS):
+                return args, f"{command}: no locate result {arg} (the last locate had {len(LAST_RESULTS)})"
+            path, is_dir = LAST_RESULTS[number - 1]
+            expanded.append(os.path.dirname(path) if command == "cd" and not is_dir else path)
+        else:
+            expanded.append(arg)
+    return expanded, ""
+
+
+def _resolve(current_path: str, path_arg: str) -> str:
+    path_arg = os.path.expanduser(path_arg)
+    return os.path.realpath(path_arg if os.path.isabs(path_arg) else os.path.join(current_path, path_arg))
+
+
+def _status_string(connection: sqlite3.Connection, has_trigram: bool) -> str:
+    roots = [row[0] for row in connection.execute("SELECT path FROM roots ORDER BY path")]
+    entries = connection.execute("SELECT count(*) FROM entries").fetchone()[0]
+    lines = [
+        "Locate index:",
+        f"  Roots        : {', '.join(roots) if roots else 'none (add one with locate --add-root <dir>)'}",
+        f"  Entries      : {entries}",
+        f"  Search       : {'trigram index' if has_trigram else 'LIKE scan (no FTS5 trigram support in this SQLite)'}",
+    ]
+    indexer = _indexer
+    if indexer is not None and indexer.is_alive():
+        lines.append(f"  Indexer      : {indexer.mode}")
+        if indexer.last_sync is not None:
+            when = time.strftime("%H:%M:%S", time.localtime(indexer.last_sync))
+            lines.append(f"  Last walk    : {when} ({indexer.last_sync_seconds:.2f} s)")
+    elif indexer is not None and indexer.error:
+        lines.append(f"  Indexer      : stopped ({indexer.error})")
+    else:
+        lines.append("  Indexer      : not running")
+    return "\n".join(lines)
+
+
+def _manage(option: str, value: str, current_path: str, connection: sqlite3.Connection, has_trigram: bool) -> str:
+    if option in ("--status", "--roots"):
+        if option == "--roots":
+            roots = [row[0] for row in connection.execute("SELECT path FROM roots ORDER BY path")]
+            return "\n".join(roots) if roots else "locate: no roots (add one with locate --add-root <dir>)"
+        return _status_string(connection, has_trigram)
+    if option == "--update":
+        if _sync_in_foreground():
+            return "locate: index updated."
+        return "locate: updating the index in the background."
+    path = _resolve(current_path, value)
+    if option == "--add-root":
+        if not os.path.isdir(path):
+            return f"locate: not a directory: {value}"
+        connection.execute("INSERT OR IGNORE INTO roots(path) VALUES (?)", (path,))
+        connection.commit()
+        if _sync_in_foreground():
+            return f"locate: indexed '{path}'."
+        return f"locate: indexing '{path}' in the background (see locate --status)."
+    # --remove-root: the indexer drops the tree's entries (it may be writing some right now)
+    if connection.execute("DELETE FROM roots WHERE path = ?", (path,)).rowcount == 0:
+        return f"locate: '{path}' is not an indexed root."
+    connection.commit()
+    _sync_in_foreground()
+    return f"locate: '{path}' removed from the index."
+
+
+def _sync_in_foreground() -> bool:
+    """
+    Requests a walk of every root. Outside an interactive session, also waits for it (at most
+    LOCATE_BATCH_WAIT_SECONDS). Returns whether the walk has finished.
+    """
+    indexer = ensure_indexer()
+    completed_syncs = indexer.request_sync()
+    return not INTERACTIVE.get() and indexer.wait_for_sync(completed_syncs, LOCATE_BATCH_WAIT_SECONDS)
+
+
+_USAGE = ("Usage: locate [-n N] [-d | -f] <pattern>\n"
+          "       locate --add-root <dir> | --remove-root <dir> | --roots | --status | --update")
+
+
+def locate_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    started = time.perf_counter()
+    limit = LOCATE_DEFAULT_LIMIT
+    kind = None
+    pattern = None
+    management = None
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg in ("--add-root", "--remove-root"):
+            if index + 1 >= len(args):
+                return f"locate: {arg} needs a directory.\n{_USAGE}", current_path, False
+            index += 1
+            management = (arg, args[index])
+        elif arg in ("--roots", "--status", "--update"):
+            management = (arg, None)
+        elif arg == "-n" and index + 1 < len(args) and args[index + 1].isdigit():
+            index += 1
+            limit = int(args[index])
+        elif arg in ("-d", "-f"):
+            kind = arg[1]
+        elif pattern is None:
+            pattern = arg
+        else:
+            return f"locate: only one pattern can be given.\n{_USAGE}", current_path, False
+        index += 1
+    if management is None and pattern is None:
+        return _USAGE, current_path, False
+
+    try:
+        connection, has_trigram = open_database()
+    except (OSError, sqlite3.Error) as e:
+        return f"locate: cannot open the index: {e}", current_path, False
+    try:
+        if management is not None:
+            try:
+                return _manage(management[0], management[1], current_path, connection, has_trigram), current_path, False
+            finally:
+                connection.close()
+        if connection.execute("SELECT 1 FROM roots LIMIT 1").fetchone() is None:
+            connection.close()
+            return "locate: nothing is indexed yet. Add a tree with: locate --add-root <dir>", current_path, False
+        indexer = ensure_indexer() # Catches up with changes made while the shell was not running
+        building = indexer.completed_syncs == 0
+        if building and not INTERACTIVE.get(): # The indexer would not outlive this run
+            building = not indexer.wait_for_sync(0, LOCATE_BATCH_WAIT_SECONDS)
+        note = "locate: the index is still being built; results may be incomplete (see locate --status)." if building else ""
+        rows = query_paths(connection, has_trigram, pattern, kind, limit)
+        return _locate_stream(connection, rows, PLAIN_OUTPUT.get(), started, limit, note), current_path, False
+    except sqlite3.Error as e:
+        connection.close()
+        return f"locate: index error: {e}", current_path, False
@@ -0,0 +1,221 @@
+"""
+Writing command output to the terminal, and the built-in pager.
+
+  pager [on|off]   - page output longer than the terminal (default on; MOREL_PAGER=off disables it)
+
+Output is written line by line as the command produces it. Lines without '[' cannot
+contain Rich markup, so they are written straight to stdout in one write() per run of
+such lines; only lines that may hold markup go through console.print. A 100,000-line
+plain listing or script output never passes through Rich's markup parser or layout.
+
+When stdin and stdout are a terminal, the pager stops after each screenful and waits
+for a key, like 'more':
+
+  Space, PgDn       next screen            Enter, Down, j   next line
+  b, PgUp, Up, k    previous screen        /text            search forward
+  q, Esc, Ctrl+C    stop (the rest of the output is discarded)
+
+Only the visible window is rendered. A streamed result (ls, run, find, ...) is not
+read any further while the pager waits, so quitting early also stops the command from
+producing the rest. Lines already shown are kept, so 'b' and search can redraw them.
+"""
+import os
+import shutil
+import sys
+
+PAGER_ENABLED = os.environ.get("MOREL_PAGER", "on").lower() not in ("0", "off", "no", "false")
+
+_KEY_NAMES = {
+    " ": "page", "f": "page", "\x1b[6~": "page",
+    "\r": "line", "\n": "line", "j": "line", "\x1b[B": "line", "\x1bOB": "line",
+    "b": "back", "k": "back", "\x1b[5~": "back", "\x1b[A": "back", "\x1bOA": "back",
+    "/": "search",
+    "q": "quit", "Q": "quit", "\x1b": "quit", "\x03": "quit",
+}
+_WINDOWS_KEYS = {"H": "back", "P": "line", "I": "back", "Q": "page"} # After '\x00' or '\xe0'
+_STATUS_STYLE = "\x1b[7m" # Reverse video
+_RESET = "\x1b[0m"
+_CLEAR_SCREEN = "\x1b[H\x1b[2J"
+_CLEAR_LINE = "\r\x1b[K"
+
+
+def has_markup(line: str) -> bool:
+    return "[" in line
+
+
+class TerminalWriter:
+    """Writes lines, sending only the ones that may contain Rich markup through the console."""
+
+    def __init__(self, console, rich_available: bool, out=None):
+        self.console = console
+        self.rich_available = rich_available
+        self.out = out or sys.stdout
+
+    def write_lines(self, lines: list[str]):
+        if not self.rich_available:
+            self.out.write("\n".join(lines) + "\n")
+            self.out.flush()
+            return
+        run, run_has_markup = [], False
+        for line in lines:
+            line_has_markup = has_markup(line)
+            if run and line_has_markup != run_has_markup:
+                self._write_run(run, run_has_markup)
+                run = []
+            run.append(line)
+            run_has_markup = line_has_markup
+        if run:
+            self._write_run(run, run_has_markup)
+
+    def _write_run(self, lines: list[str], markup: bool):
+        if markup:
+            self.console.print("\n".join(lines))
+        else:
+            self.out.write("\n".join(lines) + "\n")
+            self.out.flush()
+
+
+class LineSource:
+    """The lines of a command's output, read from the stream only as far as they are asked for."""
+
+    def __init__(self, output):
+        if isinstance(output, str):
+            self._chunks = iter([output] if output else [])
+        else:
+            self._chunks = iter(output)
+        self.lines = [] # Every line read so far
+        self.finished = False
+
+    def get(self, index: int):
+        """Line 'index', reading more of the output if needed; None past the end."""
+        while index >= len(self.lines) and not self.finished:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.finished = True
+                break
+            self.lines.extend(chunk.split("\n"))
+        return self.lines[index] if index < len(self.lines) else None
+
+    def close(self):
+        close = getattr(self._chunks, "close", None)
+        if close is not None:
+            close()
+        self.finished = True
+
+
+def _read_key() -> str:
+    """One key press, without echo or waiting for Enter. Returns a name from _KEY_NAMES or ''."""
+    if sys.platform == "win32":
+        import msvcrt
+        key = msvcrt.getwch()
+        if key in ("\x00", "\xe0"):
+            return _WINDOWS_KEYS.get(msvcrt.getwch(), "")
+        return _KEY_NAMES.get(key, "")
+    import select
+    import termios
+    import tty
+    fd = sys.stdin.fileno()
+    saved = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        key = os.read(fd, 1)
+        if key == b"\x1b": # The rest of an escape sequence follows at once; a lone Esc does not
+            while select.select([fd], [], [], 0.05)[0] and len(key) < 8:
+                key += os.read(fd, 1)
+                if key[-1:].isalpha() or key[-1:] == b"~":
+                    break
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, saved)
+    return _KEY_NAMES.get(key.decode("utf-8", "replace"), "")
+
+
+def _screen_rows(line: str, columns: int) -> int:
+    return max(1, -(-len(line) // columns)) # Long lines wrap
+
+
+def page_output(output, writer: TerminalWriter):
+    """Writes output through 'writer', pausing after every screenful (see the module docstring)."""
+    source = LineSource(output)
+    out = writer.out
+    top = 0 # First line of the current window
+    shown = 0 # Next line to write
+    used_rows = 0
+    message = ""
+    try:
+        while True:
+            columns, rows = shutil.get_terminal_size()
+            page_rows = max(1, rows - 1) # The last row is the status line
+            batch = []
+            while used_rows < page_rows:
+                line = source.get(shown)
+                if line is None:
+                    break
+                batch.append(line)
+                shown += 1
+                used_rows += _screen_rows(line, columns)
+            if batch:
+                writer.write_lines(batch)
+            if source.get(shown) is None: # Everything was shown: no prompt
+                return
+
+            status = message or f"-- More -- line {shown}{'' if not source.finished else f' of {len(source.lines)}'}"
+            out.write(f"{_STATUS_STYLE}{status} (Space, Enter, b, /, q){_RESET}")
+            out.flush()
+            action = _read_key()
+            out.write(_CLEAR_LINE)
+            message = ""
+            if action == "quit":
+                return
+            if action == "page":
+                top, used_rows = shown, 0
+            elif action == "line":
+                top, used_rows = top + 1, page_rows - 1
+            elif action == "back":
+                top = max(0, top - page_rows)
+                shown, used_rows = top, 0
+                out.write(_CLEAR_SCREEN)
+            elif action == "search":
+                out.write("/")
+                out.flush()
+                text = sys.stdin.readline().rstrip("\n")
+                index = top + 1
+                while text and source.get(index) is not None and text not in source.lines[index]:
+                    index += 1
+                if text and source.get(index) is not None:
+                    top = shown = index
+                    used_rows = 0
+                    out.write(_CLEAR_SCREEN)
+                else:
+                    message = f"Pattern not found: {text}" if text else ""
+                    used_rows = page_rows # Show the prompt again without writing lines
+            else: # Another key: ask again
+                used_rows = page_rows
+    except KeyboardInterrupt:
+        out.write(_CLEAR_LINE)
+    finally:
+        source.close()
+        out.flush()
+
+
+def write_output(output, console, rich_available: bool):
+    """How the interactive shell prints a command's result: paged on a terminal, otherwise streamed."""
+    writer = TerminalWriter(console, rich_available)
+    if PAGER_ENABLED and sys.stdin.isatty() and sys.stdout.isatty():
+        page_output(output, writer)
+        return
+    if isinstance(output, str):
+        if output:
+            writer.write_lines(output.split("\n"))
+        return
+    for chunk in output: # Streamed output: write each chunk as soon as it is ready
+        writer.write_lines(chunk.split("\n"))
+
+
+def pager_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    global PAGER_ENABLED
+    if args and args[0] in ("on", "off"):
+        PAGER_ENABLED = args[0] == "on"
+    elif args:
+        return "pager: usage: pager [on|off]", current_path, False
+    return f"Pager is {'on' if PAGER_ENABLED else 'off'}.", current_path, False
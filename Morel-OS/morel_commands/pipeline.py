@@ -0,0 +1,413 @@
+"""
+Pipelines and redirection: 'cmd1 | cmd2', 'cmd > file', 'cmd >> file' and 'cmd < file'.
+
+Between stages, output travels as line batches: an iterator of lists of lines (without
+newlines). A built-in command's output chunks become batches lazily, so each stage only
+runs as far as the next one reads. In 'ls hugedir | head 20', head stops after the first
+chunk and the listing generator is closed without formatting the rest.
+
+'run script.py' stages are external processes. Two adjacent run stages are joined with an
+OS pipe (the second process reads the first one's stdout directly), and '< file' / '> file'
+are opened as the process's own stdin/stdout; Python only sits in the middle where a run
+stage meets a built-in command. Each process's stderr goes to a temporary file and is shown
+after the pipeline's output. Processes still running when the pipeline's output ends (e.g.
+after 'head' has its lines) are stopped.
+
+Operators inside quotes or after a backslash are ordinary characters ('copytext "a | b"').
+Redirecting file descriptors ('2>&1') is not supported.
+"""
+import codecs
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import threading
+
+from morel_commands import PLAIN_OUTPUT, track_foreground_process
+from morel_commands.run import RUN_MAX_LINE_CHARS, RUN_MEMORY_CAP_BYTES, resolve_script_path, script_environment
+
+PIPE_READ_BYTES = 64 * 1024 # Largest read from a pipe or file; one read becomes one batch
+PIPE_EXIT_GRACE_SECONDS = 0.05 # How long an upstream process may take to exit on its own before it is stopped
+
+_OPERATOR_CHARS = "|<>"
+
+
+class PipelineError(ValueError):
+    """A pipeline that cannot be parsed or started; the message is shown to the user."""
+
+
+class PipelineStage:
+    """One command of a pipeline, with its redirections."""
+
+    def __init__(self):
+        self.argv = []
+        self.input_path = None
+        self.output_path = None
+        self.append = False # '>>' rather than '>'
+
+
+def has_pipeline_syntax(command_line: str) -> bool:
+    """Cheap pre-check: only lines containing an operator character need parse_pipeline()."""
+    return any(char in command_line for char in _OPERATOR_CHARS)
+
+
+def _tokenize(command_line: str) -> list[tuple[str, str]]:
+    """Splits a line into ("word", text) and ("op", operator) tokens, honouring quotes like shlex."""
+    tokens = []
+    segment = []
+    quote = None
+
+    def flush_segment():
+        if segment:
+            tokens.extend(("word", word) for word in shlex.split("".join(segment)))
+            segment.clear()
+
+    index = 0
+    while index < len(command_line):
+        char = command_line[index]
+        if quote:
+            if char == quote:
+                quote = None
+            elif char == "\\" and quote == '"' and index + 1 < len(command_line):
+                segment.append(char)
+                index += 1
+                char = command_line[index]
+            segment.append(char)
+        elif char in "'\"":
+            quote = char
+            segment.append(char)
+        elif char == "\\" and index + 1 < len(command_line):
+            segment.append(command_line[index:index + 2])
+            index += 1
+        elif char in _OPERATOR_CHARS:
+            flush_segment()
+            if command_line.startswith(">>", index):
+                tokens.append(("op", ">>"))
+                index += 1
+            else:
+                tokens.append(("op", char))
+        else:
+            segment.append(char)
+        index += 1
+    if quote:
+        raise PipelineError("No closing quotation")
+    flush_segment()
+    return tokens
+
+
+def parse_pipeline(command_line: str) -> list[PipelineStage]:
+    """Parses a command line into stages. Raises PipelineError on syntax errors."""
+    try:
+        tokens = _tokenize(command_line)
+    except ValueError as e: # shlex errors, e.g. a trailing backslash
+        raise PipelineError(str(e)) from None
+
+    stages = [PipelineStage()]
+    index = 0
+    while index < len(tokens):
+        kind, text = tokens[index]
+        stage = stages[-1]
+        if kind == "word":
+            stage.argv.append(text)
+        elif text == "|":
+            if not stage.argv:
+                raise PipelineError("syntax error near '|'")
+            stages.append(PipelineStage())
+        else:
+            index += 1
+            if index >= len(tokens) or tokens[index][0] != "word":
+                raise PipelineError(f"missing file name after '{text}'")
+            target = tokens[index][1]
+            if target.startswith("&"):
+                raise PipelineError(f"redirecting to a file descriptor ('{text}{target}') is not supported")
+            if text == "<":
+                stage.input_path = target
+            else:
+                stage.output_path, stage.append = target, text == ">>"
+        index += 1
+
+    if not stages[-1].argv:
+        raise PipelineError("syntax error near '|'" if len(stages) > 1 else "missing command")
+    for position, stage in enumerate(stages):
+        if stage.input_path is not None and position > 0:
+            raise PipelineError("'<' is only allowed on the first command of a pipeline")
+        if stage.output_path is not None and position < len(stages) - 1:
+            raise PipelineError("'>' and '>>' are only allowed on the last command of a pipeline")
+    return stages
+
+
+def read_line_batches(binary_file, close: bool = False):
+    """
+    Yields lists of lines decoded from a binary file or pipe, one list per read, so lines
+    from a live process are passed on as soon as they arrive. Lines longer than
+    RUN_MAX_LINE_CHARS are split. With close=True the file is closed when iteration stops.
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    partial = ""
+    try:
+        while True:
+            data = os.read(binary_file.fileno(), PIPE_READ_BYTES)
+            text = partial + decoder.decode(data, final=not data)
+            if "\r" in text:
+                text = text.replace("\r\n", "\n")
+            lines = text.split("\n")
+            partial = lines.pop()
+            if len(partial) > RUN_MAX_LINE_CHARS:
+                lines.append(partial)
+                partial = ""
+            if not data:
+                if partial:
+                    lines.append(partial)
+                if lines:
+                    yield lines
+                return
+            if lines:
+                yield lines
+    finally:
+        if close:
+            binary_file.close()
+
+
+def output_batches(output):
+    """Turns a command's output (a string or an iterator of chunks) into line batches."""
+    if isinstance(output, str):
+        if output:
+            yield output.split("\n")
+        return
+    try:
+        for chunk in output:
+            yield chunk.split("\n")
+    finally:
+        close_batches(output)
+
+
+def close_batches(batches):
+    """Stops an upstream generator that will not be read any further."""
+    close = getattr(batches, "close", None)
+    if close is not None:
+        close()
+
+
+def _feed_process(process_stdin, batches):
+    """Writer thread: copies a built-in command's output into a process's stdin."""
+    try:
+        for batch in batches:
+            process_stdin.write(("\n".join(batch) + "\n").encode("utf-8", "replace"))
+    except (OSError, ValueError): # The process exited or stopped reading
+        pass
+    finally:
+        close_batches(batches)
+        try:
+            process_stdin.close()
+        except OSError:
+            pass
+
+
+class _StageProcess:
+    def __init__(self, name: str, process: subprocess.Popen, stderr_file):
+        self.name = name
+        self.process = process
+        self.stderr_file = stderr_file
+        self.stopped = False # Killed by the pipeline rather than exited on its own
+
+
+class Pipeline:
+    """Runs parsed stages. Use run_pipeline() rather than this class directly."""
+
+    def __init__(self, stages: list[PipelineStage], current_path: str, registry):
+        self.stages = stages
+        self.current_path = current_path
+        self.registry = registry
+        self.processes = []
+        self.writers = []
+        self.open_files = []
+        self.final_process = None # The process whose stdout (or output file) is the pipeline's output
+
+    def _open(self, path: str, mode: str):
+        full_path = os.path.join(self.current_path, os.path.expanduser(path))
+        try:
+            opened_file = open(full_path, mode)
+        except OSError as e:
+            raise PipelineError(f"cannot open '{path}': {e.strerror}") from None
+        self.open_files.append(opened_file)
+        return opened_file
+
+    def start(self):
+        """
+        Starts every stage. Returns (stream, output_file, new_path, should_exit), where stream is
+        the last stage's output: line batches, a Popen whose stdout is unread, or None.
+        """
+        last_stage = self.stages[-1]
+        output_file = None
+        if last_stage.output_path is not None: # Opened (and truncated) before anything runs, like a shell
+            output_file = self._open(last_stage.output_path, "ab" if last_stage.append else "wb")
+
+        stream = None
+        new_path, should_exit = self.current_path, False
+        for position, stage in enumerate(self.stages):
+            is_last = position == len(self.stages) - 1
+            if stage.input_path is not None:
+                stream = self._open(stage.input_path, "rb")
+            if stage.argv[0].lower() == "run":
+                stream = self._start_process(stage, stream, output_file if is_last else None)
+                if is_last:
+                    self.final_process = self.processes[-1].process
+            else:
+                # Rich markup is only wanted when the output goes straight to the terminal, and only if
+                # the caller (batch mode, the GUI) has not already asked for plain output
+                plain = PLAIN_OUTPUT.get() or not is_last or output_file is not None
+                stream, new_path, should_exit = self._call_builtin(stage, stream, plain)
+        if len(self.stages) > 1: # Like a shell, a pipeline cannot change the current directory or exit
+            new_path, should_exit = self.current_path, False
+        return stream, output_file, new_path, should_exit
+
+    @staticmethod
+    def _input_batches(stream):
+        if isinstance(stream, subprocess.Popen):
+            return read_line_batches(stream.stdout)
+        if hasattr(stream, "fileno"): # An input file from '<'
+            return read_line_batches(stream)
+        return stream # Already line batches from a built-in
+
+    def _call_builtin(self, stage: PipelineStage, stream, plain: bool):
+        command = stage.argv[0].lower()
+        handler = self.registry.get(command)
+        if handler is None:
+            raise PipelineError(f"Unknown command: {command}")
+        kwargs = {}
+        if stream is not None:
+            if self.registry.reads_input(command):
+                kwargs["stdin"] = self._input_batches(stream)
+            elif not isinstance(stream, subprocess.Popen) and not hasattr(stream, "fileno"):
+                close_batches(stream) # Nothing will read the previous built-in's output
+        token = PLAIN_OUTPUT.set(plain)
+        try:
+            output, new_path, should_exit = handler(stage.argv[1:], self.current_path, **kwargs)
+        finally:
+            PLAIN_OUTPUT.reset(token)
+        return output_batches(output), new_path, should_exit
+
+    def _start_process(self, stage: PipelineStage, stream, output_file):
+        script_args = stage.argv[1:]
+        if script_args and (script_args[0].startswith("--") or script_args[-1] == "&"):
+            raise PipelineError("run: options and '&' are not supported in a pipeline or with redirection")
+        if not script_args:
+            raise PipelineError("run: missing script name")
+        resolved_script_path, error_message = resolve_script_path(self.current_path, script_args[0])
+        if error_message:
+            raise PipelineError(error_message)
+
+        feed = None
+        if stream is None:
+            stdin = subprocess.DEVNULL
+        elif isinstance(stream, subprocess.Popen):
+            stdin = stream.stdout # OS pipe straight from the previous process
+        elif hasattr(stream, "fileno"):
+            stdin = stream # The '<' file itself
+        else:
+            stdin, feed = subprocess.PIPE, stream
+
+        stderr_file = tempfile.TemporaryFile(prefix="morel-pipe-")
+        self.open_files.append(stderr_file)
+        try:
+            process = subprocess.Popen(
+                [sys.executable, resolved_script_path] + script_args[1:], cwd=self.current_path,
+                env=script_environment(), stdin=stdin,
+                stdout=output_file if output_file is not None else subprocess.PIPE, stderr=stderr_file
+            )
+        except OSError as e:
+            raise PipelineError(f"run: failed to execute script '{script_args[0]}': {e}") from None
+        track_foreground_process(process)
+        if isinstance(stream, subprocess.Popen):
+            stream.stdout.close() # The next process holds the read end now, so the writer sees EPIPE if it exits
+        self.processes.append(_StageProcess(script_args[0], process, stderr_file))
+        if feed is not None:
+            writer = threading.Thread(target=_feed_process, args=(process.stdin, feed), daemon=True)
+            writer.start()
+            self.writers.append(writer)
+        return process if output_file is None else None
+
+    def finish(self, completed: bool) -> str:
+        """
+        Waits for (completed=True) or stops the processes, closes everything and returns the
+        notes to show after the output: each process's stderr and any non-zero exit code.
+        """
+        for stage_process in self.processes:
+            process = stage_process.process
+            if completed and process is self.final_process:
+                process.wait()
+                continue
+            try:
+                process.wait(timeout=PIPE_EXIT_GRACE_SECONDS if completed else 0)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+                stage_process.stopped = True
+        for writer in self.writers:
+            writer.join()
+
+        notes = []
+        for stage_process in self.processes:
+            if stage_process.process.stdout is not None:
+                stage_process.process.stdout.close()
+            stage_process.stderr_file.seek(0)
+            stderr_text = stage_process.stderr_file.read(RUN_MEMORY_CAP_BYTES).decode("utf-8", "replace").strip()
+            if stderr_text:
+                header = "Errors:" if len(self.processes) == 1 else f"Errors from {stage_process.name}:"
+                notes.append(f"{header}\n{stderr_text}")
+            returncode = stage_process.process.returncode
+            if returncode and not stage_process.stopped:
+                notes.append(f"[{stage_process.name} exited with code {returncode}]")
+        for opened_file in self.open_files:
+            opened_file.close()
+        return "\n".join(notes)
+
+
+def _write_output(batches, output_file):
+    for batch in batches:
+        output_file.write(("\n".join(batch) + "\n").encode("utf-8", "replace"))
+
+
+def _terminal_output(pipeline: Pipeline, stream):
+    completed = False
+    try:
+        for batch in stream:
+            yield "\n".join(batch)
+        completed = True
+    finally:
+        notes = pipeline.finish(completed)
+    if notes:
+        yield notes
+
+
+def run_pipeline(stages: list[PipelineStage], current_path: str, registry):
+    """
+    Runs the stages of a command line containing '|', '<', '>' or '>>' (from parse_pipeline()).
+    Returns the usual (output, new_path, should_exit); output is an iterator of chunks unless
+    the result went to a file, in which case only errors and notes are returned.
+    """
+    pipeline = Pipeline(stages, current_path, registry)
+    try:
+        stream, output_file, new_path, should_exit = pipeline.start()
+    except PipelineError as e:
+        pipeline.finish(completed=False)
+        return str(e), current_path, False
+    except BaseException: # A built-in stage failed: stop the processes earlier stages started, then report it
+        pipeline.finish(completed=False)
+        raise
+
+    if isinstance(stream, subprocess.Popen):
+        stream = read_line_batches(stream.stdout)
+    elif stream is not None and hasattr(stream, "fileno"): # e.g. 'cd x < file': the input is never read
+        stream = None
+
+    if output_file is None:
+        return _terminal_output(pipeline, stream if stream is not None else ()), new_path, should_exit
+    try:
+        if stream is not None:
+            _write_output(stream, output_file)
+    except OSError as e:
+        pipeline.finish(completed=False)
+        return f"cannot write to '{stages[-1].output_path}': {e.strerror}", current_path, False
+    return pipeline.finish(completed=True), new_path, should_exit
@@ -0,0 +1,281 @@
+"""
+The 'profile' command: runs a Morel command line under a profiler.
+
+  profile [-n N] [--sample] [--interval MS] [-o PREFIX] <command line>
+
+The command runs as usual (its output is shown first, once it has finished), then the
+N (default 20) functions with the most time of their own are listed, and two files are
+written: PREFIX.pstats (readable with python -m pstats, snakeviz, ...) and
+PREFIX.collapsed, one "frame;frame;...;frame weight" line per stack, the input format
+of flamegraph.pl, speedscope and inferno. PREFIX defaults to profile-<timestamp> in the
+'profiles' directory of the Morel config directory (see config.py).
+
+By default cProfile is used. It counts every call exactly but only sees the thread that
+runs the command, so work done on thread pools (find, grep, copyfile -r) is missed;
+its collapsed stacks are rebuilt from the caller graph, spreading each function's own
+time over its callers in proportion to the time spent in each call site.
+
+--sample uses a sampling profiler instead: a background thread records the stack of
+every thread each INTERVAL milliseconds (default 1). Its numbers are estimates, but it
+covers all threads and slows the command down far less. Its .pstats file holds the
+sampled time of each function, with each sample counted as INTERVAL.
+
+'run --inproc' scripts run in the shell's interpreter, so their functions show up in
+either profiler; 'run' scripts are separate processes and only show as waiting.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from morel_commands.config import morel_config_dir
+
+PROFILE_TOP_N = 20
+PROFILE_SAMPLE_INTERVAL_MS = 1.0
+_MAX_STACK_DEPTH = 64 # Caller-graph expansion limit for cProfile's collapsed stacks
+_MIN_WEIGHT_US = 1.0 # Smaller branches of that expansion are dropped
+_PROFILING = threading.Lock() # Held while a command is profiled: profiles do not nest
+
+
+def _frame_label(filename: str, line: int, function: str) -> str:
+    if filename == "~": # cProfile's built-in functions
+        return function.replace(";", ",")
+    return f"{function} ({os.path.basename(filename)}:{line})".replace(";", ",")
+
+
+def _run_collected(execute, command_line: str, current_path: str):
+    """Runs the command and reads all of its output (streams only do their work as they are read)."""
+    output, new_path, should_exit = execute(command_line, current_path)
+    if isinstance(output, str):
+        return ([output] if output else []), new_path, should_exit
+    return list(output), new_path, should_exit
+
+
+# --- cProfile ---
+
+def _collapsed_from_pstats(stats: dict) -> Counter:
+    """
+    Rebuilds approximate stacks from cProfile's caller graph, in microseconds.
+    stats is pstats.Stats.stats: {function: (cc, nc, tottime, cumtime, {caller: (cc, nc, tt, ct)})}.
+    """
+    collapsed = Counter()
+
+    def expand(function, weight: float, path: list, on_path: set):
+        callers = stats.get(function, (0, 0, 0, 0, {}))[4]
+        callers = {caller: edge for caller, edge in callers.items() if caller not in on_path}
+        edge_total = sum(edge[3] for edge in callers.values())
+        if not callers or edge_total <= 0 or len(path) >= _MAX_STACK_DEPTH:
+            collapsed[";".join(_frame_label(*frame) for frame in reversed(path))] += weight
+            return
+        for caller, edge in callers.items():
+            share = weight * edge[3] / edge_total
+            if share >= _MIN_WEIGHT_US:
+                on_path.add(caller)
+                path.append(caller)
+                expand(caller, share, path, on_path)
+                path.pop()
+                on_path.discard(caller)
+
+    for function, (_, _, own_time, _, _) in stats.items():
+        weight = own_time * 1e6
+        if weight >= _MIN_WEIGHT_US:
+            expand(function, weight, [function], {function})
+    return collapsed
+
+
+def _profile_cprofile(execute, command_line: str, current_path: str):
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        chunks, new_path, should_exit = _run_collected(execute, command_line, current_path)
+    finally:
+        profiler.disable()
+    stats = pstats.Stats(profiler)
+    own_times = [(own, cumulative, calls, function)
+                 for function, (_, calls, own, cumulative, _) in stats.stats.items()]
+    return chunks, new_path, should_exit, stats, own_times, _collapsed_from_pstats(stats.stats)
+
+
+# --- Sampling ---
+
+class SamplingProfiler:
+    """Records the stacks of all other threads every 'interval' seconds, from a background thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks = Counter() # Tuple of (filename, first line, function), outermost first -> samples
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="morel-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                    frame = frame.f_back
+                stack.append(("~", 0, f"thread {names.get(thread_id, thread_id)}"))
+                self.stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+
+def _sampled_pstats(profiler: SamplingProfiler):
+    """A pstats.Stats built from samples: each sample counts as one interval of time."""
+    import pstats
+    own, cumulative, callers = Counter(), Counter(), {}
+    for stack, count in profiler.stacks.items():
+        own[stack[-1]] += count
+        for function in set(stack): # Recursive functions count once per sample
+            cumulative[function] += count
+        for caller, callee in zip(stack, stack[1:]):
+            edges = callers.setdefault(callee, Counter())
+            edges[caller] += count
+
+    class _SampledStats: # pstats.Stats accepts any object with a create_stats()/stats pair
+        def create_stats(self):
+            pass
+
+    source = _SampledStats()
+    source.stats = {}
+    for function in cumulative:
+        seconds_own = own[function] * profiler.interval
+        seconds_cumulative = cumulative[function] * profiler.interval
+        samples = cumulative[function]
+        function_callers = {caller: (n, n, 0.0, n * profiler.interval)
+                            for caller, n in callers.get(function, {}).items()}
+        source.stats[function] = (samples, samples, seconds_own, seconds_cumulative, function_callers)
+    return pstats.Stats(source)
+
+
+def _profile_sampling(execute, command_line: str, current_path: str, interval: float):
+    profiler = SamplingProfiler(interval)
+    profiler.start()
+    try:
+        chunks, new_path, should_exit = _run_collected(execute, command_line, current_path)
+    finally:
+        profiler.stop()
+    stats = _sampled_pstats(profiler)
+    own_times = [(own, cumulative, calls, function)
+                 for function, (_, calls, own, cumulative, _) in stats.stats.items()]
+    collapsed = Counter()
+    for stack, count in profiler.stacks.items():
+        collapsed[";".join(_frame_label(*frame) for frame in stack)] += count
+    return chunks, new_path, should_exit, stats, own_times, collapsed, profiler.samples
+
+
+# --- Command ---
+
+def _report(own_times: list, top_n: int, unit: str) -> list[str]:
+    lines = [f"{'own':>10}{'total':>10}{'calls':>9}  function ({unit})"]
+    for own, cumulative, calls, (filename, line, function) in sorted(own_times, reverse=True)[:top_n]:
+        lines.append(f"{own * 1000:>10.2f}{cumulative * 1000:>10.2f}{calls:>9}  {_frame_label(filename, line, function)}")
+    return lines
+
+
+def _default_prefix() -> str:
+    directory = os.path.join(morel_config_dir(), "profiles")
+    os.makedirs(directory, exist_ok=True)
+    prefix = base = os.path.join(directory, "profile-" + time.strftime("%Y%m%d-%H%M%S"))
+    number = 1
+    while os.path.exists(prefix + ".pstats"): # Several profiles within a second
+        number += 1
+        prefix = f"{base}-{number}"
+    return prefix
+
+
+_USAGE = "Usage: profile [-n N] [--sample] [--interval MS] [-o PREFIX] <command line>"
+
+
+def _parse_options(line: str):
+    """Splits leading options off the command line, leaving the rest (pipes, quotes) untouched."""
+    options = {"top_n": PROFILE_TOP_N, "sample": False, "interval_ms": PROFILE_SAMPLE_INTERVAL_MS, "prefix": None}
+    rest = line.strip()
+    while rest.startswith("-"):
+        word, _, rest = rest.partition(" ")
+        rest = rest.strip()
+        if word == "--sample":
+            options["sample"] = True
+            continue
+        if word not in ("-n", "--interval", "-o"):
+            raise ValueError(f"profile: unknown option {word}")
+        value, _, rest = rest.partition(" ")
+        rest = rest.strip()
+        if not value:
+            raise ValueError(f"profile: {word} needs a value")
+        if word == "-n":
+            options["top_n"] = int(value)
+        elif word == "--interval":
+            options["interval_ms"] = float(value)
+            if options["interval_ms"] <= 0:
+                raise ValueError("profile: the interval must be positive")
+        else:
+            options["prefix"] = os.path.expanduser(value)
+    return options, rest
+
+
+def profile_command(line: str, current_path: str, execute) -> tuple:
+    """Runs 'line' through execute(line, current_path) under a profiler (see the module docstring)."""
+    try:
+        options, command_line = _parse_options(line)
+    except ValueError as e:
+        message = str(e) if str(e).startswith("profile:") else f"profile: invalid value ({e})"
+        return f"{message}\n{_USAGE}", current_path, False
+    if not command_line:
+        return _USAGE, current_path, False
+
+    if not _PROFILING.acquire(blocking=False):
+        return "profile: another command is already being profiled.", current_path, False
+    try:
+        return _profile(options, command_line, current_path, execute)
+    finally:
+        _PROFILING.release()
+
+
+def _profile(options: dict, command_line: str, current_path: str, execute) -> tuple:
+    started = time.perf_counter()
+    if options["sample"]:
+        interval = options["interval_ms"] / 1000
+        chunks, new_path, should_exit, stats, own_times, collapsed, samples = _profile_sampling(
+            execute, command_line, current_path, interval)
+        summary = f"{samples} samples every {options['interval_ms']:g} ms (all threads)"
+        unit = "ms, sampled"
+    else:
+        chunks, new_path, should_exit, stats, own_times, collapsed = _profile_cprofile(execute, command_line, current_path)
+        summary = "cProfile (calling thread only)"
+        unit = "ms"
+    elapsed = time.perf_counter() - started
+
+    prefix = options["prefix"]
+    if prefix is not None and not os.path.isabs(prefix):
+        prefix = os.path.join(current_path, prefix)
+    lines = list(chunks)
+    lines.append(f"profile: '{command_line}' took {elapsed * 1000:.1f} ms; {summary}")
+    lines.extend(_report(own_times, options["top_n"], unit))
+    try:
+        prefix = prefix or _default_prefix()
+        stats.dump_stats(prefix + ".pstats")
+        with open(prefix + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, weight in collapsed.most_common():
+                f.write(f"{stack} {max(1, round(weight))}\n")
+        lines.append(f"Wrote {prefix}.pstats and {prefix}.collapsed ({'samples' if options['sample'] else 'microseconds'}).")
+    except OSError as e:
+        lines.append(f"profile: could not write the profile files: {e.strerror or e}")
+    return "\n".join(lines), new_path, should_exit
@@ -0,0 +1,456 @@
+"""
+The 'run' command: executes a Python script with the current interpreter.
+
+By default the script's output is streamed: stdout and stderr are read line by line
+on two reader threads and handed to the shell as they are produced, so nothing waits
+for the script to exit. Each stream is also recorded in its own OutputBuffer, which
+keeps at most max_memory_bytes in memory and then either spills to a temporary file
+or stops recording, so a script that prints gigabytes cannot exhaust the shell's memory.
+When a run is closed its spill files are deleted, unless only their head was shown (--capture,
+fg): then they are kept for the user, and the overflow note gives their path.
+
+  run [--capture] [--warm | --inproc] [--cap SIZE] [--no-spill] <script.py> [args...] [&]
+
+A trailing '&' starts the script as a background job instead (see jobs.py).
+--warm sends the script to a pre-warmed interpreter (see warmpool.py).
+--inproc runs a trusted script inside the shell's own interpreter (see inproc.py); it is
+refused where commands can be cancelled (CANCEL_EVENT is set, i.e. in the GUI).
+--capture restores the old behaviour (print everything once the script has exited).
+"""
+import os
+import queue
+import subprocess
+import sys
+import tempfile
+import threading
+
+from morel_commands import CANCEL_EVENT, track_foreground_process
+
+RUN_MEMORY_CAP_BYTES = 1024 * 1024 # In-memory limit per stream (stdout and stderr each)
+RUN_SPILL_TO_FILE = True # Past the cap, keep recording in a temp file instead of dropping output
+RUN_STREAM_BATCH_LINES = 500 # Lines gathered into one printed chunk when output arrives faster than it is printed
+RUN_MAX_LINE_CHARS = 64 * 1024 # Longer lines are split, so a single huge line is never held in full
+_QUEUE_MAX_LINES = 10000 # Back-pressure: reader threads block (and so does the script) if the shell falls behind
+
+_SIZE_SUFFIXES = {"k": 1024, "m": 1024 ** 2, "g": 1024 ** 3}
+
+
+def parse_size(size_string: str) -> int:
+    """Parses '4096', '512K', '10M' or '1G' into a byte count. Raises ValueError."""
+    size_string = size_string.strip().lower()
+    if size_string and size_string[-1] in _SIZE_SUFFIXES:
+        return int(float(size_string[:-1]) * _SIZE_SUFFIXES[size_string[-1]])
+    return int(size_string)
+
+
+class OutputBuffer:
+    """
+    Records one output stream. Lines are kept in memory until max_memory_bytes is reached;
+    after that they are written to a temporary file (spill=True) or only counted (spill=False).
+    finish() closes the temporary file once the stream has ended. close() deletes it, unless
+    getvalue() handed out only its head, in which case it is left for the user to read.
+    """
+
+    def __init__(self, stream_name: str, max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE):
+        self.stream_name = stream_name
+        self.max_memory_bytes = max_memory_bytes
+        self.spill = spill
+        self.total_bytes = 0
+        self.line_count = 0
+        self.dropped_lines = 0
+        self.spill_path = None
+        self.spill_kept = False # Set by getvalue() once the spill file holds more than was shown
+        self._lines = []
+        self._memory_bytes = 0
+        self._spill_file = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def truncated(self) -> bool:
+        """True if lines past the memory cap were dropped (spill=False)."""
+        return self.dropped_lines > 0
+
+    def append(self, line: str):
+        line_bytes = len(line) + 1 # Approximate (characters, not encoded bytes), plus the newline
+        with self._lock:
+            self.total_bytes += line_bytes
+            self.line_count += 1
+            if self._closed: # A late line from a killed script
+                return
+            if self._spill_file is not None:
+                self._spill_file.write(line + "\n")
+            elif self._memory_bytes + line_bytes <= self.max_memory_bytes:
+                self._lines.append(line)
+                self._memory_bytes += line_bytes
+            elif self.spill:
+                self._spill_file = tempfile.NamedTemporaryFile(
+                    "w", encoding="utf-8", errors="replace", delete=False,
+                    prefix="morel-run-", suffix=f".{self.stream_name}.log")
+                self.spill_path = self._spill_file.name
+                self._spill_file.write("\n".join(self._lines) + "\n" if self._lines else "")
+                self._spill_file.write(line + "\n")
+                self._lines = [] # Everything now lives in the file
+                self._memory_bytes = 0
+            else:
+                self.dropped_lines += 1
+
+    def finish(self):
+        """Closes the spill file (it stays readable through getvalue() until close())."""
+        with self._lock:
+            if self._spill_file is not None:
+                self._spill_file.close()
+
+    def close(self):
+        """Discards the recorded text and deletes the spill file."""
+        with self._lock:
+            self._closed = True
+            self._lines = []
+            self._memory_bytes = 0
+            if self._spill_file is not None:
+                self._spill_file.close()
+            if self.spill_path is not None and not self.spill_kept:
+                try:
+                    os.remove(self.spill_path)
+                except OSError:
+                    pass
+
+    def getvalue(self) -> str:
+        """
+        The recorded text, capped at max_memory_bytes characters. When the stream was spilled this
+        is the head of the spill file, cut back to a whole line, and the file is kept (see close()).
+        """
+        with self._lock:
+            if self.spill_path is None or self._closed:
+                return "\n".join(self._lines)
+            if self._spill_file is not None and not self._spill_file.closed:
+                self._spill_file.flush()
+            self.spill_kept = True
+        with open(self.spill_path, encoding="utf-8", errors="replace") as spill_file:
+            head = spill_file.read(self.max_memory_bytes)
+        last_newline = head.rfind("\n")
+        if len(head) == self.max_memory_bytes and last_newline > 0: # Do not end on a partial line
+            head = head[:last_newline]
+        return head.rstrip("\n")
+
+    def describe_overflow(self) -> str:
+        """A one-line note if the stream went over its memory cap and not all of it was shown, else ''."""
+        if self.spill_kept:
+            return (f"[{self.stream_name}: {self.total_bytes} bytes exceeded the {self.max_memory_bytes}-byte "
+                    f"memory cap; the full output is in {self.spill_path}]")
+        if self.dropped_lines:
+            return (f"[{self.stream_name}: {self.dropped_lines} lines past the {self.max_memory_bytes}-byte "
+                    f"memory cap were not kept]")
+        return ""
+
+
+class RecordedRun:
+    """
+    The output side of a running script: each stdout/stderr line is recorded in an OutputBuffer
+    and handed to a sink, by default a bounded queue that iter_batches() reads from.
+    A different 'sink' callable can be given instead (background jobs use one that never blocks);
+    it receives (stream_name, line) tuples, with line None at EOF, while record_lock is held.
+    Subclasses feed it through record_line() and record_eof(). close() must be called once
+    the recorded output is no longer needed: it deletes the spill files that were not shown.
+    """
+
+    def __init__(self, max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE, sink=None):
+        self.stdout_buffer = OutputBuffer("stdout", max_memory_bytes, spill)
+        self.stderr_buffer = OutputBuffer("stderr", max_memory_bytes, spill)
+        self.lines = queue.Queue(maxsize=_QUEUE_MAX_LINES) # (stream_name, line); line is None at EOF
+        self.open_streams = 2 # Decremented (under record_lock) as each stream reaches EOF
+        self._sink = sink if sink is not None else self.lines.put
+        # Held while a line is recorded and handed to the sink, so a snapshot of the buffers taken
+        # under this lock never overlaps with what the sink receives afterwards.
+        self.record_lock = threading.Lock()
+        self._buffers = {"stdout": self.stdout_buffer, "stderr": self.stderr_buffer}
+
+    def record_line(self, stream_name: str, line: str):
+        with self.record_lock:
+            self._buffers[stream_name].append(line)
+            self._sink((stream_name, line))
+
+    def record_eof(self, stream_name: str):
+        with self.record_lock:
+            self.open_streams -= 1
+            self._sink((stream_name, None))
+
+    def iter_batches(self, batch_lines: int = RUN_STREAM_BATCH_LINES):
+        """Yields lists of (stream_name, line) as output arrives, until both streams reach EOF."""
+        open_streams = 2
+        while open_streams:
+            batch = []
+            item = self.lines.get() # Block for the first line, then take whatever else is already waiting
+            while True:
+                if item[1] is None:
+                    open_streams -= 1
+                else:
+                    batch.append(item)
+                if len(batch) >= batch_lines or not open_streams:
+                    break
+                try:
+                    item = self.lines.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                yield batch
+
+    def _drain(self):
+        """Discards queued lines until both streams are closed, so no producer stays blocked on a full queue."""
+        while self.open_streams:
+            try:
+                self.lines.get(timeout=0.05)
+            except queue.Empty:
+                pass
+
+    def _finish_buffers(self):
+        self.stdout_buffer.finish()
+        self.stderr_buffer.finish()
+
+    def close(self):
+        """Discards the recorded output. Subclasses stop the script first if it is still running."""
+        self.stdout_buffer.close()
+        self.stderr_buffer.close()
+
+
+def script_environment() -> dict:
+    """The environment for a script whose output is read through a pipe."""
+    child_env = dict(os.environ)
+    child_env["PYTHONUNBUFFERED"] = "1" # Otherwise a piped child only flushes when its buffer fills
+    return child_env
+
+
+class ScriptRun(RecordedRun):
+    """A script running in its own interpreter, with stdout and stderr pumped by two reader threads."""
+
+    def __init__(self, command: list[str], cwd: str, max_memory_bytes: int = RUN_MEMORY_CAP_BYTES,
+                 spill: bool = RUN_SPILL_TO_FILE, sink=None):
+        super().__init__(max_memory_bytes, spill, sink)
+        self.process = subprocess.Popen(
+            command, cwd=cwd, env=script_environment(),
+            stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace", bufsize=1
+        )
+        self._readers = [
+            threading.Thread(target=self._pump, args=(self.process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self._pump, args=(self.process.stderr, "stderr"), daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+
+    def _pump(self, pipe, stream_name: str):
+        try:
+            for line in iter(lambda: pipe.readline(RUN_MAX_LINE_CHARS), ""):
+                self.record_line(stream_name, line.rstrip("\n"))
+        except (OSError, ValueError): # Pipe closed underneath us by close()
+            pass
+        finally:
+            self.record_eof(stream_name)
+
+    def wait(self) -> int:
+        returncode = self.process.wait()
+        for reader in self._readers:
+            reader.join()
+        self._finish_buffers()
+        return returncode
+
+    def close(self):
+        """Stops the script if it is still running (e.g. the caller stopped reading), releases its pipes and output."""
+        if self.process.poll() is None:
+            self.process.kill()
+        self._drain()
+        self.wait()
+        super().close()
+
+
+def resolve_script_path(current_path: str, script_name_arg: str) -> tuple[str, str]:
+    """Returns (resolved_script_path, error_message); error_message is empty on success."""
+    if not script_name_arg:
+        return "", "run: missing script name"
+
+    # Resolve script path
+    if os.path.isabs(script_name_arg):
+        resolved_script_path = script_name_arg
+    else:
+        resolved_script_path = os.path.abspath(os.path.join(current_path, script_name_arg))
+
+    if not resolved_script_path.endswith(".py"):
+        return "", f"run: not a Python script: {script_name_arg}"
+
+    if not os.path.exists(resolved_script_path) or not os.path.isfile(resolved_script_path):
+        return "", f"run: script not found: {script_name_arg}"
+    return resolved_script_path, ""
+
+
+def start_script_run(resolved_script_path: str, script_args: list[str], current_path: str,
+                     max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE,
+                     warm: bool = False) -> RecordedRun:
+    """Starts the script in a fresh interpreter (ScriptRun), or in a pre-warmed one if warm is True."""
+    if warm:
+        from morel_commands.warmpool import get_warm_pool # Only loaded when warm runs are used
+        script_run = get_warm_pool().run(resolved_script_path, script_args, current_path, max_memory_bytes, spill)
+        track_foreground_process(script_run.worker) # Killing the worker retires it; the pool replaces it
+        return script_run
+    # sys.executable ensures using the same Python interpreter
+    script_run = ScriptRun([sys.executable, resolved_script_path] + script_args, current_path, max_memory_bytes, spill)
+    track_foreground_process(script_run.process)
+    return script_run
+
+
+def run_command_string(current_path: str, script_name_arg: str, script_args: list[str],
+                       max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE,
+                       warm: bool = False) -> str:
+    """
+    Prepares the string output for the 'run' command by executing a Python script
+    and waiting for it to finish. At most max_memory_bytes of each stream is returned.
+    """
+    resolved_script_path, error_message = resolve_script_path(current_path, script_name_arg)
+    if error_message:
+        return error_message
+
+    try:
+        script_run = start_script_run(resolved_script_path, script_args, current_path, max_memory_bytes, spill, warm)
+    except Exception as e:
+        return f"run: failed to execute script '{script_name_arg}': {e}"
+    try:
+        for _ in script_run.iter_batches(): # Drain the queue; the buffers keep the output
+            pass
+        returncode = script_run.wait()
+        return _captured_output(script_run, returncode)
+    finally:
+        script_run.close()
+
+
+def run_inproc_command_string(current_path: str, script_name_arg: str, script_args: list[str],
+                              max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE) -> str:
+    """Prepares the string output for 'run --inproc' (the script runs inside this interpreter)."""
+    resolved_script_path, error_message = resolve_script_path(current_path, script_name_arg)
+    if error_message:
+        return error_message
+
+    from morel_commands.inproc import run_inproc # Only loaded when in-process runs are used
+    try:
+        script_run, returncode = run_inproc(resolved_script_path, script_args, current_path, max_memory_bytes, spill)
+    except OSError as e:
+        return f"run: failed to execute script '{script_name_arg}': {e}"
+    try:
+        return _captured_output(script_run, returncode)
+    finally:
+        script_run.close()
+
+
+def _captured_output(script_run: RecordedRun, returncode: int) -> str:
+    """Formats a finished run's recorded output exactly as _stream_chunks() shows it."""
+    lines = []
+    if script_run.stdout_buffer.line_count:
+        lines += ["Output:", script_run.stdout_buffer.getvalue()]
+    if script_run.stderr_buffer.line_count:
+        lines += ["Errors:", script_run.stderr_buffer.getvalue()]
+    return "\n".join(lines + _closing_notes(script_run, returncode, bool(lines)))
+
+
+def _closing_notes(script_run: RecordedRun, returncode: int, had_output: bool) -> list[str]:
+    """The lines shown after a run's output: overflow notes, and a note if it printed nothing or failed."""
+    notes = [note for note in (script_run.stdout_buffer.describe_overflow(),
+                               script_run.stderr_buffer.describe_overflow()) if note]
+    if not had_output:
+        notes.insert(0, "[Script executed with no output]")
+    if returncode != 0:
+        notes.append(f"[Script exited with code {returncode}]")
+    return notes
+
+
+def run_command_stream(current_path: str, script_name_arg: str, script_args: list[str],
+                       max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE,
+                       warm: bool = False):
+    """
+    Starts the script and returns an iterator of output chunks (or an error message string).
+    An 'Output:' / 'Errors:' header is emitted whenever the output switches between stdout
+    and stderr. If the caller stops iterating early, the script is killed.
+    """
+    resolved_script_path, error_message = resolve_script_path(current_path, script_name_arg)
+    if error_message:
+        return error_message
+    try:
+        script_run = start_script_run(resolved_script_path, script_args, current_path, max_memory_bytes, spill, warm)
+    except Exception as e:
+        return f"run: failed to execute script '{script_name_arg}': {e}"
+    return _stream_chunks(script_run)
+
+
+def _stream_chunks(script_run: RecordedRun):
+    current_stream = None
+    try:
+        for batch in script_run.iter_batches():
+            lines = []
+            for stream_name, line in batch:
+                if stream_name != current_stream:
+                    current_stream = stream_name
+                    lines.append("Output:" if stream_name == "stdout" else "Errors:")
+                lines.append(line)
+            yield "\n".join(lines)
+        returncode = script_run.wait()
+    finally:
+        script_run.close()
+
+    notes = _closing_notes(script_run, returncode, current_stream is not None)
+    if notes:
+        yield "\n".join(notes)
+
+
+def run_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    capture = False
+    inproc = False
+    # 'warmpool on' makes warm runs the session default; the pool module is only consulted once loaded.
+    warmpool_module = sys.modules.get("morel_commands.warmpool")
+    warm = bool(warmpool_module and warmpool_module.WARM_RUN_DEFAULT)
+    spill = RUN_SPILL_TO_FILE
+    max_memory_bytes = RUN_MEMORY_CAP_BYTES
+    # Options are only recognised before the script name; everything after it belongs to the script.
+    index = 0
+    while index < len(args) and args[index].startswith("--"):
+        option = args[index]
+        if option == "--capture":
+            capture = True
+        elif option == "--warm":
+            warm = True
+        elif option == "--inproc":
+            inproc = True
+        elif option == "--no-spill":
+            spill = False
+        elif option == "--cap" and index + 1 < len(args):
+            index += 1
+            try:
+                max_memory_bytes = parse_size(args[index])
+            except ValueError:
+                return f"run: invalid size for --cap: {args[index]}", current_path, False
+        else:
+            return (f"run: unknown option '{option}'. Usage: run [--capture] [--warm | --inproc] [--cap SIZE] [--no-spill] <script.py> [args...]",
+                    current_path, False)
+        index += 1
+
+    background = args[-1:] == ["&"] and len(args) > index
+    if background:
+        args = args[:-1]
+    script_name = args[index] if index < len(args) else None
+    if not script_name:
+        return "run: missing script name", current_path, False
+    script_args = args[index + 1:]
+    if background and inproc:
+        return "run: --inproc cannot be combined with '&' (in-process scripts run in the foreground)", current_path, False
+    if inproc and CANCEL_EVENT.get() is not None:
+        # A front end that can cancel commands (the GUI) runs them on threads: an in-process script
+        # could not be stopped, and would swap sys.stdout and the working directory under the others.
+        return "run: --inproc is not available here (in-process scripts cannot be cancelled); use run without it", current_path, False
+    if inproc:
+        return run_inproc_command_string(current_path, script_name, script_args, max_memory_bytes, spill), current_path, False
+    if background:
+        resolved_script_path, error_message = resolve_script_path(current_path, script_name)
+        if error_message:
+            return error_message, current_path, False
+        from morel_commands.jobs import start_background_job # Loads the job table on first use
+        return (start_background_job(current_path, resolved_script_path, script_name, script_args, max_memory_bytes, spill),
+                current_path, False)
+    if capture:
+        return run_command_string(current_path, script_name, script_args, max_memory_bytes, spill, warm), current_path, False
+    return run_command_stream(current_path, script_name, script_args, max_memory_bytes, spill, warm), current_path, False
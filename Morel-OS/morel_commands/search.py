@@ -0,0 +1,458 @@
+"""
+Tree search commands: 'find' (names and metadata) and 'grep' (file contents).
+
+  find [path] [-name GLOB] [-iname GLOB] [-type f|d|l] [-size [+|-]N[k|M|G]]
+       [-mtime [+|-]DAYS] [-maxdepth N] [-limit N] [-j WORKERS]
+  grep [-i] [-n] [-l] [-F] [-m N] [-j WORKERS] <pattern> [path...]
+
+Both walk the tree with os.scandir on a pool of SEARCH_WORKERS threads: every directory,
+and for grep every file, is one task, and the tasks a directory produces (its
+subdirectories and files) are queued behind it. Only a bounded number of tasks is
+handed to the pool at a time, so a huge tree does not turn into a huge backlog of
+futures. Results are streamed in the order they are found (which is not a stable
+order), one chunk per finished task.
+
+When a result limit is given (-limit for find, -m for grep) or the consumer stops
+reading (e.g. 'find / -name x | head 1'), queued tasks are dropped, running tasks stop
+at their next directory entry or file, and no further directories are read.
+
+grep reads files up to GREP_MMAP_BYTES with one read() and maps larger ones with mmap,
+so a multi-GB log is searched without being copied into memory. Files that contain a
+NUL byte in their first block are treated as binary: a match is reported, not printed.
+Given no path, grep filters its piped input, or searches the current directory.
+"""
+import fnmatch
+import mmap
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+SEARCH_WORKERS = 8 # Threads reading directories and files
+GREP_MMAP_BYTES = 1024 * 1024 # Files at least this large are searched through mmap
+_BINARY_CHECK_BYTES = 8192
+_TASKS_PER_WORKER = 4 # Tasks handed to the pool at once, per worker
+_SIZE_UNITS = {"": 1, "c": 1, "k": 1024, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+
+
+class SearchCancelled(Exception):
+    """Raised inside a task once the search has enough results or has been stopped."""
+
+
+class SearchSession:
+    """State shared by the tasks of one search: the stop flag and the result budget."""
+
+    def __init__(self, limit: int = None):
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.remaining = limit # None means unlimited
+
+    def check(self):
+        if self.stopped.is_set():
+            raise SearchCancelled()
+
+    def take(self, results: list) -> list:
+        """Trims a task's results to what is left of the limit; stops the search once it is used up."""
+        if self.remaining is None or not results:
+            return results
+        with self.lock:
+            if self.remaining <= 0:
+                return []
+            results = results[:self.remaining]
+            self.remaining -= len(results)
+            if self.remaining <= 0:
+                self.stopped.set()
+        return results
+
+
+def run_search(first_tasks, session: SearchSession, workers: int = SEARCH_WORKERS):
+    """
+    Runs tasks on a thread pool and yields their output as chunks.
+    A task is a callable returning (result_lines, follow_up_tasks); follow-up tasks are
+    queued and run after it. Closing the generator stops the search.
+    """
+    pending = deque(first_tasks)
+    running = set()
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search")
+    try:
+        while pending or running:
+            while pending and len(running) < workers * _TASKS_PER_WORKER and not session.stopped.is_set():
+                running.add(pool.submit(pending.popleft()))
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    lines, follow_ups = future.result()
+                except SearchCancelled:
+                    continue
+                lines = session.take(lines)
+                if lines:
+                    yield "\n".join(lines)
+                if not session.stopped.is_set():
+                    pending.extend(follow_ups)
+    finally:
+        session.stopped.set() # Running tasks give up at their next entry
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _resolve(current_path: str, path_arg: str) -> str:
+    path_arg = os.path.expanduser(path_arg)
+    return path_arg if os.path.isabs(path_arg) else os.path.abspath(os.path.join(current_path, path_arg))
+
+
+def _error_line(command: str, path: str, error: OSError) -> str:
+    return f"{command}: '{path}': {error.strerror or error}"
+
+
+# --- find ---
+
+def _parse_size(text: str):
+    """'+10M' -> ('+', 10485760). Raises ValueError."""
+    sign = text[0] if text[:1] in ("+", "-") else ""
+    number = text[len(sign):]
+    unit = number[-1] if number and not number[-1].isdigit() else ""
+    if unit not in _SIZE_UNITS or not number[:len(number) - len(unit)].isdigit():
+        raise ValueError(text)
+    return sign, int(number[:len(number) - len(unit)]) * _SIZE_UNITS[unit]
+
+
+def _parse_days(text: str):
+    """'-7' -> ('-', 7). Raises ValueError."""
+    sign = text[0] if text[:1] in ("+", "-") else ""
+    if not text[len(sign):].isdigit():
+        raise ValueError(text)
+    return sign, int(text[len(sign):])
+
+
+def _compare(sign: str, value: float, target: float) -> bool:
+    if sign == "+":
+        return value > target
+    if sign == "-":
+        return value < target
+    return value == target
+
+
+class FindQuery:
+    """The predicates of one 'find' command; all given predicates must match."""
+
+    def __init__(self):
+        self.name = None
+        self.ignore_case = False
+        self.entry_type = None # "f", "d" or "l"
+        self.size = None # (sign, bytes)
+        self.mtime = None # (sign, days)
+        self.max_depth = None
+        self.now = time.time()
+
+    def needs_stat(self) -> bool:
+        return self.size is not None or self.mtime is not None
+
+    def matches(self, entry: os.DirEntry) -> bool:
+        if self.name is not None:
+            name = entry.name.lower() if self.ignore_case else entry.name
+            if not fnmatch.fnmatchcase(name, self.name):
+                return False
+        if self.entry_type is not None:
+            if self.entry_type == "l":
+                if not entry.is_symlink():
+                    return False
+            elif entry.is_symlink() or (entry.is_dir() != (self.entry_type == "d")):
+                return False
+        if self.needs_stat():
+            stat_result = entry.stat(follow_symlinks=False) # Cached on the DirEntry
+            if self.size is not None and not _compare(self.size[0], stat_result.st_size, self.size[1]):
+                return False
+            if self.mtime is not None:
+                age_days = int((self.now - stat_result.st_mtime) // 86400) # Whole days, as find does
+                if not _compare(self.mtime[0], age_days, self.mtime[1]):
+                    return False
+        return True
+
+
+def _find_task(directory: str, display: str, depth: int, query: FindQuery, session: SearchSession):
+    def task():
+        session.check()
+        lines, follow_ups = [], []
+        try:
+            with os.scandir(directory) as scandir_iterator:
+                for entry in scandir_iterator:
+                    session.check()
+                    entry_display = os.path.join(display, entry.name)
+                    try:
+                        if query.matches(entry):
+                            lines.append(entry_display)
+                        if entry.is_dir(follow_symlinks=False) and (query.max_depth is None or depth < query.max_depth):
+                            follow_ups.append(_find_task(entry.path, entry_display, depth + 1, query, session))
+                    except OSError as e:
+                        lines.append(_error_line("find", entry_display, e))
+        except OSError as e:
+            lines.append(_error_line("find", display, e))
+        return lines, follow_ups
+    return task
+
+
+_FIND_USAGE = ("Usage: find [path] [-name GLOB] [-iname GLOB] [-type f|d|l] [-size [+|-]N[k|M|G]] "
+               "[-mtime [+|-]DAYS] [-maxdepth N] [-limit N] [-j WORKERS]")
+
+
+def find_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    query = FindQuery()
+    path_arg = None
+    limit = None
+    workers = SEARCH_WORKERS
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if arg.startswith("-") and len(arg) > 1:
+            if index + 1 >= len(args):
+                return f"find: missing argument to '{arg}'. {_FIND_USAGE}", current_path, False
+            index += 1
+            value = args[index]
+            try:
+                if arg in ("-name", "-iname"):
+                    query.ignore_case = arg == "-iname"
+                    query.name = value.lower() if query.ignore_case else value
+                elif arg == "-type" and value in ("f", "d", "l"):
+                    query.entry_type = value
+                elif arg == "-size":
+                    query.size = _parse_size(value)
+                elif arg == "-mtime":
+                    query.mtime = _parse_days(value)
+                elif arg in ("-maxdepth", "-limit", "-j") and value.isdigit():
+                    if arg == "-maxdepth":
+                        query.max_depth = int(value)
+                    elif arg == "-limit":
+                        limit = int(value)
+                    elif int(value) >= 1:
+                        workers = int(value)
+                    else:
+                        raise ValueError(value)
+                else:
+                    return f"find: invalid option or value: {arg} {value}. {_FIND_USAGE}", current_path, False
+            except ValueError:
+                return f"find: invalid value for {arg}: {value}", current_path, False
+        elif path_arg is None:
+            path_arg = arg
+        else:
+            return f"find: only one path can be given. {_FIND_USAGE}", current_path, False
+        index += 1
+
+    root = _resolve(current_path, path_arg or ".")
+    if not os.path.isdir(root):
+        return f"find: '{path_arg}': No such directory", current_path, False
+    if limit == 0 or query.max_depth == 0:
+        return "", current_path, False
+    session = SearchSession(limit)
+    task = _find_task(root, path_arg or ".", 1, query, session)
+    return run_search([task], session, workers), current_path, False
+
+
+# --- grep ---
+
+class GrepQuery:
+    """A compiled 'grep' pattern and its output options."""
+
+    def __init__(self, pattern: str, ignore_case: bool = False, fixed: bool = False,
+                 line_numbers: bool = False, files_only: bool = False):
+        flags = re.IGNORECASE if ignore_case else 0
+        source = re.escape(pattern) if fixed else pattern
+        self.text_regex = re.compile(source, flags)
+        # Files are searched as bytes, so the contents never need decoding; only printed lines are decoded
+        self.bytes_regex = re.compile(source.encode("utf-8", "surrogateescape"), flags | re.MULTILINE)
+        self.line_numbers = line_numbers
+        self.files_only = files_only
+        self.show_names = True
+
+
+def _format_match(query: GrepQuery, display: str, line_number: int, line: str) -> str:
+    prefix = f"{display}:" if query.show_names else ""
+    if query.line_numbers:
+        prefix += f"{line_number}:"
+    return prefix + line
+
+
+def _count_newlines(data, start: int, end: int) -> int:
+    """Counts b"\\n" in data[start:end] a block at a time (mmap has no count() method)."""
+    count = 0
+    while start < end:
+        block_end = min(start + GREP_MMAP_BYTES, end)
+        count += data[start:block_end].count(b"\n")
+        start = block_end
+    return count
+
+
+def grep_buffer(data, display: str, query: GrepQuery, session: SearchSession) -> list[str]:
+    """
+    Searches bytes or an mmap; returns the output lines. Only the matching lines are decoded.
+    The regex runs over the whole buffer to find the next candidate line quickly; a match that
+    runs past the end of its line (e.g. 'a\\sb' or 'a[^z]*b') is checked again within that line
+    alone, and from then on the buffer is searched one line at a time, so matches never span lines.
+    """
+    regex = query.bytes_regex
+    if b"\0" in data[:_BINARY_CHECK_BYTES]:
+        if regex.search(data) is None:
+            return []
+        return [display if query.files_only else f"grep: {display}: binary file matches"]
+
+    lines = []
+    position = 0 # Always the start of a line
+    line_number = 1
+    counted_to = 0 # Newlines before this offset are included in line_number
+    size = len(data)
+    line_by_line = False # Set once the pattern has matched across a newline
+    while position < size:
+        if line_by_line:
+            start = position
+            end = data.find(b"\n", start)
+            if end < 0:
+                end = size
+            position = end + 1
+            if regex.search(data, start, end) is None:
+                continue
+        else:
+            match = regex.search(data, position)
+            if match is None:
+                break
+            start = data.rfind(b"\n", 0, match.start()) + 1
+            end = data.find(b"\n", match.start())
+            if end < 0:
+                end = size
+            position = end + 1 # One output line per matching line
+            if match.end() > end:
+                line_by_line = True
+                if regex.search(data, start, end) is None:
+                    continue
+        session.check()
+        if query.files_only:
+            return [display]
+        if query.line_numbers:
+            line_number += _count_newlines(data, counted_to, start)
+            counted_to = start
+        line = data[start:end].rstrip(b"\r").decode("utf-8", "replace")
+        lines.append(_format_match(query, display, line_number, line))
+    return lines
+
+
+def grep_file(path: str, display: str, query: GrepQuery, session: SearchSession) -> list[str]:
+    session.check()
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < GREP_MMAP_BYTES:
+                return grep_buffer(f.read(), display, query, session)
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return grep_buffer(data, display, query, session)
+    except OSError as e:
+        return [_error_line("grep", display, e)]
+    except ValueError: # mmap of a file that shrank to nothing
+        return []
+
+
+def _grep_file_task(path: str, display: str, query: GrepQuery, session: SearchSession):
+    return lambda: (grep_file(path, display, query, session), [])
+
+
+def _grep_dir_task(directory: str, display: str, query: GrepQuery, session: SearchSession):
+    def task():
+        session.check()
+        lines, follow_ups = [], []
+        try:
+            with os.scandir(directory) as scandir_iterator:
+                for entry in scandir_iterator:
+                    session.check()
+                    entry_display = os.path.join(display, entry.name)
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            follow_ups.append(_grep_dir_task(entry.path, entry_display, query, session))
+                        elif entry.is_file(follow_symlinks=False):
+                            follow_ups.append(_grep_file_task(entry.path, entry_display, query, session))
+                    except OSError as e:
+                        lines.append(_error_line("grep", entry_display, e))
+        except OSError as e:
+            lines.append(_error_line("grep", display, e))
+        return lines, follow_ups
+    return task
+
+
+def grep_lines(batches, query: GrepQuery, limit: int = None):
+    """Filters piped line batches; yields one chunk per batch with matches."""
+    from morel_commands.pipeline import close_batches
+    remaining = limit
+    line_number = 0
+    try:
+        for batch in batches:
+            matched = [_format_match(query, "", line_number + offset, line)
+                       for offset, line in enumerate(batch, 1) if query.text_regex.search(line)]
+            line_number += len(batch)
+            if remaining is not None:
+                matched = matched[:remaining]
+                remaining -= len(matched)
+            if matched:
+                yield "\n".join(matched)
+            if remaining is not None and remaining <= 0:
+                break
+    finally:
+        close_batches(batches)
+
+
+_GREP_USAGE = "Usage: grep [-i] [-n] [-l] [-F] [-m N] [-j WORKERS] <pattern> [path...]"
+
+
+def grep_handler(args: list[str], current_path: str, stdin=None) -> tuple[str, str, bool]:
+    options = {"-i": False, "-n": False, "-l": False, "-F": False}
+    limit = None
+    workers = SEARCH_WORKERS
+    operands = []
+    index = 0
+    while index < len(args):
+        arg = args[index]
+        if operands or arg == "-" or not arg.startswith("-"): # Options come before the pattern
+            operands.append(arg)
+        elif arg in ("-m", "-j"):
+            if index + 1 >= len(args) or not args[index + 1].isdigit():
+                return f"grep: {arg} needs a number. {_GREP_USAGE}", current_path, False
+            index += 1
+            if arg == "-m":
+                limit = int(args[index])
+            elif int(args[index]) >= 1:
+                workers = int(args[index])
+        else:
+            for flag in arg[1:]:
+                if f"-{flag}" not in options:
+                    return f"grep: invalid option -- '{flag}'. {_GREP_USAGE}", current_path, False
+                options[f"-{flag}"] = True
+        index += 1
+    if not operands:
+        return f"grep: no pattern given. {_GREP_USAGE}", current_path, False
+
+    try:
+        query = GrepQuery(operands[0], ignore_case=options["-i"], fixed=options["-F"],
+                          line_numbers=options["-n"], files_only=options["-l"])
+    except re.error as e:
+        return f"grep: invalid pattern '{operands[0]}': {e}", current_path, False
+    if limit == 0:
+        return "", current_path, False
+
+    path_args = operands[1:]
+    if not path_args:
+        if stdin is not None:
+            query.show_names = False
+            return grep_lines(stdin, query, limit), current_path, False
+        path_args = ["."]
+    # Like grep, a single file on the command line is searched without its name in front of each line
+    query.show_names = len(path_args) > 1 or os.path.isdir(_resolve(current_path, path_args[0])) or query.files_only
+
+    session = SearchSession(limit)
+    tasks = []
+    for path_arg in path_args:
+        path = _resolve(current_path, path_arg)
+        if os.path.isdir(path):
+            tasks.append(_grep_dir_task(path, path_arg, query, session))
+        elif os.path.isfile(path):
+            tasks.append(_grep_file_task(path, path_arg, query, session))
+        else:
+            return f"grep: '{path_arg}': No such file or directory", current_path, False
+    return run_search(tasks, session, workers), current_path, False
@@ -0,0 +1,74 @@
+"""
+Prefix trie over a sorted list of strings, used for tab completion.
+
+Building a node per character of 100,000 file names would take far longer than the
+Tab press it is meant to speed up, so the trie is built lazily on top of the sorted
+list itself: a node is the range [lo, hi) of words that share its prefix, and a
+child is found with two bisections inside its parent's range the first time that
+prefix is looked up. After that, walking to a prefix is one dict lookup per
+character, counting its words is a subtraction, and their longest common prefix is
+the common prefix of the first and the last of them.
+"""
+from bisect import bisect_left
+
+
+class _TrieNode:
+    __slots__ = ("lo", "hi", "children")
+
+    def __init__(self, lo: int, hi: int):
+        self.lo = lo
+        self.hi = hi
+        self.children = {} # Next character -> _TrieNode (also memoizes empty ranges)
+
+
+class PrefixTrie:
+    """Prefix lookups on 'words', which must be sorted and must not be modified afterwards."""
+
+    __slots__ = ("words", "_root")
+
+    def __init__(self, words: list[str]):
+        self.words = words
+        self._root = _TrieNode(0, len(words))
+
+    def _node(self, prefix: str) -> _TrieNode:
+        node = self._root
+        for depth, character in enumerate(prefix):
+            child = node.children.get(character)
+            if child is None:
+                if node.lo == node.hi:
+                    return node # Nothing below an empty node; do not memoize the rest
+                start = prefix[:depth + 1]
+                end = prefix[:depth] + chr(ord(character) + 1) if character != "\U0010ffff" else None
+                lo = bisect_left(self.words, start, node.lo, node.hi)
+                hi = bisect_left(self.words, end, lo, node.hi) if end is not None else node.hi
+                child = node.children[character] = _TrieNode(lo, hi)
+            node = child
+        return node
+
+    def range(self, prefix: str) -> tuple[int, int]:
+        """[lo, hi) indices in 'words' of the words starting with prefix."""
+        node = self._node(prefix)
+        return node.lo, node.hi
+
+    def count(self, prefix: str) -> int:
+        node = self._node(prefix)
+        return node.hi - node.lo
+
+    def completions(self, prefix: str) -> list[str]:
+        node = self._node(prefix)
+        return self.words[node.lo:node.hi]
+
+    def common_prefix(self, prefix: str) -> str:
+        """The longest prefix shared by every word starting with 'prefix' ('prefix' itself if none do)."""
+        node = self._node(prefix)
+        if node.lo == node.hi:
+            return prefix
+        first, last = self.words[node.lo], self.words[node.hi - 1]
+        length = len(prefix)
+        limit = min(len(first), len(last))
+        while length < limit and first[length] == last[length]:
+            length += 1
+        return first[:length]
+
+    def __len__(self):
+        return len(self.words)
@@ -0,0 +1,108 @@
+"""
+A pre-warmed Python worker for 'run --warm' (started and managed by warmpool.py).
+
+The worker imports a set of commonly used stdlib modules once, then waits for requests
+on stdin, one JSON object per line: {"token", "script", "args", "cwd"}. Each script is
+executed in this process with runpy, with its own sys.argv, cwd and sys.path[0], writing
+to the worker's real stdout/stderr. When it finishes, the worker writes an end marker to
+both streams (see END_MARKER) and undoes what it can: modules the script imported are
+dropped, and sys.argv, sys.path, the cwd and os.environ are restored.
+
+This file is executed directly (not imported as part of the package), so it may only
+depend on the standard library.
+"""
+import json
+import os
+import runpy
+import sys
+import traceback
+
+END_MARKER = "\x1fMOREL-WARM-END:" # Followed by "<token> <exit code> <peak RSS in KB>" on stdout, "<token>" on stderr
+READY_TOKEN = "ready"
+
+PRELOAD_MODULES = (
+    "argparse", "collections", "csv", "dataclasses", "datetime", "functools", "itertools",
+    "json", "logging", "math", "pathlib", "random", "re", "shutil", "subprocess", "tempfile",
+    "textwrap", "time", "typing",
+)
+
+try:
+    import resource
+except ImportError: # Windows
+    resource = None
+
+
+def peak_rss_kb() -> int:
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak # macOS reports bytes, Linux KB
+
+
+def system_exit_code(system_exit: SystemExit) -> int:
+    """The exit status the interpreter would report for an uncaught SystemExit."""
+    code = system_exit.code
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code
+    print(code, file=sys.stderr) # Same as the interpreter does for sys.exit("message")
+    return 1
+
+
+def script_traceback(error: BaseException, script_path: str):
+    """The traceback from the script's first frame on, like the interpreter would print it (not runpy and this file)."""
+    tb = error.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != script_path:
+        tb = tb.tb_next
+    return tb
+
+
+def run_script(script_path: str, args: list[str], cwd: str) -> int:
+    saved_argv, saved_path, saved_cwd = sys.argv[:], sys.path[:], os.getcwd()
+    saved_stdout, saved_stderr = sys.stdout, sys.stderr
+    saved_environ = dict(os.environ)
+    saved_modules = set(sys.modules)
+    exit_code = 0
+    try:
+        os.chdir(cwd)
+        sys.argv = [script_path] + list(args)
+        sys.path[0] = os.path.dirname(script_path) # What 'python script.py' puts first on sys.path
+        runpy.run_path(script_path, run_name="__main__")
+    except SystemExit as e:
+        exit_code = system_exit_code(e)
+    except BaseException as e:
+        traceback.print_exception(type(e), e, script_traceback(e, script_path))
+        exit_code = 1
+    finally:
+        sys.stdout, sys.stderr = saved_stdout, saved_stderr # In case the script redirected them
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for module_name in set(sys.modules) - saved_modules:
+            del sys.modules[module_name]
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        os.chdir(saved_cwd)
+        sys.argv, sys.path[:] = saved_argv, saved_path
+    return exit_code
+
+
+def serve():
+    for module_name in PRELOAD_MODULES:
+        __import__(module_name)
+    requests = sys.stdin
+    sys.stdin = open(os.devnull) # Scripts must not read the request channel
+
+    sys.stdout.write(f"{END_MARKER}{READY_TOKEN} 0 {peak_rss_kb()}\n")
+    sys.stdout.flush()
+    for request_line in requests:
+        request = json.loads(request_line)
+        exit_code = run_script(request["script"], request["args"], request["cwd"])
+        sys.stderr.write(f"{END_MARKER}{request['token']}\n")
+        sys.stderr.flush()
+        sys.stdout.write(f"{END_MARKER}{request['token']} {exit_code} {peak_rss_kb()}\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    serve()
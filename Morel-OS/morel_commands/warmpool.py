@@ -0,0 +1,304 @@
+"""
+Opt-in pool of pre-warmed interpreters for 'run --warm'.
+
+Starting a fresh interpreter (site, encodings, the script's stdlib imports) is most of
+the wall time of a short script. The pool keeps WARM_POOL_SIZE worker processes
+(warm_worker.py) idle with common stdlib modules already imported; each warm run is sent
+to one of them with its own cwd and argv, and its stdout/stderr are recorded exactly like
+a normal 'run' (see RecordedRun), so streaming, memory caps and spilling all still apply.
+
+Workers are replaced after WARM_POOL_MAX_RUNS scripts, or once their peak RSS has grown
+by more than WARM_POOL_MAX_RSS_GROWTH_KB, since scripts can leave state behind in the
+interpreter that the worker cannot fully undo. Scripts that need a pristine interpreter
+should use plain 'run'.
+
+  warmpool [status]   - pool statistics
+  warmpool on | off   - make warm runs the default for 'run' in this session (or not)
+  warmpool start      - start the idle workers now, so even the first warm run is warm
+  warmpool stop       - stop all workers
+"""
+import atexit
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from morel_commands.run import RUN_MAX_LINE_CHARS, RUN_MEMORY_CAP_BYTES, RUN_SPILL_TO_FILE, RecordedRun
+from morel_commands.warm_worker import END_MARKER, READY_TOKEN
+
+WARM_POOL_SIZE = 2 # Idle warm workers kept ready
+WARM_POOL_MAX_RUNS = 50 # A worker is replaced after running this many scripts...
+WARM_POOL_MAX_RSS_GROWTH_KB = 200 * 1024 # ...or once its peak RSS grew this much since it became ready
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "warm_worker.py")
+
+# Set by 'warmpool on': 'run' then uses the pool without needing --warm.
+WARM_RUN_DEFAULT = False
+
+_tokens = itertools.count(1)
+
+
+class PooledRun(RecordedRun):
+    """A script running inside a warm worker. Finishes when the worker has closed both streams."""
+
+    def __init__(self, worker, max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE):
+        super().__init__(max_memory_bytes, spill)
+        self.worker = worker
+        self.returncode = None
+        self._closed_streams = set()
+        self._state_lock = threading.Lock()
+        self._finished = threading.Event()
+
+    def finish_stream(self, stream_name: str, returncode: int = None):
+        """Called by the worker's reader threads when the end marker (or the worker's EOF) is seen."""
+        with self._state_lock:
+            if stream_name in self._closed_streams:
+                return
+            self._closed_streams.add(stream_name)
+            if returncode is not None:
+                self.returncode = returncode
+            finished = len(self._closed_streams) == 2
+        self.record_eof(stream_name)
+        if finished:
+            if self.returncode is None: # The worker died mid-run
+                self.returncode = self.worker.process.poll() or 1
+            self.worker.pool.release(self.worker) # Before waking waiters, so the worker is reusable when wait() returns
+            self._finished.set()
+
+    def wait(self) -> int:
+        self._finished.wait()
+        self._finish_buffers()
+        return self.returncode
+
+    def close(self):
+        """Stops the run if the caller stopped reading early (the worker is killed and replaced) and releases its output."""
+        if not self._finished.is_set():
+            self.worker.kill()
+        self._drain()
+        self.wait()
+        super().close()
+
+
+class WarmWorker:
+    """One pre-warmed interpreter process and the two threads reading its output."""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", WORKER_SCRIPT],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace", bufsize=1
+        )
+        self.runs_completed = 0
+        self.baseline_rss_kb = None # Peak RSS once warm, before any script ran
+        self.peak_rss_kb = 0
+        self.current_run = None
+        self.killed = False
+        self._readers = [
+            threading.Thread(target=self._pump, args=(self.process.stdout, "stdout"), daemon=True),
+            threading.Thread(target=self._pump, args=(self.process.stderr, "stderr"), daemon=True),
+        ]
+        for reader in self._readers:
+            reader.start()
+
+    @property
+    def alive(self) -> bool:
+        # A killed worker can still look alive to poll() until it is reaped, and once a reader
+        # thread has exited nobody would see the end of a new run
+        return not self.killed and all(reader.is_alive() for reader in self._readers) and self.process.poll() is None
+
+    @property
+    def rss_growth_kb(self) -> int:
+        return self.peak_rss_kb - self.baseline_rss_kb if self.baseline_rss_kb is not None else 0
+
+    def start_run(self, run: PooledRun, script_path: str, args: list[str], cwd: str):
+        self.current_run = run
+        request = {"token": str(next(_tokens)), "script": script_path, "args": args, "cwd": cwd}
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+        except OSError: # Worker died while idle
+            self.kill()
+        if not self.alive: # Its reader threads may already be gone, so close the run here
+            run.finish_stream("stdout")
+            run.finish_stream("stderr")
+
+    def _pump(self, pipe, stream_name: str):
+        try:
+            for line in iter(lambda: pipe.readline(RUN_MAX_LINE_CHARS), ""):
+                marker_index = line.find(END_MARKER)
+                run = self.current_run
+                if marker_index < 0:
+                    if run is not None:
+                        run.record_line(stream_name, line.rstrip("\n"))
+                    continue
+                if marker_index and run is not None: # The script's last line had no trailing newline
+                    run.record_line(stream_name, line[:marker_index])
+                fields = line[marker_index + len(END_MARKER):].split()
+                if stream_name == "stdout":
+                    self.peak_rss_kb = int(fields[2])
+                    if fields[0] == READY_TOKEN:
+                        self.baseline_rss_kb = self.peak_rss_kb
+                        continue
+                    if run is not None:
+                        run.finish_stream("stdout", returncode=int(fields[1]))
+                elif run is not None:
+                    run.finish_stream("stderr")
+        except (OSError, ValueError, IndexError):
+            pass
+        finally:
+            run = self.current_run
+            if run is not None:
+                run.finish_stream(stream_name)
+
+    def kill(self):
+        self.killed = True
+        if self.process.poll() is None:
+            self.process.kill()
+
+    def stop(self):
+        """Lets an idle worker exit on its own by closing its request channel."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+
+
+class WarmPool:
+    """Keeps 'size' idle warm workers and hands each warm run to one of them."""
+
+    def __init__(self, size: int = WARM_POOL_SIZE):
+        self.size = size
+        self._idle = []
+        self._busy = set()
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.warm_runs = 0 # Runs that found an idle worker waiting
+        self.workers_started = 0
+        self.workers_recycled = 0
+
+    def _spawn(self) -> WarmWorker:
+        worker = WarmWorker(self)
+        with self._lock:
+            self.workers_started += 1
+        return worker
+
+    def fill(self):
+        """
+        Starts workers until 'size' are idle or busy (busy ones come back to the idle list when
+        their script ends). Popen returns as soon as the child exists; it warms up in the background.
+        """
+        while True:
+            with self._lock:
+                if len(self._idle) + len(self._busy) >= self.size:
+                    return
+            worker = self._spawn()
+            with self._lock:
+                self._idle.append(worker)
+
+    def run(self, script_path: str, args: list[str], cwd: str,
+            max_memory_bytes: int = RUN_MEMORY_CAP_BYTES, spill: bool = RUN_SPILL_TO_FILE) -> PooledRun:
+        worker = None
+        with self._lock:
+            self.runs += 1
+            while self._idle:
+                candidate = self._idle.pop()
+                if candidate.alive:
+                    worker = candidate
+                    self.warm_runs += 1
+                    break
+        if worker is None:
+            worker = self._spawn()
+        with self._lock:
+            self._busy.add(worker)
+        pooled_run = PooledRun(worker, max_memory_bytes, spill)
+        worker.start_run(pooled_run, script_path, args, cwd)
+        self.fill() # Warm a replacement while this script runs, if the pool is short of workers
+        return pooled_run
+
+    def release(self, worker: WarmWorker):
+        """Returns a worker to the idle list after a run, or retires it."""
+        worker.current_run = None
+        worker.runs_completed += 1
+        keep = (worker.alive and worker.runs_completed < WARM_POOL_MAX_RUNS
+                and worker.rss_growth_kb < WARM_POOL_MAX_RSS_GROWTH_KB)
+        with self._lock:
+            self._busy.discard(worker)
+            if keep and len(self._idle) < self.size:
+                self._idle.append(worker)
+                return
+            self.workers_recycled += 1
+        worker.stop()
+
+    def shutdown(self):
+        with self._lock:
+            workers = self._idle + list(self._busy)
+            self._idle = []
+            self._busy = set()
+        for worker in workers:
+            worker.stop()
+            worker.kill()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "idle": len(self._idle),
+                "busy": len(self._busy),
+                "runs": self.runs,
+                "warm_runs": self.warm_runs,
+                "workers_started": self.workers_started,
+                "workers_recycled": self.workers_recycled,
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_warm_pool() -> WarmPool:
+    """The session's pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = WarmPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def warmpool_command_string(args: list[str]) -> str:
+    global WARM_RUN_DEFAULT
+    action = args[0].lower() if args else "status"
+    if action == "on":
+        WARM_RUN_DEFAULT = True
+        get_warm_pool().fill()
+        return "Warm runs enabled: 'run' now uses the pre-warmed interpreter pool (use 'warmpool off' to disable)."
+    if action == "off":
+        WARM_RUN_DEFAULT = False
+        return "Warm runs disabled: 'run' starts a fresh interpreter again (use 'run --warm' for a single warm run)."
+    if action == "start":
+        get_warm_pool().fill()
+        return f"Warm pool started ({get_warm_pool().size} idle workers)."
+    if action == "stop":
+        if _pool is not None:
+            _pool.shutdown()
+        return "Warm pool stopped."
+    if action != "status":
+        return "warmpool: usage: warmpool [status|on|off|start|stop]"
+
+    stats = get_warm_pool().stats() if _pool is not None else WarmPool().stats()
+    return "\n".join([
+        "Warm interpreter pool:",
+        f"  Default for run    : {'on' if WARM_RUN_DEFAULT else 'off'}",
+        f"  Idle / busy        : {stats['idle']} / {stats['busy']} (keeps {stats['size']} idle)",
+        f"  Warm runs          : {stats['warm_runs']} of {stats['runs']}",
+        f"  Workers started    : {stats['workers_started']}",
+        f"  Workers recycled   : {stats['workers_recycled']} (after {WARM_POOL_MAX_RUNS} runs or "
+        f"{WARM_POOL_MAX_RSS_GROWTH_KB // 1024} MB RSS growth)",
+    ])
+
+
+def warmpool_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return warmpool_command_string(args), current_path, False
@@ -0,0 +1,461 @@
+"""
+The Morel OS command engine, shared by every front end: the interactive shell and
+batch mode (morel_os.py, morel_batch.py) and the graphical launcher (gui_launcher.py).
+
+    from morel_engine import execute_morel_command, output_to_string
+    output, new_path, should_exit = execute_morel_command("ls -l", "/tmp")
+    print(output_to_string(output))
+
+The engine never prints and never imports Rich; front ends decide how output is shown.
+Output contains Rich markup unless PLAIN_OUTPUT is set (the GUI and batch mode set it).
+'cd' also changes the process's working directory, as a shell does, unless
+CHANGE_DIRECTORY is set to False (the GUI keeps one current path per terminal instead).
+Commands that only make sense in one front end (e.g. 'snake', 'startgui') are
+registered into COMMAND_REGISTRY by that front end.
+"""
+import os
+import sys
+import shlex # For robust command line parsing
+import time
+from importlib.util import find_spec
+
+from morel_commands import CHANGE_DIRECTORY, PLAIN_OUTPUT, CommandRegistry, LazyCommand
+from morel_commands.latency import COMMAND_LATENCY, stats_handler
+
+# Whether ls may emit Rich markup for the terminal (find_spec does not import rich)
+RICH_AVAILABLE = find_spec("rich") is not None
+
+MOREL_OS_VERSION = "0.1.0" # This should be updated if it's meant to reflect the Morel OS version
+
+ASCII_LOGO = """
+     /$$      /$$                               /$$          /$$$$$$   /$$$$$$ 
+    | $$$    /$$$                              | $$         /$$__  $$ /$$__  $$
+    | $$$$  /$$$$  /$$$$$$   /$$$$$$   /$$$$$$ | $$        | $$  \ $$| $$  \__/
+    | $$ $$/$$ $$ /$$__  $$ /$$__  $$ /$$__  $$| $$ /$$$$$$| $$  | $$|  $$$$$$ 
+    | $$  $$$| $$| $$  \ $$| $$  \__/| $$$$$$$$| $$|______/| $$  | $$ \____  $$
+    | $$\  $ | $$| $$  | $$| $$      | $$_____/| $$        | $$  | $$ /$$  \ $$
+    | $$ \/  | $$|  $$$$$$/| $$      |  $$$$$$$| $$        |  $$$$$$/|  $$$$$$/
+    |__/     |__/ \______/ |__/       \_______/|__/         \______/  \______/ 
+"""
+
+_RICH_TAG = None # Compiled on first use
+
+def strip_rich_markup(text: str) -> str:
+    """
+    Removes Rich-style markup tags such as [bold], [/cyan] or [bold red]. Style names are
+    lower-case words, so job ids ([1]) and notes ([Script exited with code 1]) are kept.
+    """
+    global _RICH_TAG
+    if _RICH_TAG is None:
+        import re
+        _RICH_TAG = re.compile(r"\[/?[a-z]+(?: [a-z]+)*\]")
+    return _RICH_TAG.sub("", text)
+
+INFO2_TEXT_CONTENT = (
+    "This is Morel-OS, a free open source OS made with Jules AI, Python, and Henry Morel.\n"
+    "This OS has a lot of cool features and commands. Down here I will show you some commands:\n\n"
+    "[bold]Commands:[/bold]\n"
+    "  [cyan]ls[/cyan]                     - to list files and directories\n"
+    "  [cyan]ls <some_directory>[/cyan]  - to list contents of a specific directory\n"
+    "  [cyan]ls -l [path][/cyan]           - long listing with size and modification time\n"
+    "  [cyan]ls -U [path][/cyan]           - large-directory mode: stream entries as they are read\n"
+    "  [cyan]cd <some_directory>[/cyan]  - to change the current directory\n"
+    "  [cyan]cd ..[/cyan]                - to move to the parent directory\n"
+    "  [cyan]echo [text][/cyan]           - to print the text\n"
+    "  [cyan]pwd[/cyan]                  - to print the current working directory\n"
+    "  [cyan]run <your_script.py>[/cyan] - to execute a Python script\n"
+    "                           (e.g., a simple hello.py that prints 'Hello from script!')\n"
+    "                           output is streamed as it is produced; options before the script name:\n"
+    "                           --capture (print once finished), --warm (use a pre-warmed interpreter),\n"
+    "                           --inproc (run a trusted script inside the shell itself, fastest),\n"
+    "                           --cap SIZE (memory cap per stream,\n"
+    "                           e.g. 10M), --no-spill (drop output past the cap instead of using a temp file)\n"
+    "  [cyan]run <script.py> [args] &[/cyan] - run a script as a background job\n"
+    "  [cyan]jobs[/cyan]                 - list background jobs (status, PID, elapsed and CPU time)\n"
+    "  [cyan]fg [id][/cyan]              - show a job's output and follow it (Ctrl+C leaves it running)\n"
+    "  [cyan]wait [id...][/cyan]         - wait for background jobs to finish\n"
+    "  [cyan]kill [-SIGNAL] <id...>[/cyan] - send a signal (default TERM) to background jobs\n"
+    "  [cyan]warmpool [on|off|start|stop][/cyan] - pre-warmed interpreter pool for 'run --warm' (status by default)\n"
+    "  [cyan]info[/cyan]                 - to display information about Morel OS\n"
+    "  [cyan]info2[/cyan]                - to display this extended information and command list (alias: help, help2)\n"
+    "  [cyan]femboy[/cyan]               - to display a special ASCII art\n"
+    "  [cyan]snake[/cyan]                 - play Snake (WASD/arrows, high scores, requires curses)\n"
+    "  [cyan]startgui[/cyan]              - launch graphical launcher (info, basic terminal with 'echo'/'clear')\n"
+    "  [cyan]open <file_or_app> [args][/cyan] - open a file or run an executable (platform dependent)\n"
+    "  [cyan]date[/cyan]                  - to display the current date and time\n"
+    "  [cyan]copyfile [-r] [-j N] <src> <dest>[/cyan] - copy a file, or a directory tree with -r (N copy threads)\n"
+    "  [cyan]find [path] [-name GLOB] [-type f|d|l] [-size +N[kMG]] [-mtime -DAYS] [-limit N][/cyan]\n"
+    "                           - search a directory tree by name, type, size or age (also -iname, -maxdepth N)\n"
+    "  [cyan]grep [-i] [-n] [-l] [-F] [-m N] <pattern> [path...][/cyan] - search file contents (directories recursively)\n"
+    "                           or piped output with a regular expression\n"
+    "  [cyan]du [-d DEPTH] [-b] [--apparent-size] [--rescan] [path][/cyan] - disk usage of a directory tree\n"
+    "                           (indexed: only directories that changed since the last 'du' are read again)\n"
+    "  [cyan]locate [-n N] [-d|-f] <pattern>[/cyan] - instant search of indexed paths; results are numbered,\n"
+    "                           use them as @N in cd, open and run (e.g. 'locate notes.txt', then 'open @1')\n"
+    "  [cyan]locate --add-root <dir>[/cyan]  - index a directory tree (also --remove-root, --roots, --status, --update)\n"
+    "  [cyan]time <command line>[/cyan]     - run a command (or pipeline) and show its wall, user and sys time\n"
+    "  [cyan]stats [--json] [--reset] [cmd][/cyan] - latency (count, p50, p95, p99) of every command this session\n"
+    "  [cyan]profile [-n N] [--sample] <command line>[/cyan] - profile a command; writes .pstats and flamegraph stacks\n"
+    "  [cyan]history [-n N] [text] | --top[/cyan] - recent commands, search all history, or the most used\n"
+    "  [cyan]pager [on|off][/cyan]         - pause long output after every screen (Space, Enter, b, /text, q)\n"
+    "  [cyan]dircache [clear][/cyan]       - show (or clear) the directory cache used by ls, cd and completion\n"
+    "  [cyan]head / tail [-n N] [file][/cyan] - first / last N lines (default 10) of a file or of piped output\n"
+    "  [cyan]wc [-l] [file][/cyan]          - count lines, words and characters\n"
+    "  [cyan]cat [file...][/cyan]           - print files (or piped output)\n"
+    "  [cyan]cmd1 | cmd2[/cyan]             - pipe output into another command (e.g. ls bigdir | head 20)\n"
+    "  [cyan]cmd > file, cmd >> file, cmd < file[/cyan] - write, append or read a file instead of the terminal\n"
+    "  [cyan]help[/cyan]                  - to display this detailed help message (alias for info2)\n"
+    "  [cyan]help2[/cyan]                 - to display this detailed help message (alias for info2)\n"
+    # 'restart' command was removed, so its help text should be removed.
+    "  [cyan]shutdown[/cyan]              - to shut down and exit Morel OS\n"
+    # 'exit' and 'quit' commands were removed, so their help text should be removed.
+    "  [cyan]copytext <text...>[/cyan]     - copies text to clipboard (requires 'pip install pyperclip')\n"
+    "  [cyan]pastetext[/cyan]              - pastes text from clipboard (requires 'pip install pyperclip')"
+)
+
+FEMBOY_ASCII_ART = """
+                                                             bbbbbbbb
+    ffffffffffffffff                                         b::::::b
+   f::::::::::::::::f                                        b::::::b
+  f::::::::::::::::::f                                       b::::::b
+  f::::::fffffff:::::f                                        b:::::b
+  f:::::f       ffffffeeeeeeeeeeee       mmmmmmm    mmmmmmm   b:::::bbbbbbbbb       ooooooooooo yyyyyyy           yyyyyyy
+  f:::::f           ee::::::::::::ee   mm:::::::m  m:::::::mm b::::::::::::::bb   oo:::::::::::ooy:::::y         y:::::y 
+ f:::::::ffffff    e::::::eeeee:::::eem::::::::::mm::::::::::mb::::::::::::::::b o:::::::::::::::oy:::::y       y:::::y  
+ f::::::::::::f   e::::::e     e:::::em::::::::::::::::::::::mb:::::bbbbb:::::::bo:::::ooooo:::::o y:::::y     y:::::y   
+ f::::::::::::f   e:::::::eeeee::::::em:::::mmm::::::mmm:::::mb:::::b    b::::::bo::::o     o::::o  y:::::y   y:::::y    
+ f:::::::ffffff   e:::::::::::::::::e m::::m   m::::m   m::::mb:::::b     b:::::bo::::o     o::::o   y:::::y y:::::y     
+  f:::::f         e::::::eeeeeeeeeee  m::::m   m::::m   m::::mb:::::b     b:::::bo::::o     o::::o    y:::::y:::::y      
+  f:::::f         e:::::::e           m::::m   m::::m   m::::mb:::::b     b:::::bo::::o     o::::o     y:::::::::y       
+ f:::::::f        e::::::::e          m::::m   m::::m   m::::mb:::::bbbbbb::::::bo:::::ooooo:::::o      y:::::::y        
+ f:::::::f         e::::::::eeeeeeee  m::::m   m::::m   m::::mb::::::::::::::::b o:::::::::::::::o       y:::::y         
+ f:::::::f          ee:::::::::::::e  m::::m   m::::m   m::::mb:::::::::::::::b   oo:::::::::::oo       y:::::y          
+ fffffffff            eeeeeeeeeeeeee  mmmmmm   mmmmmm   mmmmmmbbbbbbbbbbbbbbbb      ooooooooooo        y:::::y           
+                                                                                                      y:::::y            
+                                                                                                     y:::::y             
+                                                                                                    y:::::y              
+                                                                                                   y:::::y               
+                                                                                                  yyyyyyy                
+"""
+
+# --- String-returning command functions ---
+
+def get_current_datetime_string() -> str:
+    """Returns the current date and time as a formatted string."""
+    return time.strftime("%Y-%m-%d %H:%M:%S")
+
+def femboy_command_string() -> str:
+    """Returns the FEMBOY_ASCII_ART string."""
+    return FEMBOY_ASCII_ART
+
+def info2_command_string() -> str:
+    """
+    Prepares the string for the 'info2' command.
+    Returns INFO2_TEXT_CONTENT with its Rich markup tags; the console renders them
+    (or, without Rich, prints them as-is). Where output must be plain text (a pipeline
+    stage writing to a command or file, or batch mode), the tags are stripped.
+    """
+    if PLAIN_OUTPUT.get():
+        return strip_rich_markup(INFO2_TEXT_CONTENT)
+    return INFO2_TEXT_CONTENT
+
+
+_SYSTEM_INFO = None # Computed by the first 'info'
+
+def system_info() -> dict:
+    """Python version, platform and CPU; looked up once, since none of them change while running."""
+    global _SYSTEM_INFO
+    if _SYSTEM_INFO is None:
+        import platform # Deferred: importing platform costs more than the rest of startup combined
+        _SYSTEM_INFO = {
+            "python_version": sys.version.split()[0],
+            # platform.platform() can be quite verbose, let's use system and release
+            "platform": f"{platform.system()} {platform.release()}",
+            # Can be empty on some systems/Python builds, and on Linux it may run 'uname -p'
+            "cpu": platform.processor(),
+        }
+    return _SYSTEM_INFO
+
+def info_command_string(os_name: str = "Morel OS") -> str:
+    """Prepares the informational string for the 'info' command."""
+    info = system_info()
+    lines = [
+        ASCII_LOGO.strip(), # Remove leading/trailing newlines from the art
+        "\nSystem Information:",
+        f"  OS Name         : {os_name}",
+        f"  OS Version      : {MOREL_OS_VERSION}",
+        f"  Python Version  : {info['python_version']}",
+        f"  Platform        : {info['platform']}",
+    ]
+    if info["cpu"]: # Only add CPU if available
+        lines.append(f"  CPU             : {info['cpu']}")
+    lines.append("\nFor a list of commands, type: info2")
+    
+    return "\n".join(lines)
+
+def pwd_command_string(current_path: str) -> str:
+    """Prepares the string for the 'pwd' command."""
+    return current_path
+
+def cd_command_processor(current_path: str, target_path_arg: str = None) -> tuple[str, str]:
+    """
+    Processes the 'cd' command, resolves paths, and validates.
+    Does NOT change the directory itself.
+    Returns: (new_potential_path, error_message_string)
+             If successful, error_message_string is empty.
+    """
+    if target_path_arg is None or target_path_arg == "" or target_path_arg == "~":
+        # If no argument or "~", target home directory
+        resolved_new_path = os.path.expanduser("~")
+        # For display in error messages, show what user typed or implies
+        target_path_display = target_path_arg if target_path_arg is not None else "~" 
+    elif os.path.isabs(target_path_arg):
+        resolved_new_path = os.path.abspath(target_path_arg) # Normalize like .. in abs paths
+        target_path_display = target_path_arg
+    else:
+        # Relative path
+        resolved_new_path = os.path.abspath(os.path.join(current_path, target_path_arg))
+        target_path_display = target_path_arg
+
+    from morel_commands.dircache import DIRECTORY_CACHE
+    try:
+        # Reading the listing through the shared cache validates existence, type and
+        # readability in one go, and leaves it cached for the 'ls' that usually follows.
+        DIRECTORY_CACHE.get_listing(resolved_new_path)
+
+        return resolved_new_path, "" # Success: new path, no error message
+    except FileNotFoundError:
+        return current_path, f"cd: no such file or directory: {target_path_display}"
+    except NotADirectoryError:
+        return current_path, f"cd: not a directory: {target_path_display}"
+    except PermissionError:
+        return current_path, f"cd: permission denied: {target_path_display}"
+    except Exception as e: # Catch other potential errors during path validation
+        return current_path, f"cd: an error occurred with path '{target_path_display}': {e}"
+
+
+def ls_command_string(current_os_path: str, path_arg: str = None, long_format: bool = False) -> str:
+    """
+    Prepares the string for the 'ls' command.
+    Lists files and directories in the specified path.
+    current_os_path is the CWD of Morel OS.
+    path_arg is the argument given to ls (can be None, relative, or absolute).
+    The interactive shell streams the listing instead (see ls_handler).
+    """
+    from morel_commands.listing import ls_command_stream
+    result = ls_command_stream(current_os_path, path_arg, long_format=long_format,
+                               rich_markup=RICH_AVAILABLE and not PLAIN_OUTPUT.get())
+    return result if isinstance(result, str) else "\n".join(result)
+
+def output_to_string(output) -> str:
+    """Joins a streamed command output (an iterator of chunks) into one string; strings pass through."""
+    return output if isinstance(output, str) else "\n".join(output)
+
+
+# --- Command handlers ---
+# Each handler takes (args, current_path) and returns (output_string, new_current_path, should_exit),
+# which is exactly what execute_morel_command hands back to its caller.
+
+def shutdown_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    # The 'exit' and 'quit' commands are removed.
+    # 'shutdown' is the primary way to exit.
+    return "Morel OS is shutting down...", current_path, True
+
+def date_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return get_current_datetime_string(), current_path, False
+
+def info_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return info_command_string(), current_path, False
+
+def info2_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return info2_command_string(), current_path, False
+
+def femboy_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return femboy_command_string(), current_path, False
+
+def pwd_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return pwd_command_string(current_path), current_path, False
+
+def ls_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    # ls [-l] [-U] [path]: -l adds size and modification time, -U is the large-directory mode
+    # (stream entries as they are read, each chunk sorted on its own, instead of sorting everything first).
+    from morel_commands.listing import ls_command_stream
+    long_format = unsorted = False
+    path_arg = None
+    for arg in args:
+        if arg.startswith("-") and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag == "l":
+                    long_format = True
+                elif flag == "U":
+                    unsorted = True
+                else:
+                    return f"ls: invalid option -- '{flag}'. Usage: ls [-l] [-U] [path]", current_path, False
+        elif path_arg is None:
+            path_arg = arg
+    output = ls_command_stream(current_path, path_arg, long_format=long_format, unsorted=unsorted,
+                               rich_markup=RICH_AVAILABLE and not PLAIN_OUTPUT.get())
+    return output, current_path, False
+
+def cd_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    target_arg = args[0] if args else None
+    proposed_path, message = cd_command_processor(current_path, target_arg)
+    if message:
+        return message, current_path, False
+    if CHANGE_DIRECTORY.get():
+        try:
+            os.chdir(proposed_path)
+        except Exception as e:
+            return f"cd: error changing directory to '{proposed_path}': {e}", current_path, False
+    return "", proposed_path, False
+
+def echo_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    return " ".join(args), current_path, False
+
+def _cpu_times() -> tuple[float, float]:
+    """(user, sys) seconds of this process plus its waited-for children (the scripts 'run' started)."""
+    try:
+        import resource # POSIX: microsecond resolution, where os.times() counts clock ticks
+    except ImportError:
+        times = os.times()
+        return times.user + times.children_user, times.system + times.children_system
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return own.ru_utime + children.ru_utime, own.ru_stime + children.ru_stime
+
+def _timed_output(output, cpu_before: tuple[float, float], started_ns: int):
+    """Passes a command's output through, then adds its wall, user and sys time."""
+    if isinstance(output, str):
+        if output:
+            yield output
+    else:
+        yield from output
+    wall_ms = (time.perf_counter_ns() - started_ns) / 1e6
+    user_after, sys_after = _cpu_times()
+    user_ms, sys_ms = (user_after - cpu_before[0]) * 1000, (sys_after - cpu_before[1]) * 1000
+    yield f"time: real {wall_ms:.3f} ms, user {user_ms:.3f} ms, sys {sys_ms:.3f} ms"
+
+def time_command(command_line: str, current_path: str) -> tuple[str, str, bool]:
+    """Runs a whole command line (pipelines included) and reports how long it took."""
+    if not command_line.strip():
+        return "Usage: time <command line>", current_path, False
+    cpu_before = _cpu_times()
+    started_ns = time.perf_counter_ns()
+    output, new_path, should_exit = execute_morel_command(command_line, current_path)
+    return _timed_output(output, cpu_before, started_ns), new_path, should_exit
+
+def time_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    # Reached for 'time' inside a pipeline stage; a line starting with 'time' is handled by _dispatch_command
+    return time_command(shlex.join(args), current_path)
+
+def profile_command(command_line: str, current_path: str) -> tuple[str, str, bool]:
+    """Runs a whole command line under cProfile or the sampling profiler (morel_commands/profiler.py)."""
+    from morel_commands.profiler import profile_command as run_profiled
+    return run_profiled(command_line, current_path, execute_morel_command)
+
+def profile_handler(args: list[str], current_path: str) -> tuple[str, str, bool]:
+    # Reached for 'profile' inside a pipeline stage, like time_handler
+    return profile_command(shlex.join(args), current_path)
+
+
+# --- Command registry ---
+# Commands whose code lives in morel_commands/ are registered lazily: their module
+# (and its imports, e.g. subprocess, shutil or pyperclip) is only loaded on first use.
+COMMAND_REGISTRY = CommandRegistry()
+COMMAND_REGISTRY.register("shutdown", shutdown_handler)
+COMMAND_REGISTRY.register("date", date_handler)
+COMMAND_REGISTRY.register("info", info_handler)
+COMMAND_REGISTRY.register("info2", info2_handler, aliases=("help", "help2"))
+COMMAND_REGISTRY.register("femboy", femboy_handler)
+COMMAND_REGISTRY.register("pwd", pwd_handler)
+COMMAND_REGISTRY.register("ls", ls_handler)
+COMMAND_REGISTRY.register("cd", cd_handler)
+COMMAND_REGISTRY.register("echo", echo_handler)
+COMMAND_REGISTRY.register("run", LazyCommand("morel_commands.run", "run_handler"))
+COMMAND_REGISTRY.register("jobs", LazyCommand("morel_commands.jobs", "jobs_handler"))
+COMMAND_REGISTRY.register("fg", LazyCommand("morel_commands.jobs", "fg_handler"))
+COMMAND_REGISTRY.register("wait", LazyCommand("morel_commands.jobs", "wait_handler"))
+COMMAND_REGISTRY.register("kill", LazyCommand("morel_commands.jobs", "kill_handler"))
+COMMAND_REGISTRY.register("warmpool", LazyCommand("morel_commands.warmpool", "warmpool_handler"))
+COMMAND_REGISTRY.register("copytext", LazyCommand("morel_commands.clipboard", "copytext_handler"))
+COMMAND_REGISTRY.register("copyfile", LazyCommand("morel_commands.copyfile", "copyfile_handler"))
+COMMAND_REGISTRY.register("pastetext", LazyCommand("morel_commands.clipboard", "pastetext_handler"))
+COMMAND_REGISTRY.register("open", LazyCommand("morel_commands.launch", "open_handler"))
+COMMAND_REGISTRY.register("find", LazyCommand("morel_commands.search", "find_handler"))
+COMMAND_REGISTRY.register("grep", LazyCommand("morel_commands.search", "grep_handler"), reads_input=True)
+COMMAND_REGISTRY.register("du", LazyCommand("morel_commands.diskusage", "du_handler"))
+COMMAND_REGISTRY.register("locate", LazyCommand("morel_commands.locate", "locate_handler"))
+COMMAND_REGISTRY.register("dircache", LazyCommand("morel_commands.dircache", "dircache_handler"))
+# Line filters for pipelines ('ls | head 20'); they read the previous command's output
+COMMAND_REGISTRY.register("head", LazyCommand("morel_commands.filters", "head_handler"), reads_input=True)
+COMMAND_REGISTRY.register("tail", LazyCommand("morel_commands.filters", "tail_handler"), reads_input=True)
+COMMAND_REGISTRY.register("wc", LazyCommand("morel_commands.filters", "wc_handler"), reads_input=True)
+COMMAND_REGISTRY.register("cat", LazyCommand("morel_commands.filters", "cat_handler"), reads_input=True)
+COMMAND_REGISTRY.register("time", time_handler)
+COMMAND_REGISTRY.register("stats", stats_handler)
+COMMAND_REGISTRY.register("profile", profile_handler)
+COMMAND_REGISTRY.register("history", LazyCommand("morel_commands.history", "history_handler"))
+COMMAND_REGISTRY.register("pager", LazyCommand("morel_commands.pager", "pager_handler"))
+
+# Commands whose arguments may refer to results of the last 'locate' as @N
+LOCATE_REFERENCE_COMMANDS = ("cd", "open", "run")
+
+
+# --- Central Command Processor ---
+def execute_morel_command(command_line_string: str, current_path: str) -> tuple[str, str, bool]:
+    """
+    Processes a command line string and returns output, new path, and exit status.
+    The output is usually a string; commands that stream (e.g. 'ls') return an iterator
+    of output chunks instead. Use output_to_string() when a single string is needed.
+    Lines with '|', '<' or '>' are handed to the pipeline runner (morel_commands/pipeline.py).
+    Every command is timed into COMMAND_LATENCY (see 'stats', morel_commands/latency.py).
+    """
+    started_ns = time.perf_counter_ns()
+    command, (output, new_path, should_exit) = _dispatch_command(command_line_string, current_path)
+    if command is not None:
+        output = COMMAND_LATENCY.record(command, started_ns, output)
+    return output, new_path, should_exit
+
+
+def _dispatch_command(command_line_string: str, current_path: str):
+    """Runs one command line. Returns (name to record its latency under or None, result tuple)."""
+    stripped_line = command_line_string.strip()
+    if stripped_line[:5].lower() == "time " or stripped_line.lower() == "time":
+        # A shell keyword rather than a command: 'time ls | head' times the whole pipeline
+        return "time", time_command(stripped_line[5:], current_path)
+    if stripped_line[:8].lower() == "profile " or stripped_line.lower() == "profile":
+        return "profile", profile_command(stripped_line[8:], current_path)
+
+    # Loaded with the first command line, not at startup
+    from morel_commands.pipeline import PipelineError, has_pipeline_syntax, parse_pipeline, run_pipeline
+    if has_pipeline_syntax(stripped_line):
+        try:
+            stages = parse_pipeline(stripped_line)
+        except PipelineError as e:
+            return None, (f"Error parsing command: {e}", current_path, False)
+        if len(stages) > 1 or stages[0].input_path is not None or stages[0].output_path is not None:
+            return "pipeline", run_pipeline(stages, current_path, COMMAND_REGISTRY)
+        # Only quoted operator characters: an ordinary command
+
+    try:
+        parts = shlex.split(stripped_line)
+    except ValueError as e: # Handle shlex parsing errors (e.g., unmatched quotes)
+        return None, (f"Error parsing command: {e}", current_path, False)
+
+    if not parts:
+        return None, ("", current_path, False)
+
+    command = parts[0].lower()
+    handler = COMMAND_REGISTRY.get(command)
+    if handler is None:
+        return None, (f"Unknown command: {command}", current_path, False)
+
+    args = parts[1:]
+    if command in LOCATE_REFERENCE_COMMANDS and "morel_commands.locate" in sys.modules:
+        # '@N' stands for result N of the last 'locate' (only possible once locate has been used)
+        from morel_commands.locate import expand_references
+        args, error_message = expand_references(command, args)
+        if error_message:
+            return None, (error_message, current_path, False)
+
+    return COMMAND_REGISTRY.primary_name(command), handler(args, current_path)
@@ -0,0 +1,97 @@
+"""
+Startup-time profiling for morel_os.py.
+
+  python morel_os.py --profile-startup          - per-import cost of a cold start
+  python morel_os.py --check-startup [BUDGET_MS] - exit status 1 if a cold start is over budget
+
+Both import morel_os in a fresh interpreter started with '-X importtime', so the
+numbers are not skewed by anything the current process has already imported.
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+STARTUP_BUDGET_MS = 50.0 # Cold import of morel_os (interpreter startup itself is not counted)
+BUDGET_RUNS = 5 # The budget check uses the median of this many cold imports
+
+MOREL_OS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def measure_imports(module_name: str = "morel_os") -> list[tuple[int, int, int, str]]:
+    """
+    Imports module_name in a fresh interpreter with '-X importtime'.
+    Returns one (self_us, cumulative_us, depth, imported_module) tuple per imported module,
+    in the order Python reports them.
+    """
+    completed_process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+        capture_output=True, text=True, check=False, cwd=MOREL_OS_DIR
+    )
+    if completed_process.returncode != 0:
+        raise RuntimeError(f"importing {module_name} failed:\n{completed_process.stderr.strip()}")
+
+    rows = []
+    for line in completed_process.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit(): # Skips the header line
+            continue
+        name_field = fields[2].rstrip()
+        name = name_field.lstrip()
+        depth = (len(name_field) - len(name) - 1) // 2 # importtime indents nested imports by two spaces
+        rows.append((int(fields[0]), int(fields[1]), depth, name))
+    return rows
+
+
+def cold_import_ms(module_name: str = "morel_os") -> float:
+    """Cumulative import time of module_name in a fresh interpreter, in milliseconds."""
+    for self_us, cumulative_us, depth, name in measure_imports(module_name):
+        if name == module_name:
+            return cumulative_us / 1000
+    raise RuntimeError(f"{module_name} did not appear in the import-time report")
+
+
+def profile_startup_report(top_n: int = 15, module_name: str = "morel_os") -> str:
+    """Formats the modules that cost the most to import when module_name starts cold."""
+    rows = measure_imports(module_name)
+    total_ms = next((cumulative_us / 1000 for _, cumulative_us, _, name in rows if name == module_name), 0.0)
+
+    lines = [
+        f"Cold import of {module_name}: {total_ms:.1f} ms "
+        f"({len(rows)} modules, budget {STARTUP_BUDGET_MS:.0f} ms)",
+        "",
+        f"  {'self (ms)':>10}  {'cumulative (ms)':>16}  module",
+    ]
+    for self_us, cumulative_us, depth, name in sorted(rows, key=lambda row: row[0], reverse=True)[:top_n]:
+        lines.append(f"  {self_us / 1000:>10.2f}  {cumulative_us / 1000:>16.2f}  {name}")
+
+    # importtime lists a module's imports (depth + 1) right before the module itself.
+    module_index = next((index for index, row in enumerate(rows) if row[3] == module_name), None)
+    direct_imports = []
+    if module_index is not None:
+        module_depth = rows[module_index][2]
+        for _, _, depth, name in reversed(rows[:module_index]):
+            if depth <= module_depth:
+                break
+            if depth == module_depth + 1:
+                direct_imports.append(name)
+    if direct_imports:
+        lines.append("")
+        lines.append(f"Imported directly by {module_name}: " + ", ".join(reversed(direct_imports)))
+    return "\n".join(lines)
+
+
+def check_startup_budget(budget_ms: float = STARTUP_BUDGET_MS, runs: int = BUDGET_RUNS) -> tuple[bool, str]:
+    """
+    Measures the median cold import time of morel_os over 'runs' fresh interpreters.
+    Returns (within_budget, message).
+    """
+    timings = [cold_import_ms() for _ in range(runs)]
+    median_ms = statistics.median(timings)
+    within_budget = median_ms <= budget_ms
+    verdict = "OK" if within_budget else "OVER BUDGET"
+    message = (f"Startup check {verdict}: cold import of morel_os took {median_ms:.1f} ms "
+               f"(median of {runs}, budget {budget_ms:.0f} ms)")
+    return within_budget, message
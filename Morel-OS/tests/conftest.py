@@ -0,0 +1,14 @@
+"""
+Shared setup for the Morel OS tests. Run them from the Morel-OS directory:
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+MOREL_OS_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, MOREL_OS_DIR) # The modules are imported the way morel_os.py imports them
+
+# Indexes, history and caches go to a throwaway directory, never the user's own (see config.py)
+os.environ["MOREL_CONFIG_DIR"] = tempfile.mkdtemp(prefix="morel-tests-")
@@ -0,0 +1,49 @@
+"""Batch mode (morel_batch.py): -c, scripts, --json and the run_commands() API."""
+import json
+import subprocess
+import sys
+
+from conftest import MOREL_OS_DIR
+from morel_batch import run_commands, script_lines
+
+
+def morel_os(*args: str, stdin: str = None, returncode: int = 0) -> str:
+    completed_process = subprocess.run([sys.executable, "morel_os.py", *args], input=stdin, capture_output=True,
+                                       text=True, cwd=MOREL_OS_DIR, timeout=120)
+    assert completed_process.returncode == returncode, completed_process.stderr
+    return completed_process.stdout
+
+
+def test_cd_carries_over_and_shutdown_ends_the_batch(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "inside.txt").write_text("")
+    output = morel_os("-c", f"cd {tmp_path}/sub", "-c", "ls", "-c", "shutdown", "-c", "pwd")
+    assert output.splitlines() == ["F: inside.txt", "Morel OS is shutting down..."]
+
+
+def test_script_from_stdin_with_json(tmp_path):
+    records = [json.loads(line) for line in morel_os("--json", "-", stdin=f"# comment\n\ncd {tmp_path}\npwd\n").splitlines()]
+    assert [record["command"] for record in records] == [f"cd {tmp_path}", "pwd"]
+    assert records[1]["path"] == str(tmp_path) and "duration_ms" in records[1]
+
+
+def test_run_commands_api(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path) # 'cd' also changes the process's working directory
+    results = list(run_commands(script_lines(["cd ..", "  # skipped", "pwd"]), current_path=str(tmp_path)))
+    assert [result.command for result in results] == ["cd ..", "pwd"]
+    assert results[-1].path == str(tmp_path.parent)
+
+
+def test_pipeline_output_stays_plain(tmp_path):
+    (tmp_path / "sub").mkdir()
+    output = morel_os("-c", "echo 1 | info2", "-c", f"echo x | ls {tmp_path}")
+    assert "Commands:" in output and "D: sub" in output
+    assert "[cyan]" not in output and "[bold]" not in output and "[/" not in output
+
+
+def test_exit_status_reports_commands_that_could_not_run(tmp_path):
+    assert morel_os("-c", "nosuchcommand", "-c", "pwd", returncode=1).splitlines() == [
+        "Unknown command: nosuchcommand", MOREL_OS_DIR]
+    records = [json.loads(line) for line in morel_os("--json", "-c", "echo 'unterminated", returncode=1).splitlines()]
+    assert records[0]["error"] is True
+    morel_os("-c", f"cd {tmp_path}/missing") # Reported in the output only
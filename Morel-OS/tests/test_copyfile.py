@@ -0,0 +1,58 @@
+"""copyfile (morel_commands/copyfile.py): every copy method, and directory trees."""
+import os
+
+import pytest
+
+from morel_commands import copyfile
+from morel_commands.copyfile import CopySession, copy_file_data
+from morel_engine import execute_morel_command, output_to_string
+
+METHODS = ["reflink", "copy_file_range", "sendfile", "read/write"]
+
+
+def run(command_line: str, path: str) -> str:
+    output, _, _ = execute_morel_command(command_line, path)
+    return output_to_string(output)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_each_method_copies_the_data(tmp_path, monkeypatch, method):
+    monkeypatch.setattr(copyfile, "COPY_CHUNK_BYTES", 64 * 1024) # Several calls per file
+    data = os.urandom(300 * 1024 + 7)
+    (tmp_path / "source").write_bytes(data)
+    session = CopySession()
+    for other in METHODS[:METHODS.index(method)]: # Force this method (or, where it is missing, a later one)
+        session.mark_unsupported(other)
+    source_fd = os.open(tmp_path / "source", os.O_RDONLY)
+    destination_fd = os.open(tmp_path / "copy", os.O_WRONLY | os.O_CREAT)
+    try:
+        used = copy_file_data(source_fd, destination_fd, len(data), session)
+    finally:
+        os.close(source_fd)
+        os.close(destination_fd)
+    assert METHODS.index(used) >= METHODS.index(method)
+    assert (tmp_path / "copy").read_bytes() == data
+    assert session.bytes_copied == len(data)
+
+
+def test_tree_copy_keeps_structure_and_symlinks(tmp_path):
+    source = tmp_path / "src"
+    (source / "a" / "b").mkdir(parents=True)
+    for number in range(50):
+        (source / "a" / f"file{number}.txt").write_text(f"contents {number}\n")
+    (source / "a" / "b" / "empty").write_bytes(b"")
+    os.symlink("a/file1.txt", source / "link")
+    (tmp_path / "dest").mkdir()
+    output = run("copyfile -r -j 4 src dest", str(tmp_path))
+    assert "error" not in output.lower()
+    copied = tmp_path / "dest" / "src" # An existing directory means "copy into it"
+    assert sorted(os.listdir(copied / "a")) == sorted(os.listdir(source / "a"))
+    assert (copied / "a" / "file42.txt").read_text() == "contents 42\n"
+    assert (copied / "a" / "b" / "empty").read_bytes() == b""
+    assert os.readlink(copied / "link") == "a/file1.txt"
+
+
+def test_refuses_to_copy_a_tree_into_itself(tmp_path):
+    (tmp_path / "src").mkdir()
+    assert run("copyfile -r src src/inner", str(tmp_path)) == "copyfile: cannot copy directory 'src' into itself."
+    assert run("copyfile src elsewhere", str(tmp_path)).startswith("copyfile: source 'src' is a directory")
@@ -0,0 +1,73 @@
+"""du (morel_commands/diskusage.py): reusing, invalidating and persisting the directory-size index."""
+import os
+import shutil
+
+import pytest
+
+from morel_commands.diskusage import DiskUsageIndex, du_command_string
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "tree"
+    (root / "a" / "b").mkdir(parents=True)
+    (root / "c").mkdir()
+    (root / "a" / "one.bin").write_bytes(b"x" * 100)
+    (root / "a" / "b" / "two.bin").write_bytes(b"x" * 20)
+    for directory in (root, root / "a", root / "a" / "b", root / "c"): # So a change always gives a new mtime
+        os.utime(directory, ns=(10 ** 18, 10 ** 18))
+    return str(root)
+
+
+def refresh(index: DiskUsageIndex, root: str, rescan: bool = False):
+    result = index.refresh(root, rescan)
+    totals = index.totals(result, apparent=True)
+    index.save()
+    return result, totals
+
+
+def test_unchanged_directories_are_not_read_again(tree, tmp_path):
+    index = DiskUsageIndex(str(tmp_path / "du.db"))
+    result, totals = refresh(index, tree)
+    assert (result.checked, result.rescanned) == (4, 4)
+    assert totals[tree] == (120, 2) and totals[os.path.join(tree, "a", "b")] == (20, 1)
+    result, totals = refresh(index, tree)
+    assert (result.checked, result.rescanned) == (4, 0) and totals[tree] == (120, 2)
+    # A new session loads the saved rows instead of walking the tree again
+    result, totals = refresh(DiskUsageIndex(str(tmp_path / "du.db")), tree)
+    assert result.rescanned == 0 and totals[tree] == (120, 2)
+
+
+def test_changed_directories_are_read_and_saved_alone(tree, tmp_path):
+    index = DiskUsageIndex(str(tmp_path / "du.db"))
+    refresh(index, tree)
+    with open(os.path.join(tree, "a", "b", "three.bin"), "wb") as f:
+        f.write(b"x" * 3)
+    shutil.rmtree(os.path.join(tree, "c"))
+    connection = index._database()
+    changes_before = connection.total_changes
+    result, totals = refresh(index, tree)
+    assert result.rescanned == 2 # The root (c is gone) and a/b (three.bin is new)
+    assert totals[tree] == (123, 3) and os.path.join(tree, "c") not in totals
+    assert connection.total_changes - changes_before == 3 # Two rows rewritten, c's row deleted
+    assert len(DiskUsageIndex(str(tmp_path / "du.db"))) == 0 # Nothing is read before a tree is asked for
+    reloaded = DiskUsageIndex(str(tmp_path / "du.db"))
+    assert refresh(reloaded, tree)[0].rescanned == 0 and len(reloaded) == 3
+
+
+def test_subtree_then_parent(tree, tmp_path):
+    index = DiskUsageIndex(str(tmp_path / "du.db"))
+    refresh(index, os.path.join(tree, "a"))
+    result, totals = refresh(DiskUsageIndex(str(tmp_path / "du.db")), tree)
+    assert result.rescanned == 2 and totals[tree] == (120, 2) # Only the root and c were new
+
+
+def test_rescan_reads_everything(tree, tmp_path):
+    index = DiskUsageIndex(str(tmp_path / "du.db"))
+    du_command_string(tree, index=index)
+    with open(os.path.join(tree, "a", "one.bin"), "r+b") as f: # Grows without changing its directory's mtime
+        f.write(b"x" * 1000)
+    output = du_command_string(tree, raw_bytes=True, apparent=True, index=index).splitlines()
+    assert output[0] == "       120  ." and output[1].startswith("2 files; 4 directories checked, 0 read")
+    output = du_command_string(tree, raw_bytes=True, apparent=True, rescan=True, index=index).splitlines()
+    assert output[0] == "      1020  ." and output[1].startswith("2 files; 4 directories checked, 4 read")
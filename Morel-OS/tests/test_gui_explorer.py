@@ -0,0 +1,21 @@
+"""The GUI explorer's directory reads (gui_explorer.py); the Tk widgets themselves need a display."""
+import pytest
+
+pytest.importorskip("tkinter")
+
+from gui_explorer import read_directory
+
+
+def test_directories_come_first(tmp_path):
+    for name in ("b.txt", "a.txt"):
+        (tmp_path / name).write_text("")
+    for name in ("z_dir", "c_dir"):
+        (tmp_path / name).mkdir()
+    listing, entries = read_directory(str(tmp_path))
+    assert listing is not None
+    assert entries == [("c_dir", True), ("z_dir", True), ("a.txt", False), ("b.txt", False)]
+
+
+def test_unreadable_directory_reports_the_error(tmp_path):
+    listing, error = read_directory(str(tmp_path / "missing"))
+    assert listing is None and isinstance(error, OSError)
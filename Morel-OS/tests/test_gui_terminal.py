@@ -0,0 +1,109 @@
+"""The GUI terminal's output pane (gui_terminal.py): batched inserts and bounded scrollback, on a stub Text widget."""
+import pytest
+
+import gui_terminal
+from gui_terminal import TerminalOutput
+
+
+class StubText:
+    """The part of a Tk Text widget TerminalOutput uses. Like Tk, it always ends with an implicit newline."""
+
+    def __init__(self):
+        self.content = ""
+        self.inserts = [] # The (text, tag, ...) arguments of every insert() call
+        self.deletes = []
+        self.scheduled = [] # Callbacks given to after(), not run until run_scheduled()
+        self.state = "disabled"
+
+    def after(self, milliseconds, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def run_scheduled(self):
+        callbacks, self.scheduled = self.scheduled, []
+        for callback in callbacks:
+            callback()
+
+    def cget(self, option):
+        return self.state
+
+    def config(self, state):
+        self.state = state
+
+    def see(self, index):
+        pass
+
+    def index(self, index):
+        assert index == "end-1c"
+        return f"{self.content.count(chr(10)) + 1}.{len(self.content.rsplit(chr(10), 1)[-1])}"
+
+    def insert(self, index, *texts_and_tags):
+        assert index == "end" and self.state == "normal"
+        self.inserts.append(texts_and_tags)
+        self.content += "".join(texts_and_tags[0::2])
+
+    def delete(self, start, end):
+        self.deletes.append((start, end))
+        if end == "end":
+            self.content = ""
+        else: # "N.0": lines 1 to N-1
+            self.content = self.content.split("\n", int(end.split(".")[0]) - 1)[-1]
+
+
+def numbered(first: int, count: int) -> str:
+    return "".join(f"line {number}\n" for number in range(first, first + count))
+
+
+@pytest.fixture
+def text():
+    return StubText()
+
+
+def test_many_appends_become_one_insert(text):
+    output = TerminalOutput(text, max_lines=0)
+    for number in range(100):
+        output.append(f"line {number}\n")
+    output.append("oops\n", "error_output")
+    output.append("line 100\n")
+    assert len(text.scheduled) == 1 # One flush per frame, however many appends
+    text.run_scheduled()
+    assert text.inserts == [(numbered(0, 100), "normal_output", "oops\n", "error_output", "line 100\n", "normal_output")]
+    assert output.flushes == 1 and not output.pending and text.state == "disabled"
+
+
+def test_scrollback_is_trimmed_in_blocks(text, monkeypatch):
+    monkeypatch.setattr(gui_terminal, "GUI_TRIM_BLOCK_LINES", 10)
+    output = TerminalOutput(text, max_lines=50)
+    for first, count in [(0, 40), (40, 15)]: # 56 lines with Tk's last one: 6 over, less than a block
+        output.append(numbered(first, count))
+        text.run_scheduled()
+    assert text.deletes == []
+    output.append(numbered(55, 5)) # 11 over: trimmed back to the cap at once
+    text.run_scheduled()
+    assert text.deletes == [("1.0", "12.0")]
+    assert text.content == numbered(11, 49)
+
+
+def test_a_chunk_longer_than_the_scrollback_keeps_its_last_lines(text):
+    output = TerminalOutput(text, max_lines=50)
+    output.append("old output\n")
+    text.run_scheduled()
+    output.append("first\n")
+    output.append(numbered(0, 120))
+    text.run_scheduled()
+    # Nothing that would be trimmed at once reaches the widget: the old text is replaced by the last 50 lines
+    assert text.deletes == [("1.0", "end")]
+    assert text.inserts[-1] == (numbered(70, 50), "normal_output")
+
+
+def test_paused_output_is_buffered_until_resumed(text):
+    output = TerminalOutput(text, max_lines=50)
+    output.pause()
+    for number in range(3):
+        output.append(f"line {number}\n")
+    assert text.scheduled == [] and output.pending
+    output.flush() # A flush already scheduled before the pause does nothing
+    assert text.inserts == []
+    output.resume()
+    text.run_scheduled()
+    assert text.inserts == [(numbered(0, 3), "normal_output")]
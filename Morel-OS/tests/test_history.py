@@ -0,0 +1,71 @@
+"""Persistent history (morel_commands/history.py): the record encoding, tail reads and the search index."""
+import pytest
+
+from morel_commands.history import CommandHistory, decode_record, encode_record, history_command_string
+
+
+@pytest.mark.parametrize("command", ["ls -l", "echo a\\nb", "copytext 'two\nlines'", "back\\slash\r", "naïve ✓"])
+def test_records_round_trip(command):
+    record = encode_record(command, 1700000000.5).decode("utf-8")
+    assert record.count("\n") == 1 and record.endswith("\n")
+    assert decode_record(record[:-1]) == (1700000000, command)
+
+
+def test_decode_rejects_other_lines():
+    assert decode_record("not a record") is None
+    assert decode_record("12x\tls") is None
+
+
+def test_tail_and_search(tmp_path):
+    history = CommandHistory(str(tmp_path / "history.log"))
+    for command in ["ls", "cd /tmp", "ls -l", "cd /tmp", "grep x"]:
+        history.append(command)
+    assert [command for _, command in history.tail(2)] == ["cd /tmp", "grep x"]
+    assert [command for _, command in history.tail(100)] == ["ls", "cd /tmp", "ls -l", "cd /tmp", "grep x"]
+    index = history.index()
+    assert index.search("LS") == ["ls -l", "ls"] # Distinct commands, most recent first
+    assert index.top_commands(1) == [("cd /tmp", 2)]
+
+
+def test_other_sessions_and_partial_lines(tmp_path):
+    path = str(tmp_path / "history.log")
+    with open(path, "wb") as f:
+        f.write(encode_record("first", 1) + b"17000") # A session crashed mid-write
+    history = CommandHistory(path)
+    assert [command for _, command in history.tail(10)] == ["first"]
+    history.append("second") # Starts on a new line
+    CommandHistory(path).append("from another session")
+    assert [command for _, command in history.tail(10)] == ["first", "second", "from another session"]
+    assert "from another session" in history_command_string(["another"], history)
+
+
+class FakeReadline:
+    """The part of the readline module that load_readline() and sync_readline() use (1-based items)."""
+
+    def __init__(self):
+        self.entries = []
+
+    def add_history(self, line):
+        self.entries.append(line)
+
+    def get_current_history_length(self):
+        return len(self.entries)
+
+    def get_history_item(self, position):
+        return self.entries[position - 1]
+
+    def clear_history(self):
+        self.entries = []
+
+
+def test_sync_readline_keeps_lines_typed_while_loading(tmp_path):
+    history = CommandHistory(str(tmp_path / "history.log"))
+    for command in ["ls", "pwd", "ls", "date"]:
+        history.append(command)
+    readline = FakeReadline()
+    history.load_readline(readline)
+    history.index() # Wait for the background index
+    readline.add_history("typed only in readline") # E.g. the history file could not be written
+    readline.add_history("pwd")
+    history.sync_readline(readline)
+    assert readline.entries == ["ls", "date", "typed only in readline", "pwd"]
@@ -0,0 +1,85 @@
+"""Background jobs (morel_commands/jobs.py), and cancelling commands that wait for them from the GUI."""
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from morel_commands import jobs as jobs_module
+from morel_commands.jobs import JobTable
+from morel_engine import execute_morel_command, output_to_string
+
+QUIET_SCRIPT = "import time\ntime.sleep(30)\n"
+
+
+@pytest.fixture
+def gui_launcher():
+    pytest.importorskip("tkinter")
+    import gui_launcher
+    return gui_launcher
+
+
+@pytest.fixture
+def session(tmp_path):
+    """A script directory and a job table of its own, killed at the end of the test."""
+    (tmp_path / "quiet.py").write_text(QUIET_SCRIPT)
+    (tmp_path / "hello.py").write_text("print('hello from the job')\n")
+    jobs = JobTable()
+    yield str(tmp_path), jobs
+    jobs.terminate_all()
+
+
+def run_gui_command(gui_launcher, executor, command_line, path, jobs, cancel_after=None):
+    command = gui_launcher.GuiCommand(command_line, path, jobs).start(executor)
+    if cancel_after is not None:
+        time.sleep(cancel_after)
+        command.cancel()
+    assert command.finished.wait(5), f"{command_line!r} did not finish"
+    chunks = []
+    while not command.events.empty():
+        chunks.append(command.events.get())
+    return "\n".join(chunks)
+
+
+def test_fg_shows_output_and_removes_the_job(gui_launcher, session):
+    path, jobs = session
+    with ThreadPoolExecutor(1) as executor:
+        assert run_gui_command(gui_launcher, executor, "run hello.py &", path, jobs).startswith("[1] ")
+        output = run_gui_command(gui_launcher, executor, "fg 1", path, jobs)
+    assert output.splitlines()[:2] == ["Output:", "hello from the job"]
+    assert jobs.all() == []
+
+
+def test_announced_jobs_are_removed(session, monkeypatch):
+    path, jobs = session
+    monkeypatch.setattr(jobs_module, "JOBS_KEEP_FINISHED", 2)
+    script = os.path.join(path, "hello.py")
+    silent = jobs.start([sys.executable, "-c", "pass"], path, "silent")
+    chatty = [jobs.start([sys.executable, script], path, f"hello {number}") for number in range(3)]
+    for job in [silent] + chatty:
+        job.wait()
+    assert len(jobs.finished_notifications()) == 4
+    # Nothing to read from the silent job; only the newest two with output stay for 'fg'
+    assert [job.description for job in jobs.all()] == ["hello 1", "hello 2"]
+    assert jobs.finished_notifications() == []
+
+
+@pytest.mark.parametrize("command_line", ["fg 1", "wait 1", "wait"])
+def test_cancel_detaches_from_a_quiet_job(gui_launcher, session, command_line):
+    path, jobs = session
+    with ThreadPoolExecutor(1) as executor:
+        run_gui_command(gui_launcher, executor, "run quiet.py &", path, jobs)
+        started = time.monotonic()
+        run_gui_command(gui_launcher, executor, command_line, path, jobs, cancel_after=0.3)
+        assert time.monotonic() - started < 2
+    job = jobs.get(1)
+    assert job is not None and not job.done # Still running in the background
+
+
+def test_inproc_is_refused_where_commands_can_be_cancelled(gui_launcher, session):
+    path, jobs = session
+    with ThreadPoolExecutor(1) as executor:
+        output = run_gui_command(gui_launcher, executor, "run --inproc hello.py", path, jobs)
+    assert output.startswith("run: --inproc is not available here")
+    assert output_to_string(execute_morel_command("run --inproc hello.py", path)[0]) == "Output:\nhello from the job"
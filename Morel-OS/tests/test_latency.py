@@ -0,0 +1,55 @@
+"""Command latency (morel_commands/latency.py): the log-linear histogram and the 'stats' command."""
+import json
+
+import pytest
+
+from morel_commands.latency import LatencyHistogram, LatencyRecorder, bucket_bounds, bucket_index, stats_command_string
+
+
+@pytest.mark.parametrize("nanoseconds", [0, 1, 7, 8, 9, 1000, 123456789, 2 ** 40 + 12345])
+def test_buckets_hold_their_values_within_an_eighth(nanoseconds):
+    low, high = bucket_bounds(bucket_index(nanoseconds))
+    assert low <= nanoseconds < high
+    assert high - low <= max(1, low / 8)
+
+
+def test_percentiles():
+    histogram = LatencyHistogram()
+    for microseconds in range(1, 1001):
+        histogram.record(microseconds * 1000)
+    for fraction, expected in [(0.50, 500_000), (0.95, 950_000), (0.99, 990_000)]:
+        assert abs(histogram.percentile(fraction) - expected) <= expected / 8
+    assert histogram.percentile(1.0) <= histogram.max_ns == 1_000_000
+    assert histogram.percentile(0.0) >= histogram.min_ns == 1000
+    assert sum(count for _, _, count in histogram.buckets()) == 1000
+
+
+def test_streams_are_recorded_when_closed():
+    recorder = LatencyRecorder()
+    stream = recorder.record("ls", 0, iter(["a", "b", "c"]))
+    assert next(stream) == "a" and recorder.snapshot() == {} # Not finished yet
+    stream.close()
+    assert recorder.snapshot()["ls"][0]["count"] == 1
+
+
+def test_stats_json():
+    recorder = LatencyRecorder()
+    for nanoseconds in (1_000_000, 2_000_000, 3_000_000):
+        recorder.add("ls", nanoseconds)
+    recorder.add("cd", 50_000)
+    report = json.loads(stats_command_string(["--json", "ls"], recorder))
+    assert list(report["commands"]) == ["ls"]
+    ls = report["commands"]["ls"]
+    assert ls["count"] == 3 and ls["max_ms"] == 3.0 and ls["mean_ms"] == 2.0
+    assert abs(ls["p50_ms"] - 2.0) <= 0.25
+    assert sum(count for _, _, count in ls["buckets_ns"]) == 3
+    assert stats_command_string(["--reset"], recorder) == "Command statistics cleared."
+    assert stats_command_string([], recorder) == "stats: no commands recorded yet."
+
+
+def test_engine_times_every_command(tmp_path):
+    from morel_engine import execute_morel_command
+    before = json.loads(execute_morel_command("stats --json pwd", str(tmp_path))[0])["commands"].get("pwd", {"count": 0})
+    execute_morel_command("pwd", str(tmp_path))
+    after = json.loads(execute_morel_command("stats --json pwd", str(tmp_path))[0])["commands"]["pwd"]
+    assert after["count"] == before["count"] + 1
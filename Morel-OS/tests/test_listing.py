@@ -0,0 +1,38 @@
+"""ls and cd through the shared directory cache (morel_commands/listing.py, dircache.py)."""
+import os
+
+from morel_commands import PLAIN_OUTPUT
+from morel_commands.dircache import DirectoryCache
+from morel_engine import execute_morel_command, output_to_string
+
+
+def run(command_line: str, path: str):
+    token = PLAIN_OUTPUT.set(True)
+    try:
+        output, new_path, _ = execute_morel_command(command_line, path)
+        return output_to_string(output), new_path
+    finally:
+        PLAIN_OUTPUT.reset(token)
+
+
+def test_ls_sorted_and_streaming_modes(tmp_path):
+    for name in ("b", "a"):
+        (tmp_path / name).write_text("")
+    (tmp_path / "sub").mkdir()
+    assert run("ls", str(tmp_path))[0] == "F: a\nF: b\nD: sub"
+    assert sorted(run("ls -U", str(tmp_path))[0].splitlines()) == ["D: sub", "F: a", "F: b"]
+
+
+def test_cd(tmp_path):
+    (tmp_path / "sub").mkdir()
+    assert run("cd sub", str(tmp_path)) == ("", str(tmp_path / "sub"))
+    assert run("cd nope", str(tmp_path)) == ("cd: no such file or directory: nope", str(tmp_path))
+
+
+def test_cache_follows_directory_changes(tmp_path):
+    cache = DirectoryCache()
+    first = cache.get_listing(str(tmp_path))
+    assert first.entries == [] and cache.get_listing(str(tmp_path)) is first # Unchanged: the same listing
+    (tmp_path / "new.txt").write_text("")
+    os.utime(tmp_path, ns=(0, first.mtime_ns + 1_000_000_000)) # The mtime moves on even on coarse clocks
+    assert cache.get_listing(str(tmp_path)).entries == [("new.txt", False)]
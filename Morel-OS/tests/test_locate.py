@@ -0,0 +1,35 @@
+"""locate (morel_commands/locate.py) from scripts and -c, where the indexer thread dies with the process."""
+import subprocess
+import sys
+
+from conftest import MOREL_OS_DIR
+
+
+def batch(*command_lines: str) -> str:
+    argv = [sys.executable, "morel_os.py"]
+    for command_line in command_lines:
+        argv += ["-c", command_line]
+    completed_process = subprocess.run(argv, capture_output=True, text=True, cwd=MOREL_OS_DIR, timeout=120)
+    assert completed_process.returncode == 0, completed_process.stderr
+    return completed_process.stdout
+
+
+def test_batch_runs_build_the_index(tmp_path):
+    (tmp_path / "deep" / "er").mkdir(parents=True)
+    (tmp_path / "deep" / "er" / "needle-in-haystack.txt").write_text("")
+    output = batch(f"locate --add-root {tmp_path}", "locate needle-in")
+    assert output.splitlines() == [f"locate: indexed '{tmp_path}'.",
+                                   str(tmp_path / "deep" / "er" / "needle-in-haystack.txt")]
+    # A later run finds it too, and sees changes made in between
+    (tmp_path / "needle-in-a-second-file.txt").write_text("")
+    assert sorted(batch("locate needle-in").splitlines()) == [
+        str(tmp_path / "deep" / "er" / "needle-in-haystack.txt"), str(tmp_path / "needle-in-a-second-file.txt")]
+    assert batch(f"locate --remove-root {tmp_path}", "locate needle-in") == (
+        f"locate: '{tmp_path}' removed from the index.\nlocate: nothing is indexed yet. Add a tree with: locate --add-root <dir>\n")
+
+
+def test_status_after_a_walk(tmp_path):
+    (tmp_path / "file.txt").write_text("")
+    status = batch(f"locate --add-root {tmp_path}", "locate --status", f"locate --remove-root {tmp_path}")
+    indexer_line = next(line for line in status.splitlines() if line.strip().startswith("Indexer"))
+    assert indexer_line.split(":", 1)[1].strip() in ("idle", "inotify", "polling")
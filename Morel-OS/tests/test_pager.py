@@ -0,0 +1,69 @@
+"""Terminal output (morel_commands/pager.py): the Rich bypass for plain lines, and the pager."""
+import io
+import os
+import re
+
+import pytest
+
+from morel_commands import pager
+from morel_commands.pager import TerminalWriter, page_output
+
+
+class RecordingConsole:
+    """Stands in for a rich Console, recording what goes through it."""
+
+    def __init__(self, out):
+        self.out = out
+        self.printed = []
+
+    def print(self, text):
+        self.printed.append(text)
+        self.out.write("<rich>" + text + "\n")
+
+
+@pytest.fixture
+def writer():
+    out = io.StringIO()
+    return TerminalWriter(RecordingConsole(out), rich_available=True, out=out)
+
+
+def test_plain_lines_bypass_rich(writer):
+    writer.write_lines(["a.txt", "b.txt", "[bold]Commands:[/bold]", "[cyan]ls[/cyan]", "c.txt"])
+    # Runs of plain lines are written verbatim; only the markup run goes through the console, in order
+    assert writer.console.printed == ["[bold]Commands:[/bold]\n[cyan]ls[/cyan]"]
+    assert writer.out.getvalue() == "a.txt\nb.txt\n<rich>[bold]Commands:[/bold]\n[cyan]ls[/cyan]\nc.txt\n"
+
+
+def test_without_rich_everything_is_verbatim():
+    out = io.StringIO()
+    TerminalWriter(None, rich_available=False, out=out).write_lines(["[not markup]", "plain"])
+    assert out.getvalue() == "[not markup]\nplain\n"
+
+
+def test_pager_reads_a_stream_only_as_far_as_it_shows(writer, monkeypatch):
+    monkeypatch.setattr(pager.shutil, "get_terminal_size", lambda: os.terminal_size((80, 6)))
+    keys = iter(["page", "quit"])
+    monkeypatch.setattr(pager, "_read_key", lambda: next(keys))
+    produced = []
+    closed = []
+
+    def chunks():
+        try:
+            for number in range(1000):
+                produced.append(number)
+                yield f"line {number}"
+        finally:
+            closed.append(True)
+
+    page_output(chunks(), writer)
+    shown = re.findall(r"line \d+\n", writer.out.getvalue()) # The prompt is cleared with \r, so line 5 shares its text line
+    assert shown == [f"line {number}\n" for number in range(10)] # Two screens of five rows
+    assert len(produced) <= 12 # At most one line of look-ahead past what was shown
+    assert closed == [True] # Quitting closes the stream, so the command stops producing
+
+
+def test_pager_returns_without_a_prompt_when_everything_fits(writer, monkeypatch):
+    monkeypatch.setattr(pager.shutil, "get_terminal_size", lambda: os.terminal_size((80, 24)))
+    monkeypatch.setattr(pager, "_read_key", lambda: pytest.fail("the pager should not wait for a key"))
+    page_output("one\ntwo", writer)
+    assert writer.out.getvalue() == "one\ntwo\n"
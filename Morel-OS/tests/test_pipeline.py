@@ -0,0 +1,59 @@
+"""Pipelines and redirection (morel_commands/pipeline.py) run through the shared engine."""
+import subprocess
+
+import pytest
+
+from morel_commands import CommandRegistry, pipeline
+from morel_commands.pipeline import PipelineError, has_pipeline_syntax, parse_pipeline, run_pipeline
+from morel_engine import execute_morel_command, output_to_string
+
+
+def run(command_line: str, path: str) -> str:
+    output, _, _ = execute_morel_command(command_line, path)
+    return output_to_string(output)
+
+
+def test_has_pipeline_syntax():
+    assert has_pipeline_syntax("ls | head 2")
+    assert has_pipeline_syntax("ls > out.txt")
+    assert not has_pipeline_syntax("ls -l")
+
+
+def test_parse_pipeline_honours_quotes():
+    stages = parse_pipeline('copytext "a | b" | head 1 > out.txt')
+    assert [stage.argv for stage in stages] == [["copytext", "a | b"], ["head", "1"]]
+    assert stages[1].output_path == "out.txt" and not stages[1].append
+    with pytest.raises(PipelineError):
+        parse_pipeline("ls |")
+
+
+def test_run_stages_and_filters(tmp_path):
+    (tmp_path / "count.py").write_text("for number in range(100000):\n    print(number)\n")
+    (tmp_path / "double.py").write_text("import sys\nfor line in sys.stdin:\n    print(int(line) * 2)\n")
+    assert run("run count.py | run double.py | head 3", str(tmp_path)) == "0\n2\n4"
+
+
+def test_redirection_round_trip(tmp_path):
+    (tmp_path / "b.txt").write_text("")
+    (tmp_path / "a.txt").write_text("")
+    assert run("ls > listing.txt", str(tmp_path)) == ""
+    assert "a.txt" in (tmp_path / "listing.txt").read_text()
+    assert run("grep b.txt < listing.txt", str(tmp_path)) == "F: b.txt"
+
+
+def test_failing_builtin_stage_stops_started_processes(tmp_path, monkeypatch):
+    (tmp_path / "forever.py").write_text("import time\nwhile True:\n    print('x', flush=True)\n    time.sleep(0.01)\n")
+    started = []
+    class RecordingPopen(subprocess.Popen):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            started.append(self)
+    monkeypatch.setattr(pipeline.subprocess, "Popen", RecordingPopen)
+    def broken_handler(args, current_path, stdin=None):
+        raise RuntimeError("stage failed")
+    registry = CommandRegistry()
+    registry.register("broken", broken_handler, reads_input=True)
+    with pytest.raises(RuntimeError):
+        run_pipeline(parse_pipeline("run forever.py | broken"), str(tmp_path), registry)
+    assert len(started) == 1
+    assert started[0].returncode is not None # Killed and reaped
@@ -0,0 +1,50 @@
+"""profile (morel_commands/profiler.py): the report and the .pstats/.collapsed files, for both profilers."""
+import pstats
+
+import pytest
+
+from morel_engine import execute_morel_command, output_to_string
+
+
+def busy_work(iterations: int) -> int:
+    total = 0
+    for number in range(iterations):
+        total += number * number
+    return total
+
+
+def fake_execute(command_line: str, current_path: str):
+    """Stands in for the engine: a command whose work is easy to find in a profile."""
+    return [f"ran {command_line}", str(busy_work(300_000))], current_path, False
+
+
+@pytest.mark.parametrize("options", ["", "--sample --interval 0.5 "])
+def test_profile_writes_pstats_and_collapsed_stacks(tmp_path, options):
+    from morel_commands.profiler import profile_command
+    prefix = tmp_path / "out"
+    output, _, _ = profile_command(f"{options}-n 5 -o {prefix} work", str(tmp_path), fake_execute)
+    lines = output.splitlines()
+    assert lines[0] == "ran work" # The command's own output comes first
+    assert lines[2].startswith("profile: 'work' took ")
+    assert any(line.endswith("busy_work (test_profiler.py:9)") for line in lines[3:]) # In the top 5 by own time
+    assert lines[-1] == f"Wrote {prefix}.pstats and {prefix}.collapsed ({'samples' if options else 'microseconds'})."
+
+    functions = {function for _, _, function in pstats.Stats(f"{prefix}.pstats").stats}
+    assert "busy_work" in functions
+    with open(f"{prefix}.collapsed", encoding="utf-8") as f:
+        collapsed = f.read().splitlines()
+    _, weight = collapsed[0].rsplit(" ", 1)
+    assert int(weight) >= 1
+    assert any("busy_work (test_profiler.py:" in line for line in collapsed)
+
+
+def test_profile_through_the_engine(tmp_path):
+    output = output_to_string(execute_morel_command(f"profile -n 3 -o {tmp_path / 'p'} echo hello", str(tmp_path))[0])
+    assert output.splitlines()[0] == "hello"
+    assert (tmp_path / "p.pstats").exists() and (tmp_path / "p.collapsed").exists()
+
+
+def test_profile_usage_errors(tmp_path):
+    assert output_to_string(execute_morel_command("profile", str(tmp_path))[0]).startswith("Usage: profile")
+    assert output_to_string(execute_morel_command("profile --bogus ls", str(tmp_path))[0]).startswith(
+        "profile: unknown option --bogus")
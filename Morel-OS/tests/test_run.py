@@ -0,0 +1,87 @@
+"""The 'run' command: streamed, captured and in-process runs format their output the same way."""
+import glob
+import os
+import tempfile
+
+import pytest
+
+from morel_engine import execute_morel_command, output_to_string
+
+SCRIPT = """
+import sys
+print("first")
+print("oops", file=sys.stderr)
+sys.exit(3)
+"""
+
+
+def run(command_line: str, path: str) -> str:
+    output, _, _ = execute_morel_command(command_line, path)
+    return output_to_string(output)
+
+
+@pytest.fixture
+def script_dir(tmp_path):
+    (tmp_path / "fails.py").write_text(SCRIPT)
+    (tmp_path / "stdout_only.py").write_text("import sys\nprint('first')\nsys.exit(3)\n")
+    (tmp_path / "stderr_only.py").write_text("import sys\nprint('oops', file=sys.stderr)\n")
+    (tmp_path / "quiet.py").write_text("")
+    (tmp_path / "chatty.py").write_text("for number in range(2000):\n    print('x' * 50, number)\n")
+    return str(tmp_path)
+
+
+@pytest.mark.parametrize("mode", ["", "--capture ", "--inproc "])
+def test_modes_format_alike(script_dir, mode):
+    # Streamed stdout and stderr lines are interleaved as they arrive, so each is checked on its own
+    assert run(f"run {mode}stdout_only.py", script_dir) == "Output:\nfirst\n[Script exited with code 3]"
+    assert run(f"run {mode}stderr_only.py", script_dir) == "Errors:\noops"
+
+
+@pytest.mark.parametrize("mode", ["--capture ", "--inproc "])
+def test_recorded_modes_show_both_streams(script_dir, mode):
+    assert run(f"run {mode}fails.py", script_dir) == "Output:\nfirst\nErrors:\noops\n[Script exited with code 3]"
+
+
+@pytest.mark.parametrize("mode", ["", "--capture ", "--inproc "])
+def test_no_output(script_dir, mode):
+    assert run(f"run {mode}quiet.py", script_dir) == "[Script executed with no output]"
+
+
+def new_spill_files(before: set) -> set:
+    return set(glob.glob(os.path.join(tempfile.gettempdir(), "morel-run-*"))) - before
+
+
+def test_streamed_spill_file_is_deleted(script_dir):
+    before = new_spill_files(set())
+    output = run("run --cap 4K chatty.py", script_dir)
+    assert output.splitlines()[-1] == "x" * 50 + " 1999" and "memory cap" not in output # All of it was shown
+    assert new_spill_files(before) == set()
+
+
+def test_captured_spill_file_is_kept_and_named(script_dir):
+    before = new_spill_files(set())
+    lines = run("run --capture --cap 4K chatty.py", script_dir).splitlines()
+    spill_paths = new_spill_files(before)
+    try:
+        assert len(spill_paths) == 1
+        spill_path = spill_paths.pop()
+        assert lines[-1].endswith(f"memory cap; the full output is in {spill_path}]")
+        assert lines[-2].startswith("x" * 50 + " ") # The head ends on a whole line
+        with open(spill_path) as spill_file:
+            assert len(spill_file.read().splitlines()) == 2000
+    finally:
+        for path in spill_paths | new_spill_files(before):
+            os.remove(path)
+
+
+def test_background_job_spill_file_is_kept_by_fg(script_dir):
+    before = new_spill_files(set())
+    job_id = run("run --cap 4K chatty.py &", script_dir).split("]")[0].lstrip("[")
+    run(f"wait {job_id}", script_dir)
+    try:
+        assert len(new_spill_files(before)) == 1
+        output = run(f"fg {job_id}", script_dir)
+        assert f"the full output is in {next(iter(new_spill_files(before)))}]" in output
+    finally:
+        for path in new_spill_files(before):
+            os.remove(path)
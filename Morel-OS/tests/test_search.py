@@ -0,0 +1,39 @@
+"""find and grep (morel_commands/search.py)."""
+import pytest
+
+from morel_commands import search
+from morel_engine import execute_morel_command, output_to_string
+
+
+def run(command_line: str, path: str) -> str:
+    output, _, _ = execute_morel_command(command_line, path)
+    return output_to_string(output)
+
+
+@pytest.fixture(params=["read", "mmap"])
+def tree(request, tmp_path, monkeypatch):
+    if request.param == "mmap": # Every file goes through the mmap path
+        monkeypatch.setattr(search, "GREP_MMAP_BYTES", 1)
+    (tmp_path / "f.txt").write_text("hello\nworld\n")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "notes.md").write_text("no newline at the end")
+    return str(tmp_path)
+
+
+def test_matches_do_not_span_lines(tree):
+    assert run(r"grep hello\sworld f.txt", tree) == ""
+    assert run("grep -n 'o[^z]*r' f.txt", tree) == "2:world"
+    assert run("grep -l 'hello.world' .", tree) == ""
+
+
+def test_empty_matches_give_one_line_per_line(tree):
+    assert run('grep "" f.txt', tree) == "hello\nworld"
+    assert run("grep -n 'x*' f.txt", tree) == "1:hello\n2:world"
+    assert run("grep -n '$' sub/notes.md", tree) == "1:no newline at the end"
+
+
+def test_recursive_grep_and_find(tree):
+    # Files are searched in parallel, so their order in the output is not fixed
+    assert sorted(run("grep -n o .", tree).splitlines()) == ["./f.txt:1:hello", "./f.txt:2:world",
+                                                             "./sub/notes.md:1:no newline at the end"]
+    assert run("find . -name '*.md'", tree) == "./sub/notes.md"
@@ -0,0 +1,23 @@
+"""Cold start of morel_os.py stays within startup_profile.STARTUP_BUDGET_MS."""
+import subprocess
+import sys
+
+from conftest import MOREL_OS_DIR
+
+
+def test_cold_start_is_within_budget():
+    completed_process = subprocess.run(
+        [sys.executable, "morel_os.py", "--check-startup"],
+        capture_output=True, text=True, cwd=MOREL_OS_DIR, timeout=120
+    )
+    assert completed_process.returncode == 0, completed_process.stdout + completed_process.stderr
+
+
+def test_batch_mode_does_not_import_rich():
+    completed_process = subprocess.run(
+        [sys.executable, "-c", "import sys, morel_os; morel_os.main(['-c', 'pwd']); "
+                               "print('rich' in sys.modules, 'pyperclip' in sys.modules)"],
+        capture_output=True, text=True, cwd=MOREL_OS_DIR, timeout=120
+    )
+    assert completed_process.returncode == 0, completed_process.stderr
+    assert completed_process.stdout.splitlines()[-1] == "False False"
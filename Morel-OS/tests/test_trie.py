@@ -0,0 +1,29 @@
+"""PrefixTrie (morel_commands/trie.py), the index behind tab completion."""
+from morel_commands.trie import PrefixTrie
+
+WORDS = sorted(["cd", "clear", "copyfile", "copytext", "date", "du", "ls", "\U0010ffffmax"])
+
+
+def test_completions_and_count():
+    trie = PrefixTrie(WORDS)
+    assert trie.completions("co") == ["copyfile", "copytext"]
+    assert trie.count("c") == 4
+    assert trie.count("x") == 0 and trie.completions("x") == []
+    assert trie.completions("") == WORDS
+    assert trie.completions("\U0010ffff") == ["\U0010ffffmax"]
+
+
+def test_repeated_lookups_agree_with_a_scan():
+    words = sorted(f"file{number:05d}" for number in range(5000))
+    trie = PrefixTrie(words)
+    for prefix in ("file", "file0", "file012", "file0123", "file01234", "file9", "filex"):
+        expected = [word for word in words if word.startswith(prefix)]
+        assert trie.completions(prefix) == expected
+        assert trie.completions(prefix) == expected # Memoized nodes give the same answer
+
+
+def test_common_prefix():
+    trie = PrefixTrie(WORDS)
+    assert trie.common_prefix("cop") == "copy"
+    assert trie.common_prefix("l") == "ls"
+    assert trie.common_prefix("zz") == "zz" # Nothing matches: the prefix itself